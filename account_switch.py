@@ -0,0 +1,117 @@
+import time
+import logging
+from selenium.common.exceptions import WebDriverException
+
+# Returns the option values of the account dropdown, which is part of every page even while hidden.
+OPTIONS_SCRIPT = """
+var select = document.getElementById('drpAccount');
+return select ? Array.prototype.map.call(select.options, function(o) { return o.value; }) : null;
+"""
+
+# Text of the header element showing the active account.
+HEADER_SCRIPT = """
+var el = document.querySelector('.mrl10') || document.getElementById('dropdownMenuButton1');
+return el ? el.textContent.trim() : null;
+"""
+
+# Performs the whole switch in one call: selects the account in drpAccount and clicks the confirm button
+# of pnlSelMDP in the page, so the page's own handler posts the change exactly as the dropdown UI does.
+# The click is deferred so that a synchronous postback cannot block the script's return value.
+SWITCH_SCRIPT = """
+var wanted = arguments[0], number = arguments[1], confirmCandidates = arguments[2];
+var select = document.getElementById('drpAccount');
+if (!select) { return {status: 'no_dropdown'}; }
+var values = Array.prototype.map.call(select.options, function(o) { return o.value; });
+var value = values.indexOf(wanted) !== -1 ? wanted : null;
+for (var i = 0; !value && i < values.length; i++) {
+    if (values[i].indexOf(number) !== -1) { value = values[i]; }
+}
+if (!value) { return {status: 'not_found', options: values}; }
+var confirm = null;
+for (var j = 0; !confirm && j < confirmCandidates.length; j++) {
+    var by = confirmCandidates[j][0], locator = confirmCandidates[j][1];
+    try {
+        confirm = by === 'xpath'
+            ? document.evaluate(locator, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+            : document.querySelector(locator);
+    } catch (e) {
+        confirm = null;
+    }
+}
+if (!confirm) { return {status: 'no_confirm', options: values}; }
+select.value = value;
+select.dispatchEvent(new Event('change', {bubbles: true}));
+setTimeout(function() { confirm.click(); }, 0);
+return {status: 'submitted', value: value, options: values};
+"""
+
+# drpAccount option values per browser session; the list does not change while a session lasts
+option_cache = {}
+# Browser sessions in which the scripted switch did not work; they use the dropdown UI from then on
+unsupported_sessions = set()
+
+def account_number(account_id):
+    """Middle part of an account ID (e.g. 6500081466), as shown in the header and in partial option values."""
+    return account_id.split('-')[-2]
+
+def match_option(options, account_id):
+    """Dropdown value for an account: the exact ID, else the first option containing its account number."""
+    if account_id in options:
+        return account_id
+    return next((option for option in options if account_number(account_id) in option), None)
+
+def account_options(driver, refresh=False):
+    """Option values of drpAccount, read once per browser session in a single script call."""
+    if refresh or driver.session_id not in option_cache:
+        options = driver.execute_script(OPTIONS_SCRIPT)
+        if options is None:
+            return []
+        option_cache[driver.session_id] = options
+    return option_cache[driver.session_id]
+
+def active_account(driver):
+    """Header text naming the active account, or None while the page is loading."""
+    try:
+        return driver.execute_script(HEADER_SCRIPT)
+    except WebDriverException:
+        return None
+
+def is_active(driver, account_id):
+    header = active_account(driver)
+    return bool(header) and account_number(account_id) in header
+
+def wait_for_active(driver, account_id, timeout, poll=0.1):
+    """Poll the header until it shows the account; the page may reload in between."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if is_active(driver, account_id):
+            return True
+        time.sleep(poll)
+    return False
+
+def fast_switch(driver, account_id, confirm_locators, timeout=10):
+    """Switch accounts with one in-page script call and verify the result in the header.
+
+    Returns True once the header shows the account, False if the caller should fall back to the dropdown
+    UI. Raises ValueError if the cached dropdown options do not contain the account.
+    """
+    if driver.session_id in unsupported_sessions:
+        return False
+    if is_active(driver, account_id):
+        logging.info("Account %s is already active", account_id)
+        return True
+    cached = option_cache.get(driver.session_id)
+    if cached is not None and match_option(cached, account_id) is None:
+        raise ValueError(f"Account ID {account_id} not found in dropdown options: {cached}")
+    wanted = match_option(cached, account_id) if cached else account_id
+    result = driver.execute_script(SWITCH_SCRIPT, wanted, account_number(account_id), [list(locator) for locator in confirm_locators])
+    if result and result.get('options'):
+        option_cache[driver.session_id] = result['options']
+    status = result.get('status') if result else 'no_result'
+    if status == 'not_found':
+        raise ValueError(f"Account ID {account_id} not found in dropdown options: {result['options']}")
+    if status == 'submitted' and wait_for_active(driver, account_id, timeout):
+        return True
+    logging.warning("Scripted account switch did not take effect (%s); using the dropdown UI for this session", status)
+    unsupported_sessions.add(driver.session_id)
+    return False
@@ -0,0 +1,100 @@
+import os
+import csv
+import json
+import time
+import shutil
+import hashlib
+import logging
+
+# Content-addressed store of downloaded and extracted datasets:
+#   <store_dir>/objects/<hash[:2]>/<hash>.csv           one copy per distinct content
+#   <store_dir>/manifests/<account_id>/<data_type>.json  versions of one account's dataset, oldest first
+# A manifest version is {hash, rows, path, object, first_seen, last_seen, unchanged_runs}. `path` is the
+# file consumers read (a hard link to the object where possible); `last_seen` advances on every run that
+# produced the same content, so consumers can compare it with `first_seen` to skip reprocessing.
+
+def content_hash(path):
+    """SHA-256 of a CSV's cells with surrounding whitespace and blank rows removed, and its data row count."""
+    digest = hashlib.sha256()
+    rows = 0
+    with open(path, 'r', encoding='utf-8-sig', errors='replace', newline='') as f:
+        for row in csv.reader(f):
+            cells = [cell.strip() for cell in row]
+            if not any(cells):
+                continue
+            digest.update(('\x1f'.join(cells) + '\x1e').encode('utf-8'))
+            rows += 1
+    return digest.hexdigest(), max(rows - 1, 0)
+
+def manifest_path(store_dir, account_id, data_type):
+    return os.path.join(store_dir, "manifests", account_id, f"{data_type}.json")
+
+def object_path(store_dir, digest):
+    return os.path.join(store_dir, "objects", digest[:2], f"{digest}.csv")
+
+def load_manifest(path):
+    """Load a dataset manifest, or an empty one."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'versions': []}
+    except Exception as e:
+        logging.warning("Could not read artifact manifest %s, starting a new one: %s", path, e)
+        return {'versions': []}
+
+def save_manifest(path, manifest):
+    """Save a dataset manifest atomically."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+def latest(store_dir, account_id, data_type):
+    """Most recent version of an account's dataset, or None if none was stored yet."""
+    versions = load_manifest(manifest_path(store_dir, account_id, data_type))['versions']
+    return versions[-1] if versions else None
+
+def link_or_copy(source, target):
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)  # File systems without hard links
+
+def put(store_dir, account_id, data_type, source_path, target_path=None):
+    """Store a dataset file and return its manifest version with 'changed' set.
+
+    With a target_path the source (a fresh download) is moved into the store and exposed at target_path;
+    if its content equals the latest version, the source is deleted and nothing new is written. Without
+    one the file stays where it is (it is rewritten in place on every run) and a copy is stored.
+    """
+    digest, rows = content_hash(source_path)
+    manifest_file = manifest_path(store_dir, account_id, data_type)
+    manifest = load_manifest(manifest_file)
+    now = time.time()
+    previous = manifest['versions'][-1] if manifest['versions'] else None
+    if previous and previous['hash'] == digest and os.path.exists(previous['path']):
+        previous['last_seen'] = now
+        previous['unchanged_runs'] += 1
+        save_manifest(manifest_file, manifest)
+        if os.path.abspath(source_path) != os.path.abspath(previous['path']):
+            os.remove(source_path)
+        return dict(previous, changed=False)
+    stored_object = object_path(store_dir, digest)
+    os.makedirs(os.path.dirname(stored_object), exist_ok=True)
+    if target_path is None:
+        target_path = source_path
+        if not os.path.exists(stored_object):
+            shutil.copyfile(source_path, stored_object + '.tmp')
+            os.replace(stored_object + '.tmp', stored_object)
+    else:
+        if os.path.exists(stored_object):
+            os.remove(source_path)  # Same content as an older version, e.g. holdings that changed back
+        else:
+            shutil.move(source_path, stored_object)
+        link_or_copy(stored_object, target_path)
+    version = {'hash': digest, 'rows': rows, 'path': target_path, 'object': stored_object,
+               'first_seen': now, 'last_seen': now, 'unchanged_runs': 0}
+    manifest['versions'].append(version)
+    save_manifest(manifest_file, manifest)
+    return dict(version, changed=True)
@@ -0,0 +1,81 @@
+import os
+import gzip
+import time
+import queue
+import shutil
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - [%(funcName)s:%(lineno)d] - %(message)s'
+
+# Listener of this process; replaced when setup_logging() runs again (e.g. in a worker process)
+listener = None
+
+class LazyQueueHandler(QueueHandler):
+    """Queues records as they are, so message formatting and tracebacks are rendered on the writer thread.
+
+    The stock QueueHandler formats every record in the calling thread so that it can be pickled; the
+    queue here never leaves the process, so that work is deferred to the listener.
+    """
+
+    def prepare(self, record):
+        return record
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """Rotates by size and, optionally, at fixed intervals; rotated files are gzip-compressed."""
+
+    def __init__(self, filename, max_bytes, backup_count, interval=0, compress=True):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.interval = interval
+        self.current_period = self.period_of(os.path.getmtime(filename) if os.path.exists(filename) else time.time())
+        if compress:
+            self.namer = lambda name: name + '.gz'
+            self.rotator = self.compress
+
+    def period_of(self, timestamp):
+        return int(timestamp // self.interval) if self.interval else 0
+
+    def shouldRollover(self, record):
+        if self.interval and self.period_of(record.created) != self.current_period:
+            self.current_period = self.period_of(record.created)
+            return os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0
+        return super().shouldRollover(record)
+
+    @staticmethod
+    def compress(source, dest):
+        with open(source, 'rb') as infile, gzip.open(dest, 'wb') as outfile:
+            shutil.copyfileobj(infile, outfile)
+        os.remove(source)
+
+def setup_logging(path, level=logging.INFO, max_bytes=5 * 1024 * 1024, backup_count=5, interval=0, compress=True):
+    """Route all logging through an in-memory queue to a writer thread that owns the rotating log file.
+
+    Logging calls only enqueue the record; formatting, writing, rotation and compression happen on the
+    listener thread. Calling this again (e.g. in a forked worker) replaces the handlers of the process.
+    """
+    global listener
+    file_handler = CompressingRotatingFileHandler(path, max_bytes, backup_count, interval, compress)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(LazyQueueHandler(log_queue))
+    root.setLevel(level)
+    if listener is not None and listener._thread is not None:
+        listener.stop()
+    listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+def stop_logging():
+    """Flush the queued records and close the log file."""
+    global listener
+    if listener is not None and listener._thread is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+    listener = None
+
+atexit.register(stop_logging)
@@ -0,0 +1,310 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+import statistics
+from collections import Counter
+from datetime import datetime
+from tabulate import tabulate
+import main as pipeline
+import mock_portal
+
+try:
+    import psutil
+except ImportError:  # psutil is optional; without it peak RSS is not measured and recorded as null
+    psutil = None
+
+# Metrics recorded per phase and the slack allowed before a change counts as a regression:
+# (relative tolerance is given on the command line, absolute floor here to ignore noise on tiny values)
+METRICS = {
+    'wall_s': 0.25,
+    'commands': 5,
+    'bytes': 1024,
+    'peak_rss_mb': 25,
+}
+
+class CommandCounter:
+    """Counts WebDriver commands by wrapping driver.execute, which every Selenium call goes through."""
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def attach(self, driver):
+        execute = driver.execute
+
+        def counting_execute(driver_command, params=None):
+            self.counts[driver_command] += 1
+            return execute(driver_command, params)
+        driver.execute = counting_execute
+
+    def total(self):
+        return sum(self.counts.values())
+
+class RssSampler:
+    """Samples the resident memory of this process and the browser process tree in the background."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.root_pid = None
+        self.peak = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def current(self):
+        """RSS of this process and the browser tree in bytes, or None without psutil."""
+        if psutil is None:
+            return None
+        total = psutil.Process().memory_info().rss
+        if self.root_pid:
+            try:
+                root = psutil.Process(self.root_pid)
+                for process in [root] + root.children(recursive=True):
+                    try:
+                        total += process.memory_info().rss
+                    except psutil.Error:
+                        continue
+            except psutil.Error:
+                pass
+        return total
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    def start(self):
+        if psutil is None:
+            logging.warning("psutil is not installed, peak RSS is not measured")
+            return
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+
+    def reset(self):
+        """Start a new phase: the peak restarts from the current usage."""
+        self.peak = self.current() or 0
+        return self.peak
+
+def downloaded_bytes(base_dir):
+    """Total size of the CSVs in the per-account download directories."""
+    total = 0
+    for root, _, files in os.walk(base_dir):
+        if os.path.abspath(root) == os.path.abspath(base_dir) or \
+                os.path.abspath(root).startswith(os.path.abspath(pipeline.CONFIG['artifact_dir'])):
+            continue  # Stored artifacts are hard links to the downloads
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files if name.endswith('.csv'))
+    return total
+
+class PhaseRecorder:
+    """Records wall time, WebDriver commands, bytes downloaded and peak RSS of each pipeline phase."""
+
+    def __init__(self, base_dir, counter, sampler):
+        self.base_dir = base_dir
+        self.counter = counter
+        self.sampler = sampler
+        self.phases = {}
+        self.errors = []
+
+    def run(self, name, func, *args):
+        commands = self.counter.total()
+        size = downloaded_bytes(self.base_dir)
+        self.sampler.reset()
+        start = time.perf_counter()
+        result = None
+        try:
+            result = func(*args)
+        except Exception as e:
+            logging.error("Benchmark phase %s failed: %s", name, e, exc_info=True)
+            self.errors.append(f"{name}: {str(e)}")
+        elapsed = time.perf_counter() - start
+        rss = self.sampler.current()
+        phase = self.phases.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'commands': 0, 'bytes': 0,
+                                              'peak_rss_mb': 0.0 if rss is not None else None})
+        phase['calls'] += 1
+        phase['wall_s'] += elapsed
+        phase['commands'] += self.counter.total() - commands
+        phase['bytes'] += downloaded_bytes(self.base_dir) - size
+        if rss is not None:
+            self.sampler.peak = max(self.sampler.peak, rss)
+            phase['peak_rss_mb'] = max(phase['peak_rss_mb'], self.sampler.peak / (1024 * 1024))
+        return result
+
+def configure(work_dir, base_url, browser_profile):
+    """Point pipeline.CONFIG at the fixture and keep every output of the run inside work_dir."""
+    pipeline.CONFIG.update({
+        'base_url': base_url,
+        'download_base_dir': os.path.join(work_dir, 'downloads'),
+        'session_file': os.path.join(work_dir, 'cookies.json'),
+        'export_templates_file': os.path.join(work_dir, 'export_requests.json'),
+        'columnar_dir': os.path.join(work_dir, 'downloads', 'columnar'),
+        'datastore_path': os.path.join(work_dir, 'downloads', 'icici.db'),
+        'artifact_dir': os.path.join(work_dir, 'downloads', 'artifacts'),
+        'reuse_session': False,
+        'parallel_workers': 1,
+        'browser_profile': browser_profile,
+    })
+    pipeline.USERNAME = pipeline.USERNAME or 'benchmark'
+    pipeline.PASSWORD = pipeline.PASSWORD or 'benchmark'
+
+def run_pipeline(base_url, browser_profile):
+    """Run the extraction pipeline once against base_url and return its per-phase metrics."""
+    work_dir = tempfile.mkdtemp(prefix='icici_bench_')
+    configure(work_dir, base_url, browser_profile)
+    base_dir = pipeline.CONFIG['download_base_dir']
+    os.makedirs(base_dir, exist_ok=True)
+    counter = CommandCounter()
+    sampler = RssSampler()
+    recorder = PhaseRecorder(base_dir, counter, sampler)
+    sampler.start()
+    try:
+        recorder.run('startup', pipeline.init_driver, base_dir)
+        if pipeline.driver is None:
+            raise RuntimeError(f"Browser did not start: {recorder.errors[-1]}")
+        counter.attach(pipeline.driver)
+        sampler.root_pid = pipeline.driver.service.process.pid
+        recorder.run('login', pipeline.login)
+        order_files = []
+        for account in pipeline.SUB_ACCOUNTS:
+            pipeline.set_download_dir(pipeline.get_account_download_dir(account))
+            recorder.run('switch_account', pipeline.switch_account, account)
+            downloads = [('tradebook', recorder.run('download_tradebook', pipeline.download_tradebook, account)),
+                         ('portfolio', recorder.run('download_portfolio', pipeline.download_portfolio, account))]
+            table = recorder.run('show_orderbook', pipeline.show_orderbook, account)
+            orders_file = recorder.run('save_orderbook', pipeline.save_orderbook, account, table) if table else None
+            if table:
+                recorder.run('record_gtt_changes', pipeline.record_gtt_changes, account, table)
+            if orders_file:
+                order_files.append(orders_file)
+            if account in pipeline.MF_ACCOUNTS:
+                downloads.append(('myportfolio', recorder.run('download_myportfolio', pipeline.download_myportfolio, account)))
+                downloads.append(('orderbook', recorder.run('download_orderbook', pipeline.download_orderbook, account)))
+            for data_type, downloaded_file in downloads:
+                if downloaded_file:
+                    recorder.run('store_download', pipeline.store_download, account, downloaded_file, data_type)
+
+        def consolidate_all():
+            pipeline.consolidate_csvs("orders", order_files)
+            for data_type in pipeline.CONSOLIDATED_DATA_TYPES:
+                pipeline.consolidate_csvs(data_type, pipeline.collect_dataset_files(data_type))
+        recorder.run('consolidate_csvs', consolidate_all)
+    finally:
+        pipeline.quit_driver()
+        sampler.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    phases = {name: dict(metrics, wall_s=round(metrics['wall_s'], 3),
+                         peak_rss_mb=round(metrics['peak_rss_mb'], 1) if metrics['peak_rss_mb'] is not None else None)
+              for name, metrics in recorder.phases.items()}
+    return {'phases': phases, 'errors': recorder.errors, 'commands_by_type': dict(counter.counts.most_common())}
+
+def median(values):
+    """Rounded median, or None if any run did not measure the metric (peak RSS without psutil)."""
+    if any(value is None for value in values):
+        return None
+    return round(statistics.median(values), 3)
+
+def summarize(runs):
+    """Median of every metric per phase over several runs."""
+    summary = {}
+    for name in runs[0]['phases']:
+        values = [run['phases'][name] for run in runs if name in run['phases']]
+        summary[name] = {metric: median([value[metric] for value in values]) for metric in ['calls'] + list(METRICS)}
+    summary['total'] = {metric: round(sum(phase[metric] for phase in summary.values()), 3)
+                        for metric in ('wall_s', 'commands', 'bytes')}
+    peaks = [phase['peak_rss_mb'] for name, phase in summary.items() if name != 'total' and phase['peak_rss_mb'] is not None]
+    summary['total']['peak_rss_mb'] = max(peaks) if peaks else None
+    return summary
+
+def compare(results, baseline, tolerance):
+    """Return table rows comparing results with a baseline and the list of regressions."""
+    rows, regressions = [], []
+    if baseline.get('fixture') != results['fixture']:
+        logging.warning("Baseline was recorded with different fixture options, comparison may be meaningless")
+        print("Warning: baseline fixture options differ from this run")
+    for name, metrics in results['summary'].items():
+        previous = baseline['summary'].get(name)
+        if not previous:
+            continue
+        for metric, floor in METRICS.items():
+            old, new = previous.get(metric), metrics.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else 0.0
+            regressed = new > old * (1 + tolerance) and new - old > floor
+            rows.append([name, metric, old, new, f"{change:+.1f}%", 'REGRESSION' if regressed else ''])
+            if regressed:
+                regressions.append(f"{name}.{metric}: {old} -> {new} ({change:+.1f}%)")
+    return rows, regressions
+
+def main():
+    """Benchmark the pipeline: python benchmark.py --runs 3 --baseline benchmark_baseline.json"""
+    parser = argparse.ArgumentParser(description="Benchmark the extraction pipeline against the offline mock portal.")
+    parser.add_argument('--runs', type=int, default=3, help="Pipeline runs; the median of each metric is reported")
+    parser.add_argument('--output', default=os.path.join('benchmark_results', f"{datetime.now():%Y%m%d_%H%M%S}.json"))
+    parser.add_argument('--baseline', default='benchmark_baseline.json', help="Baseline results to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Relative slowdown allowed before flagging a regression")
+    parser.add_argument('--browser-profile', default='lean', choices=['default', 'lean'])
+    parser.add_argument('--base-url', help="Benchmark against a running portal instead of starting the mock")
+    parser.add_argument('--gtt-rows', type=int, default=50)
+    parser.add_argument('--trade-rows', type=int, default=200)
+    parser.add_argument('--latency-ms', type=int, default=20)
+    parser.add_argument('--render-ms', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    pipeline.configure_logging(pipeline.CONFIG['log_file'])
+
+    fixture = {'gtt_rows': args.gtt_rows, 'trade_rows': args.trade_rows, 'latency_ms': args.latency_ms,
+               'render_ms': args.render_ms, 'seed': args.seed}
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        server, base_url = mock_portal.start_mock_portal(**fixture)
+    try:
+        runs = []
+        for index in range(args.runs):
+            logging.info("Benchmark run %s/%s against %s", index + 1, args.runs, base_url)
+            runs.append(run_pipeline(base_url, args.browser_profile))
+    finally:
+        if server:
+            server.shutdown()
+
+    results = {
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        'fixture': fixture if server else {'base_url': base_url},
+        'browser_profile': args.browser_profile,
+        'runs': runs,
+        'summary': summarize(runs),
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(tabulate([[name] + [metrics.get(key, '') for key in ['calls'] + list(METRICS)] for name, metrics in results['summary'].items()],
+                   headers=['Phase', 'Calls', 'Wall (s)', 'Commands', 'Bytes', 'Peak RSS (MB)'], tablefmt="grid"))
+    print(f"Results saved to {args.output}")
+    errors = [error for run in runs for error in run['errors']]
+    for error in errors:
+        print(f"Phase failed: {error}")
+
+    regressions = []
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"Saved baseline to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows, regressions = compare(results, baseline, args.tolerance)
+        print(tabulate(rows, headers=['Phase', 'Metric', 'Baseline', 'Current', 'Change', ''], tablefmt="grid"))
+        for regression in regressions:
+            print(f"Regression: {regression}")
+    return 1 if regressions or errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import os
+import csv
+import time
+import logging
+from datetime import date
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional, columnar output is disabled without it
+    pa = None
+
+# Declared column types per dataset; columns not listed fall back to infer_type()
+SCHEMAS = {
+    'orders': {
+        'Stock': 'string',
+        'Date': 'date',
+        'Buy/Sell': 'string',
+        'LTP': 'float',
+        'Trigger Price': 'float',
+        'Limit Price': 'float',
+        'Quantity': 'int',
+        'Status': 'string',
+        'Actions': 'string',
+    },
+}
+
+NUMERIC_HINTS = ('price', 'ltp', 'value', 'amount', 'brokerage', 'charges', 'p&l', 'profit', 'loss', 'nav', 'cost', 'rate')
+INTEGER_HINTS = ('qty', 'quantity', 'units')
+DATE_FORMATS = ('%d-%b-%Y', '%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d', '%d %b %Y')
+DATETIME_FORMATS = ('%d-%b-%Y %H:%M:%S', '%d-%b-%Y %H:%M', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M')
+
+def infer_type(column):
+    """Guess a column type from its header."""
+    name = column.lower()
+    if 'date' in name:
+        return 'date'
+    if any(hint in name for hint in INTEGER_HINTS):
+        return 'int'
+    if any(hint in name for hint in NUMERIC_HINTS):
+        return 'float'
+    return 'string'
+
+def to_number(column, target):
+    """Vectorized parse of a string column holding formatted numbers (commas, blanks, '-')."""
+    cleaned = pc.utf8_trim_whitespace(pc.replace_substring_regex(column, pattern='[,₹%]', replacement=''))
+    blank = pc.or_(pc.equal(cleaned, ''), pc.equal(cleaned, '-'))
+    cleaned = pc.if_else(blank, pa.scalar(None, pa.string()), cleaned)
+    as_float = pc.cast(cleaned, pa.float64())
+    if target == 'int':
+        whole = pc.equal(as_float, pc.floor(as_float))
+        if pc.all(pc.or_kleene(whole, pc.is_null(as_float))).as_py() is not False:
+            return pc.cast(as_float, pa.int64())
+    return as_float
+
+def parse_with(column, formats):
+    """Coalesce the results of parsing a string column with each format; failures become null."""
+    parsed = None
+    for fmt in formats:
+        attempt = pc.strptime(column, format=fmt, unit='s', error_is_null=True)
+        parsed = attempt if parsed is None else pc.coalesce(parsed, attempt)
+    return parsed
+
+def unparsed_count(source, parsed):
+    """Number of non-blank source values that did not parse."""
+    return pc.sum(pc.and_(pc.is_null(parsed), pc.not_equal(source, ''))).as_py() or 0
+
+def to_date(column):
+    """Vectorized parse of a string date column: date32 when no time is present, timestamp otherwise."""
+    trimmed = pc.utf8_trim_whitespace(column)
+    parsed = parse_with(trimmed, DATE_FORMATS)
+    if unparsed_count(trimmed, parsed) == 0:
+        return pc.cast(parsed, pa.date32())
+    parsed = parse_with(trimmed, DATETIME_FORMATS + DATE_FORMATS)
+    if unparsed_count(trimmed, parsed) == 0:
+        return parsed
+    raise pa.ArrowInvalid(f"{unparsed_count(trimmed, parsed)} values match none of the known date formats")
+
+def normalize(table, data_type):
+    """Cast an all-string table to the typed schema of its dataset; unparseable columns stay strings."""
+    schema = SCHEMAS.get(data_type, {})
+    columns = []
+    for name in table.column_names:
+        column = table[name]
+        target = schema.get(name) or infer_type(name)
+        try:
+            if target in ('int', 'float'):
+                column = to_number(column, target)
+            elif target == 'date':
+                column = to_date(column)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            logging.warning("Keeping %s column '%s' as text, could not parse as %s: %s", data_type, name, target, e)
+        columns.append(column)
+    return pa.table(columns, names=table.column_names)
+
+def read_csv_as_strings(csv_path):
+    """Read a CSV with every column as a string so that typing is decided by normalize()."""
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        header = f.readline()
+    names = next(csv.reader([header]), [])
+    return pa_csv.read_csv(csv_path, convert_options=pa_csv.ConvertOptions(
+        column_types={name: pa.string() for name in names},
+        strings_can_be_null=False,
+    ))
+
+def write_dataset(csv_path, root_dir, data_type, account_id, fmt='parquet', snapshot_date=None):
+    """Write a CSV as a typed Parquet/Arrow file under <root>/<data_type>/account_id=<id>/snapshot_date=<date>/."""
+    if pa is None:
+        logging.warning("pyarrow is not installed, skipping columnar output")
+        return None
+    snapshot_date = snapshot_date or date.today()
+    table = normalize(read_csv_as_strings(csv_path), data_type)
+    partition_dir = os.path.join(root_dir, data_type, f"account_id={account_id}", f"snapshot_date={snapshot_date.isoformat()}")
+    os.makedirs(partition_dir, exist_ok=True)
+    if fmt == 'arrow':
+        output_path = os.path.join(partition_dir, f"part-{int(time.time() * 1000)}.arrow")
+        with pa.OSFile(output_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        output_path = os.path.join(partition_dir, f"part-{int(time.time() * 1000)}.parquet")
+        pq.write_table(table, output_path, compression='zstd')
+    logging.info("Wrote %s typed %s rows to %s", table.num_rows, data_type, output_path)
+    return output_path
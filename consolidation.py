@@ -0,0 +1,190 @@
+import os
+import csv
+import json
+import hashlib
+import logging
+
+ACCOUNT_COLUMN = 'Account ID'
+
+def manifest_path(output_path):
+    """Path of the manifest recording which input bytes a consolidated file already contains."""
+    return os.path.splitext(output_path)[0] + '.manifest.json'
+
+def load_manifest(output_path):
+    """Load the manifest of a consolidated file, or an empty one."""
+    path = manifest_path(output_path)
+    if not os.path.exists(output_path) or not os.path.exists(path):
+        return {'columns': [], 'files': {}}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logging.warning("Could not read consolidation manifest %s, rebuilding: %s", path, e)
+        return {'columns': [], 'files': {}}
+
+def save_manifest(output_path, manifest):
+    """Save the manifest of a consolidated file atomically."""
+    path = manifest_path(output_path)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+def fingerprint(path, length, sample=64 * 1024):
+    """SHA-1 over the first and last `sample` bytes of a file's first `length` bytes.
+
+    Enough to tell an append-only file from one that was rewritten, without re-reading months of history.
+    """
+    digest = hashlib.sha1(str(length).encode('ascii'))
+    with open(path, 'rb') as f:
+        digest.update(f.read(min(sample, length)))
+        if length > sample:
+            f.seek(max(sample, length - sample))
+            digest.update(f.read(length - max(sample, length - sample)))
+    return digest.hexdigest()
+
+def read_header(path):
+    """Return the header row of a CSV file."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return next(csv.reader(f), [])
+
+class RowReader:
+    """Data rows of a CSV as dicts from a byte offset on (0 skips the header line).
+
+    `offset` advances over the complete lines actually read, so it is the position to resume from even
+    if the file grows while it is being read. A trailing line without its newline is left for next time.
+    """
+
+    def __init__(self, path, offset, header):
+        self.path = path
+        self.offset = offset
+        self.header = header
+
+    def lines(self, raw):
+        """Complete lines from the current position, counting their bytes into offset."""
+        for line in raw:
+            if not line.endswith(b'\n'):
+                return
+            self.offset += len(line)
+            yield line.decode('utf-8')
+
+    def __iter__(self):
+        with open(self.path, 'rb') as raw:
+            raw.seek(self.offset)
+            reader = csv.reader(self.lines(raw))
+            if self.offset == 0:
+                next(reader, None)
+            for row in reader:
+                if row:
+                    yield dict(zip(self.header, row))
+
+def write_rows(writer, columns, account_id, rows, chunk_size):
+    """Write dict rows in the consolidated column order, buffering at most chunk_size rows."""
+    chunk = []
+    count = 0
+    for row in rows:
+        row[ACCOUNT_COLUMN] = account_id
+        chunk.append([row.get(column, '') for column in columns])
+        if len(chunk) >= chunk_size:
+            writer.writerows(chunk)
+            count += len(chunk)
+            chunk = []
+    writer.writerows(chunk)
+    return count + len(chunk)
+
+def union_columns(columns, headers):
+    """Extend a column list with the columns of further headers, keeping first-seen order."""
+    columns = list(columns) or [ACCOUNT_COLUMN]
+    for header in headers:
+        for column in header:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+def plan(inputs, manifest):
+    """Compare inputs with the manifest and decide what to append.
+
+    Returns (needs_rebuild, [(account_id, path, offset, header)]). A rebuild is needed when a
+    consumed input disappeared or was changed other than by appending to it.
+    """
+    current = {path for _, path in inputs}
+    if any(path not in current for path in manifest['files']):
+        return True, []
+    pending = []
+    for account_id, path in inputs:
+        size = os.path.getsize(path)
+        entry = manifest['files'].get(path)
+        if entry is None:
+            pending.append((account_id, path, 0, read_header(path)))
+        elif size == entry['offset'] and os.path.getmtime(path) == entry['mtime']:
+            continue
+        elif size >= entry['offset'] and fingerprint(path, entry['offset']) == entry['fingerprint']:
+            if size > entry['offset']:
+                pending.append((account_id, path, entry['offset'], entry['header']))
+        else:
+            return True, []
+    return False, pending
+
+def widen(output_path, old_columns, columns, chunk_size):
+    """Rewrite a consolidated file under a wider header, streaming its existing rows."""
+    tmp_path = output_path + '.tmp'
+    with open(output_path, 'r', encoding='utf-8', newline='') as infile, \
+            open(tmp_path, 'w', encoding='utf-8', newline='') as outfile:
+        reader = csv.reader(infile)
+        next(reader, None)
+        writer = csv.writer(outfile)
+        writer.writerow(columns)
+        padding = [''] * (len(columns) - len(old_columns))
+        chunk = []
+        for row in reader:
+            chunk.append(row + padding)
+            if len(chunk) >= chunk_size:
+                writer.writerows(chunk)
+                chunk = []
+        writer.writerows(chunk)
+    os.replace(tmp_path, output_path)
+    logging.info("Widened %s from %s to %s columns", output_path, len(old_columns), len(columns))
+
+def consolidate(output_path, inputs, chunk_size=5000):
+    """Stream (account_id, csv_path) inputs into one CSV with the union of their headers.
+
+    Only input bytes not yet recorded in the manifest are read and appended. The file is rewritten
+    only when a new column appears (existing rows are padded) or an input was removed or rewritten
+    (full rebuild from the current inputs). Memory use is bounded by chunk_size rows.
+    """
+    manifest = load_manifest(output_path)
+    rebuild, pending = plan(inputs, manifest)
+    if rebuild:
+        logging.info("Inputs of %s were rewritten or removed, rebuilding", output_path)
+        manifest = {'columns': [], 'files': {}}
+        pending = [(account_id, path, 0, read_header(path)) for account_id, path in inputs]
+    if not pending and os.path.exists(output_path) and not rebuild:
+        logging.info("%s is up to date", output_path)
+        return output_path
+
+    columns = union_columns(manifest['columns'], [header for _, _, _, header in pending])
+    fresh = rebuild or not manifest['columns']
+    if not fresh and columns != manifest['columns']:
+        widen(output_path, manifest['columns'], columns, chunk_size)
+
+    target = output_path + '.tmp' if fresh else output_path
+    added = 0
+    with open(target, 'w' if fresh else 'a', encoding='utf-8', newline='') as outfile:
+        writer = csv.writer(outfile)
+        if fresh:
+            writer.writerow(columns)
+        for account_id, path, offset, header in pending:
+            mtime = os.path.getmtime(path)
+            rows = RowReader(path, offset, header)
+            added += write_rows(writer, columns, account_id, rows, chunk_size)
+            manifest['files'][path] = {
+                'offset': rows.offset,
+                'mtime': mtime,
+                'header': header,
+                'fingerprint': fingerprint(path, rows.offset),
+            }
+    if fresh:
+        os.replace(target, output_path)
+    manifest['columns'] = columns
+    save_manifest(output_path, manifest)
+    logging.info("Consolidated %s rows from %s inputs into %s", added, len(pending), output_path)
+    return output_path
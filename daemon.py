@@ -0,0 +1,377 @@
+import os
+import json
+import time
+import uuid
+import logging
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+from selenium.common.exceptions import WebDriverException
+import main as pipeline
+import tenants
+import tracing
+import flow_scheduler
+import locator_registry
+
+# Long-running extraction service: one browser stays logged in and runs jobs from a local HTTP API.
+#   POST /jobs      {"account": "...", "datasets": ["orders"], "wait": 60}  queue a job (optionally wait for it)
+#   GET  /jobs      recent jobs;  GET /jobs/<id>  one job with its result
+#   GET  /health    browser state, queue depth and last keep-alive
+#   POST /shutdown  finish the running job and stop
+# A job runs the ACCOUNT_FLOW steps of its datasets (see flow_scheduler.select()) for one account.
+
+JOB_HISTORY = 200  # Finished jobs kept for GET /jobs
+
+class JobQueue:
+    """Queued, running and recently finished jobs; the browser worker takes them one at a time."""
+
+    def __init__(self, history=JOB_HISTORY):
+        self.jobs = OrderedDict()
+        self.pending = deque()
+        self.history = history
+        self.condition = threading.Condition()
+
+    def submit(self, account, datasets):
+        """Queue a job and return (job, created); an identical job that is still queued is returned instead."""
+        with self.condition:
+            for job_id in self.pending:
+                job = self.jobs[job_id]
+                if job['account'] == account and job['datasets'] == datasets:
+                    return dict(job), False
+            job = {'id': uuid.uuid4().hex[:12], 'account': account, 'datasets': datasets, 'status': 'queued',
+                   'submitted_at': time.time(), 'started_at': None, 'finished_at': None, 'result': None, 'error': None}
+            self.jobs[job['id']] = job
+            self.pending.append(job['id'])
+            self.trim()
+            self.condition.notify_all()
+            return dict(job), True
+
+    def take(self, timeout):
+        """Next queued job, marked as running, or None if none arrives within timeout seconds."""
+        with self.condition:
+            if not self.pending:
+                self.condition.wait(timeout)
+            if not self.pending:
+                return None
+            job = self.jobs[self.pending.popleft()]
+            job.update(status='running', started_at=time.time())
+            return job
+
+    def finish(self, job, result=None, error=None):
+        with self.condition:
+            job.update(status='failed' if error else 'done', finished_at=time.time(), result=result, error=error)
+            self.condition.notify_all()
+
+    def fail_pending(self, error):
+        """Fail every queued job, e.g. when the browser could not be started."""
+        with self.condition:
+            while self.pending:
+                self.jobs[self.pending.popleft()].update(status='failed', finished_at=time.time(), error=error)
+            self.condition.notify_all()
+
+    def wait(self, job_id, timeout):
+        """Block until a job has finished or timeout seconds have passed, and return it."""
+        deadline = time.time() + timeout
+        with self.condition:
+            while self.jobs[job_id]['status'] in ('queued', 'running') and time.time() < deadline:
+                self.condition.wait(deadline - time.time())
+            return dict(self.jobs[job_id])
+
+    def get(self, job_id):
+        with self.condition:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def summary(self):
+        """Recent jobs without their results, newest first."""
+        with self.condition:
+            return [{key: value for key, value in job.items() if key != 'result'} for job in reversed(self.jobs.values())]
+
+    def depth(self):
+        with self.condition:
+            return len(self.pending)
+
+    def trim(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job['status'] in ('done', 'failed')]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
+
+def consolidate(datasets):
+    """Bring the consolidated files of the refreshed datasets up to date."""
+    for data_type in datasets:
+        if data_type == 'orders':
+            order_files = [os.path.join(pipeline.get_account_download_dir(account), f"{account}_orders_cleaned.csv")
+                           for account in pipeline.SUB_ACCOUNTS]
+            pipeline.consolidate_csvs("orders", [path for path in order_files if os.path.exists(path)])
+        elif data_type in pipeline.CONSOLIDATED_DATA_TYPES:
+            pipeline.consolidate_csvs(data_type, pipeline.collect_dataset_files(data_type))
+
+class BrowserWorker(threading.Thread):
+    """Owns the WebDriver: runs queued jobs one at a time and keeps the session alive while idle."""
+
+    def __init__(self, jobs, keepalive_interval):
+        super().__init__(name="browser", daemon=True)
+        self.jobs = jobs
+        self.keepalive_interval = keepalive_interval
+        self.stop_event = threading.Event()
+        self.state = 'starting'
+        self.current_job = None
+        self.last_activity = 0.0
+        self.last_keepalive = None
+        self.pool = None
+
+    def run(self):
+        self.pool = pipeline.create_postprocess_pool()
+        try:
+            self.start_browser()
+            while not self.stop_event.is_set():
+                job = self.jobs.take(timeout=1)
+                if job:
+                    self.run_job(job)
+                elif time.time() - self.last_activity >= self.keepalive_interval:
+                    self.keepalive()
+        except Exception as e:
+            self.state = 'failed'
+            logging.error("Browser worker stopped: %s", e, exc_info=True)
+            self.jobs.fail_pending(f"Browser worker stopped: {str(e)}")
+        finally:
+            self.pool.shutdown(wait=True)
+            self.close_browser()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def start_browser(self):
+        os.makedirs(pipeline.CONFIG['download_base_dir'], exist_ok=True)
+        pipeline.init_driver(pipeline.CONFIG['download_base_dir'])
+        pipeline.ensure_session()
+        self.last_activity = time.time()
+        self.state = 'ready'
+        logging.info("Daemon browser is logged in and waiting for jobs")
+
+    def close_browser(self):
+        try:
+            pipeline.quit_driver()
+        except Exception as e:
+            logging.warning("Could not close the browser cleanly: %s", e)
+            pipeline.driver = pipeline.wait = None
+
+    def ensure_browser(self):
+        """Make sure the browser is alive and logged in, logging in again or restarting it if needed."""
+        try:
+            if pipeline.session_is_valid():
+                return
+            logging.info("Daemon session expired, logging in again")
+            pipeline.ensure_session()
+        except WebDriverException as e:
+            logging.warning("Browser is not responding, restarting it: %s", e)
+            self.close_browser()
+            self.start_browser()
+
+    def keepalive(self):
+        """Load the dashboard so the portal does not log the idle session out."""
+        with tracing.span("keepalive"):
+            try:
+                self.ensure_browser()
+                self.last_keepalive = time.time()
+            except Exception as e:
+                logging.error("Keep-alive failed: %s", e, exc_info=True)
+        self.last_activity = time.time()
+
+    def execute(self, job, previous=None):
+        """Run the job's part of ACCOUNT_FLOW from the dashboard and return the finished flow run.
+
+        With the run of a previous attempt, only its failed steps (and what they need) run again.
+        """
+        account = job['account']
+        # The last job may have left the browser on a page without the equity menus (e.g. the old MF site)
+        self.ensure_browser()
+        pipeline.set_download_dir(pipeline.get_account_download_dir(account))
+        steps = flow_scheduler.select(pipeline.ACCOUNT_FLOW, job['datasets'])
+        reuse = flow_scheduler.retry_results(steps, previous) if previous else None
+        run = flow_scheduler.run_flow(steps, account, self.pool, reuse)
+        run.wait()
+        if not run.errors():
+            consolidate(job['datasets'])
+        return run
+
+    def run_job(self, job):
+        self.state, self.current_job = 'busy', job['id']
+        logging.info("Running job %s: %s for account %s", job['id'], ', '.join(job['datasets']), job['account'])
+        with tracing.span("job", account=job['account']):
+            try:
+                run = self.execute(job)
+                if run.errors():
+                    logging.warning("Job %s had failed steps %s; retrying them once", job['id'], run.errors())
+                    run = self.execute(job, run)
+                self.jobs.finish(job, run.wait(), run.errors() or None)
+            except Exception as e:
+                logging.error("Job %s failed: %s", job['id'], e, exc_info=True)
+                self.jobs.finish(job, error=str(e))
+        locator_registry.save()
+        pipeline.export_trace(f"_daemon_{job['id']}")
+        tracing.reset()  # Each job's trace (with the keep-alives before it) is exported once, not kept for the daemon's lifetime
+        logging.info("Job %s finished in %.2fs", job['id'], time.time() - job['started_at'])
+        self.state, self.current_job = 'ready', None
+        self.last_activity = time.time()
+
+    def health(self):
+        return {'state': self.state, 'current_job': self.current_job, 'queued': self.jobs.depth(),
+                'last_keepalive': self.last_keepalive, 'idle_seconds': round(time.time() - self.last_activity, 1)}
+
+class JobHandler(BaseHTTPRequestHandler):
+    server_version = 'ICICIDaemon/1.0'
+
+    def log_message(self, fmt, *args):
+        logging.debug("daemon api: " + fmt, *args)
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def authorized(self):
+        token = self.server.token
+        if token and self.headers.get('Authorization') != f"Bearer {token}":
+            self.send_json(401, {'error': 'Missing or wrong bearer token'})
+            return False
+        return True
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length).decode('utf-8') or '{}') if length else {}
+
+    def do_GET(self):
+        if not self.authorized():
+            return
+        path = urlparse(self.path).path.rstrip('/')
+        if path == '/health':
+            return self.send_json(200, self.server.worker.health())
+        if path == '/jobs':
+            return self.send_json(200, self.server.jobs.summary())
+        if path.startswith('/jobs/'):
+            job = self.server.jobs.get(path[len('/jobs/'):])
+            return self.send_json(200, job) if job else self.send_json(404, {'error': 'Unknown job'})
+        self.send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if not self.authorized():
+            return
+        path = urlparse(self.path).path.rstrip('/')
+        if path == '/shutdown':
+            self.send_json(202, {'status': 'stopping'})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        if path != '/jobs':
+            return self.send_json(404, {'error': 'Not found'})
+        try:
+            body = self.read_json()
+        except ValueError as e:
+            return self.send_json(400, {'error': f"Invalid JSON: {str(e)}"})
+        account = body.get('account')
+        datasets = body.get('datasets') or list(pipeline.DATASETS)
+        if account not in pipeline.SUB_ACCOUNTS:
+            return self.send_json(400, {'error': f"Unknown account {account}", 'accounts': pipeline.SUB_ACCOUNTS})
+        unknown = [name for name in datasets if name not in pipeline.DATASETS]
+        if unknown:
+            return self.send_json(400, {'error': f"Unknown datasets {unknown}", 'datasets': pipeline.DATASETS})
+        if self.server.worker.state == 'failed':
+            return self.send_json(503, {'error': 'Browser worker is not running'})
+        job, created = self.server.jobs.submit(account, datasets)
+        wait_seconds = float(body.get('wait') or 0)
+        if wait_seconds:
+            job = self.server.jobs.wait(job['id'], wait_seconds)
+        self.send_json(202 if job['status'] in ('queued', 'running') else 200, dict(job, coalesced=not created))
+
+def serve(host, port, token, keepalive_interval):
+    """Start the browser worker and serve the job API until shut down."""
+    tracing.enable(pipeline.CONFIG['tracing'], pipeline.CONFIG['daemon_max_spans'])  # Bounds the keep-alive spans of an idle daemon
+    locator_registry.load(pipeline.CONFIG['locator_stats_file'])
+    jobs = JobQueue()
+    worker = BrowserWorker(jobs, keepalive_interval)
+    server = ThreadingHTTPServer((host, port), JobHandler)
+    server.daemon_threads = True
+    server.jobs, server.worker, server.token = jobs, worker, token
+    worker.start()
+    logging.info("Daemon listening on http://%s:%s", host, server.server_address[1])
+    print(f"ICICI extraction daemon listening on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        worker.stop()
+        worker.join()
+        locator_registry.save()
+        pipeline.export_trace("_daemon")
+        logging.info("Daemon stopped")
+
+def request(method, url, token, payload=None, timeout=None):
+    """Call the job API and return (HTTP status, decoded JSON)."""
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f"Bearer {token}"
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data, method=method, headers=headers), timeout=timeout) as response:
+            return response.status, json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read().decode('utf-8') or '{}')
+
+def main():
+    """Run the daemon: python daemon.py serve; refresh data: python daemon.py submit --account <id> --datasets orders --wait 120"""
+    parser = argparse.ArgumentParser(description="Keep a logged-in browser running and extract data on request.")
+    parser.add_argument('--host', default=pipeline.CONFIG['daemon_host'])
+    parser.add_argument('--port', type=int, default=pipeline.CONFIG['daemon_port'])
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help="Start the daemon")
+    serve_parser.add_argument('--tenant', help="Serve a tenant of CONFIG['tenants_file'] instead of the .env login")
+    serve_parser.add_argument('--keepalive', type=float, default=pipeline.CONFIG['keepalive_interval'],
+                              help="Seconds of idleness after which the session is refreshed")
+    submit_parser = commands.add_parser('submit', help="Queue a job")
+    submit_parser.add_argument('--account', required=True)
+    submit_parser.add_argument('--datasets', nargs='*', help=f"Any of {pipeline.DATASETS} (default: all)")
+    submit_parser.add_argument('--wait', type=float, default=0, help="Seconds to wait for the job to finish")
+    status_parser = commands.add_parser('status', help="Show the daemon health, the recent jobs or one job")
+    status_parser.add_argument('job_id', nargs='?')
+    commands.add_parser('stop', help="Stop the daemon")
+    args = parser.parse_args()
+
+    base_url = f"http://{args.host}:{args.port}"
+    token = pipeline.CONFIG['daemon_token']
+    if args.command == 'serve':
+        if args.tenant:
+            tenant = next((t for t in tenants.load_registry(pipeline.CONFIG['tenants_file'], pipeline.DATASETS)
+                           if t['id'] == args.tenant), None)
+            if tenant is None:
+                parser.error(f"Tenant {args.tenant} is not an enabled tenant in {pipeline.CONFIG['tenants_file']}")
+            pipeline.apply_tenant(tenant)
+            os.makedirs(os.path.dirname(pipeline.CONFIG['log_file']), exist_ok=True)
+        pipeline.configure_logging(pipeline.CONFIG['log_file'])
+        serve(args.host, args.port, token, args.keepalive)
+        return
+    if args.command == 'submit':
+        status, payload = request('POST', f"{base_url}/jobs", token,
+                                  {'account': args.account, 'datasets': args.datasets, 'wait': args.wait},
+                                  timeout=args.wait + 30)
+    elif args.command == 'status':
+        path = f"/jobs/{args.job_id}" if args.job_id else "/health"
+        status, payload = request('GET', base_url + path, token, timeout=30)
+        if not args.job_id and status == 200:
+            payload = {'health': payload, 'jobs': request('GET', f"{base_url}/jobs", token, timeout=30)[1]}
+    else:
+        status, payload = request('POST', f"{base_url}/shutdown", token, timeout=30)
+    print(json.dumps(payload, indent=2, default=str))
+    if status >= 400 or (isinstance(payload, dict) and payload.get('status') == 'failed'):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
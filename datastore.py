@@ -0,0 +1,166 @@
+import os
+import csv
+import json
+import sqlite3
+import logging
+import argparse
+from datetime import date, datetime
+from glob import glob
+from tabulate import tabulate
+from incremental_sync import parse_date, row_key
+
+# Data type -> (table, is_snapshot). Snapshot tables keep one copy of each row per snapshot date.
+DATASETS = {
+    'tradebook': ('trades', False),
+    'orderbook': ('mf_orders', False),
+    'portfolio': ('holdings', True),
+    'myportfolio': ('mf_holdings', True),
+    'orders': ('gtt_orders', True),
+}
+
+SYMBOL_COLUMNS = ('stock', 'symbol', 'stock code', 'scrip', 'scrip name', 'company', 'scheme', 'scheme name')
+
+def connect(db_path):
+    """Open the datastore, creating the tables and indexes on first use."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")  # Parallel workers ingest concurrently
+    for table, _ in DATASETS.values():
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                account_id TEXT NOT NULL,
+                snapshot_date TEXT NOT NULL DEFAULT '',
+                row_hash TEXT NOT NULL,
+                symbol TEXT,
+                trade_date TEXT,
+                data TEXT NOT NULL,
+                source_file TEXT,
+                ingested_at TEXT,
+                PRIMARY KEY (account_id, snapshot_date, row_hash)
+            )""")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_symbol_date ON {table} (symbol, trade_date)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_date ON {table} (trade_date)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_account_date ON {table} (account_id, trade_date)")
+    return conn
+
+def find_column(headers, candidates):
+    """Index of the first header whose lowercase name is one of the candidates, or None."""
+    for idx, header in enumerate(headers):
+        if header.strip().lower() in candidates:
+            return idx
+    return None
+
+def ingest_csv(conn, csv_path, account_id, data_type, snapshot_date=None):
+    """Upsert the rows of a CSV into the table of its data type; returns the number of new rows."""
+    table, is_snapshot = DATASETS[data_type]
+    snapshot = (snapshot_date or date.today()).isoformat() if is_snapshot else ''
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        headers = next(reader, None)
+        if not headers:
+            return 0
+        symbol_idx = find_column(headers, SYMBOL_COLUMNS)
+        date_idx = next((idx for idx, header in enumerate(headers) if 'date' in header.lower()), None)
+        now = datetime.now().isoformat(timespec='seconds')
+        records, seen = [], {}  # Identical rows of one file get their own row_hash; see row_key()
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            symbol = row[symbol_idx].strip().upper() if symbol_idx is not None and len(row) > symbol_idx else None
+            row_date = parse_date(row[date_idx]) if date_idx is not None and len(row) > date_idx else None
+            records.append((
+                account_id, snapshot, row_key(row, seen), symbol,
+                row_date.isoformat() if row_date else None,
+                json.dumps(dict(zip(headers, row)), ensure_ascii=False),
+                os.path.basename(csv_path), now,
+            ))
+    before = conn.total_changes
+    with conn:
+        conn.executemany(f"""
+            INSERT INTO {table} (account_id, snapshot_date, row_hash, symbol, trade_date, data, source_file, ingested_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (account_id, snapshot_date, row_hash) DO NOTHING""", records)
+    added = conn.total_changes - before
+    logging.info("Ingested %s new of %s %s rows from %s into %s", added, len(records), data_type, csv_path, table)
+    return added
+
+def ingest_directory(conn, base_dir):
+    """Backfill the datastore from every stored CSV under the download directory."""
+    total = 0
+    for account_dir in sorted(glob(os.path.join(base_dir, '*', ''))):
+        account_id = os.path.basename(os.path.dirname(account_dir))
+        for data_type in DATASETS:
+            pattern = f"{account_id}_orders_cleaned.csv" if data_type == 'orders' else f"{account_id}_{data_type}_*.csv"
+            for path in sorted(glob(os.path.join(account_dir, pattern))):
+                snapshot = date.fromtimestamp(os.path.getmtime(path))
+                total += ingest_csv(conn, path, account_id, data_type, snapshot)
+    return total
+
+def query(conn, data_type, account=None, symbol=None, since=None, until=None, limit=None):
+    """Return (headers, rows) of stored records filtered by account, symbol and date range."""
+    table, _ = DATASETS[data_type]
+    clauses, params = [], []
+    if account and account.count('-') >= 3:
+        clauses.append("account_id = ?")
+        params.append(account)
+    elif account:
+        clauses.append("account_id LIKE ?")
+        params.append(f"%{account}%")
+    if symbol:
+        clauses.append("symbol = ?")
+        params.append(symbol.upper())
+    if since:
+        clauses.append("trade_date >= ?")
+        params.append(since)
+    if until:
+        clauses.append("trade_date <= ?")
+        params.append(until)
+    sql = f"SELECT account_id, snapshot_date, data FROM {table}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY trade_date, account_id"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    records = [(account_id, snapshot, json.loads(data)) for account_id, snapshot, data in conn.execute(sql, params)]
+    columns = []
+    for _, _, data in records:
+        columns.extend(column for column in data if column not in columns)
+    headers = ['Account ID'] + (['Snapshot'] if DATASETS[data_type][1] else []) + columns
+    rows = [[account_id] + ([snapshot] if DATASETS[data_type][1] else []) + [data.get(column, '') for column in columns]
+            for account_id, snapshot, data in records]
+    return headers, rows
+
+def main():
+    """Query CLI: python datastore.py query tradebook --symbol INFY --since 2025-04-01"""
+    parser = argparse.ArgumentParser(description="Query the local ICICI Direct datastore.")
+    parser.add_argument('--db', default=os.path.abspath(os.path.join("downloads", "icici.db")), help="SQLite database path")
+    commands = parser.add_subparsers(dest='command', required=True)
+    query_parser = commands.add_parser('query', help="List stored rows")
+    query_parser.add_argument('data_type', choices=sorted(DATASETS))
+    query_parser.add_argument('--account', help="Account ID or part of it, e.g. NRO or 6500081466")
+    query_parser.add_argument('--symbol', help="Stock or scheme symbol, e.g. INFY")
+    query_parser.add_argument('--since', help="First date (YYYY-MM-DD)")
+    query_parser.add_argument('--until', help="Last date (YYYY-MM-DD)")
+    query_parser.add_argument('--limit', type=int)
+    sql_parser = commands.add_parser('sql', help="Run a raw SQL statement")
+    sql_parser.add_argument('statement')
+    ingest_parser = commands.add_parser('ingest', help="Backfill from the stored CSVs")
+    ingest_parser.add_argument('--base-dir', default=os.path.abspath("downloads"))
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    try:
+        if args.command == 'query':
+            headers, rows = query(conn, args.data_type, args.account, args.symbol, args.since, args.until, args.limit)
+            print(tabulate(rows, headers=headers, tablefmt="grid", stralign="left"))
+            print(f"{len(rows)} rows")
+        elif args.command == 'sql':
+            cursor = conn.execute(args.statement)
+            headers = [column[0] for column in cursor.description or []]
+            print(tabulate(cursor.fetchall(), headers=headers, tablefmt="grid", stralign="left"))
+        elif args.command == 'ingest':
+            print(f"Ingested {ingest_directory(conn, args.base_dir)} new rows")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
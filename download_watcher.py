@@ -0,0 +1,100 @@
+import os
+import time
+import logging
+import threading
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # watchdog is optional, fall back to polling
+    Observer = None
+    FileSystemEventHandler = object
+
+# Suffixes Chrome uses while a download is still being written
+PARTIAL_SUFFIXES = ('.crdownload', '.tmp', '.part')
+
+class _ChangeHandler(FileSystemEventHandler):
+    """Wake the waiting thread on any change in the watched directory."""
+
+    def __init__(self, changed):
+        self.changed = changed
+
+    def on_any_event(self, event):
+        self.changed.set()
+
+def start_observer(directory, changed):
+    """Start a filesystem observer (inotify on Linux) that sets `changed` on every event, or return None."""
+    if Observer is None:
+        return None
+    try:
+        observer = Observer()
+        observer.schedule(_ChangeHandler(changed), directory, recursive=False)
+        observer.start()
+        return observer
+    except Exception as e:
+        logging.warning("Filesystem watcher unavailable for %s, polling instead: %s", directory, e)
+        return None
+
+def find_candidates(directory, partial_name, since, exclude_prefix=None):
+    """Return finished CSVs in the directory whose name contains partial_name and that were written after since.
+
+    Names starting with exclude_prefix are files the caller wrote itself, not browser downloads.
+    """
+    partial = partial_name.lower()
+    names = os.listdir(directory)
+    in_progress = {name[:-len(suffix)] for name in names for suffix in PARTIAL_SUFFIXES if name.endswith(suffix)}
+    candidates = []
+    for name in names:
+        lower = name.lower()
+        if not lower.endswith('.csv') or partial not in lower or name in in_progress:
+            continue
+        if exclude_prefix and name.startswith(exclude_prefix):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) >= since:
+                candidates.append(path)
+        except OSError:
+            continue  # Renamed or removed between listdir and stat
+    return candidates
+
+def wait_for_new_file(directory, partial_name, since, timeout=30, settle=0.3, poll=0.2, exclude_prefix=None):
+    """Wait for a CSV written after `since` to finish downloading and return its path.
+
+    A file counts as finished once no partial download exists for it and its size has been
+    stable and non-zero for `settle` seconds. Directory events wake the wait immediately when
+    watchdog is installed; otherwise the directory is polled every `poll` seconds. Files named
+    with `exclude_prefix` are ignored.
+    """
+    changed = threading.Event()
+    observer = start_observer(directory, changed)
+    deadline = time.time() + timeout
+    sizes = {}
+    try:
+        while True:
+            changed.clear()  # Cleared before scanning so events during the scan still wake the next wait
+            now = time.time()
+            for path in find_candidates(directory, partial_name, since, exclude_prefix):
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    continue
+                seen = sizes.get(path)
+                if seen and seen[0] == size and size > 0 and now - seen[1] >= settle:
+                    logging.info("Download complete: %s (%s bytes)", path, size)
+                    return path
+                if not seen or seen[0] != size:
+                    sizes[path] = (size, now)
+            if now >= deadline:
+                raise TimeoutError(f"No completed file matching {partial_name} in {directory} after {timeout} seconds")
+            if sizes:
+                wait_time = settle
+            elif observer is not None:
+                wait_time = deadline - now
+            else:
+                wait_time = poll
+            changed.wait(min(wait_time, max(deadline - now, 0)))
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
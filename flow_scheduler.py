@@ -0,0 +1,202 @@
+import time
+import logging
+import threading
+from concurrent.futures import Future
+
+# A flow is a list of step dicts:
+#   name        unique step name
+#   run         callable invoked as run(account, *inputs, **kwargs)
+#   after       names of the steps that must have succeeded first
+#   inputs      names (from `after`) whose results are passed to run, in order
+#   kwargs      extra keyword arguments for run
+#   accounts    optional list of accounts the step applies to; other accounts skip it
+#   background  True to run on the post-processing pool instead of the calling (browser) thread
+#   dataset     optional dataset the step produces; see select()
+# Browser steps run in declaration order on the calling thread, so the driver is never shared.
+# Background steps start as soon as their dependencies have finished, while the browser moves on.
+
+SKIPPED = object()
+
+def validate(steps):
+    """Check names and dependencies and return the steps in a dependency-respecting order.
+
+    Declaration order is kept wherever the dependencies allow it.
+    """
+    names = [step['name'] for step in steps]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate step names in flow: {names}")
+    by_name = {step['name']: step for step in steps}
+    for step in steps:
+        for dep in step.get('after', []) + step.get('inputs', []):
+            if dep not in by_name:
+                raise ValueError(f"Step {step['name']} depends on unknown step {dep}")
+    ordered, done = [], set()
+    remaining = list(steps)
+    while remaining:
+        ready = next((step for step in remaining if set(dependencies(step)) <= done), None)
+        if ready is None:
+            raise ValueError(f"Flow has a dependency cycle among {[step['name'] for step in remaining]}")
+        ordered.append(ready)
+        done.add(ready['name'])
+        remaining.remove(ready)
+    return ordered
+
+def dependencies(step):
+    return list(dict.fromkeys(step.get('after', []) + step.get('inputs', [])))
+
+def select(steps, datasets):
+    """Steps of the enabled datasets, steps without a dataset, and every step these depend on.
+
+    A dependency of another dataset is kept for its side effects (e.g. the navigation it performs);
+    only its own background steps are dropped.
+    """
+    by_name = {step['name']: step for step in steps}
+    pending = [step['name'] for step in steps if step.get('dataset') is None or step['dataset'] in datasets]
+    keep = set()
+    while pending:
+        name = pending.pop()
+        if name not in keep:
+            keep.add(name)
+            pending.extend(dep for dep in dependencies(by_name[name]) if dep in by_name)
+    return [step for step in steps if step['name'] in keep]
+
+class FlowRun:
+    """Results of one flow run; background steps may still be running until wait() returns."""
+
+    def __init__(self, account):
+        self.account = account
+        self.futures = {}
+        self.lock = threading.Lock()
+
+    def future(self, name):
+        with self.lock:
+            return self.futures.setdefault(name, Future())
+
+    def wait(self):
+        """Block until every step has finished and return {step name: result}; failed or skipped steps map to None."""
+        results = {}
+        for name, future in list(self.futures.items()):
+            try:
+                result = future.result()
+            except Exception:
+                result = None
+            results[name] = None if result is SKIPPED else result
+        return results
+
+    def errors(self):
+        """{step name: error message} of the steps that failed so far."""
+        return {name: f"{type(future.exception()).__name__}: {future.exception()}"
+                for name, future in list(self.futures.items()) if future.done() and future.exception() is not None}
+
+def execute(step, account, inputs, future):
+    """Run one step and settle its future with the result or the error."""
+    start = time.time()
+    try:
+        future.set_result(step['run'](account, *inputs, **step.get('kwargs', {})))
+    except Exception as e:
+        logging.error("Step %s failed for account %s: %s", step['name'], account, e)
+        future.set_exception(e)
+    else:
+        if step.get('background'):
+            logging.info("Background step %s for account %s took %.2fs", step['name'], account, time.time() - start)
+
+def resolve(run, step):
+    """Inputs of a step from its settled dependencies, or None if a dependency failed or was skipped."""
+    for dep in dependencies(step):
+        future = run.future(dep)
+        if future.exception() is not None or future.result() is SKIPPED:
+            return None
+    return [run.future(dep).result() for dep in step.get('inputs', [])]
+
+def skip(run, step, reason):
+    logging.info("Skipping step %s for account %s: %s", step['name'], run.account, reason)
+    run.future(step['name']).set_result(SKIPPED)
+
+def schedule_background(run, step, pool):
+    """Submit a background step to the pool once all of its dependencies have settled."""
+    deps = [run.future(dep) for dep in dependencies(step)]
+    pending = {'count': len(deps)}
+    lock = threading.Lock()
+
+    def submit(_=None):
+        inputs = resolve(run, step)
+        if inputs is None:
+            skip(run, step, "a dependency failed or was skipped")
+            return
+        pool.submit(execute, step, run.account, inputs, run.future(step['name']))
+
+    def on_done(_):
+        with lock:
+            pending['count'] -= 1
+            last = pending['count'] == 0
+        if last:
+            submit()
+
+    if not deps:
+        submit()
+    for dep in deps:
+        dep.add_done_callback(on_done)
+
+def filtered(step, account):
+    return step.get('accounts') is not None and account not in step['accounts']
+
+def retry_results(steps, previous):
+    """Results of a finished run that a retry of the same steps can keep, as {step name: result}.
+
+    Failed steps and the steps skipped because of them run again, together with the browser steps they
+    depend on (those set up the page and account the step starts from) and the steps taking any of
+    these as inputs. Everything else keeps its result instead of being downloaded again.
+    """
+    by_name = {step['name']: step for step in steps}
+    rerun = set()
+    for name, future in previous.futures.items():
+        if future.exception() is not None or (future.result() is SKIPPED and not filtered(by_name[name], previous.account)):
+            rerun.add(name)
+    grown = True
+    while grown:
+        grown = False
+        for step in steps:
+            needed = set()
+            if step['name'] in rerun and not step.get('background'):
+                needed.update(dep for dep in dependencies(step) if not by_name[dep].get('background'))
+            if step['name'] not in rerun and any(name in rerun for name in step.get('inputs', [])):
+                needed.add(step['name'])
+            if needed - rerun:
+                rerun |= needed
+                grown = True
+    return {name: future.result() for name, future in previous.futures.items() if name not in rerun}
+
+def run_flow(steps, account, pool, reuse=None):
+    """Run a flow for one account: browser steps now, in order; background steps on the pool.
+
+    Returns a FlowRun as soon as the last browser step finished; call wait() for the background results.
+    A failed step skips its dependents but not the independent steps after it. Steps named in `reuse`
+    are not run; their given results stand in for them (see retry_results()).
+    """
+    run = FlowRun(account)
+    ordered = validate(steps)
+    reuse = reuse or {}
+    for step in ordered:
+        run.future(step['name'])
+    for step in ordered:
+        if step['name'] in reuse:
+            run.future(step['name']).set_result(reuse[step['name']])
+            continue
+        if filtered(step, account):
+            skip(run, step, "not enabled for this account")
+            continue
+        if step.get('background'):
+            schedule_background(run, step, pool)
+            continue
+        # Browser steps wait for any background dependency; browser dependencies are already settled
+        for dep in dependencies(step):
+            try:
+                run.future(dep).result()
+            except Exception:
+                pass
+        inputs = resolve(run, step)
+        if inputs is None:
+            skip(run, step, "a dependency failed or was skipped")
+            continue
+        execute(step, account, inputs, run.future(step['name']))
+    return run
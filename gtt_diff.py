@@ -0,0 +1,178 @@
+import os
+import json
+import logging
+import argparse
+from glob import glob
+from datetime import datetime
+from tabulate import tabulate
+
+# Change history of one account's GTT order book, kept in a directory:
+#   changes.jsonl          one line per run that changed anything:
+#                          {"seq", "at", "added": [row, ...], "removed": [key, ...], "changed": [{"key", "fields": {column: [old, new]}}]}
+#   checkpoint_<seq>.json  full snapshot after change <seq>: {"seq", "at", "log_offset", "rows": {key: row}}
+# The latest snapshot is the newest checkpoint with the changes after its log_offset replayed on top, so
+# loading it reads at most checkpoint_every log lines. Rows are keyed by the key columns; a key that occurs
+# several times in one extraction gets a "#2", "#3", ... suffix in order of appearance.
+
+CHECKPOINTS_KEPT = 3
+LOG_NAME = "changes.jsonl"
+
+def keyed_rows(headers, rows, key_columns, ignore_columns=()):
+    """Order Book rows as {key: {column: value}} without the ignored (volatile) columns."""
+    columns = [column for column in headers if column not in ignore_columns]
+    key_columns = [column for column in key_columns if column in headers]
+    if not key_columns:
+        logging.warning("None of the GTT key columns are in %s, keying rows by their full content", headers)
+        key_columns = columns
+    positions = [headers.index(column) for column in key_columns]
+    column_positions = [(column, headers.index(column)) for column in columns]
+    keyed, seen = {}, {}
+    for row in rows:
+        cells = [cell.strip() for cell in row] + [''] * (len(headers) - len(row))
+        key = ' | '.join(cells[position] for position in positions)
+        seen[key] = seen.get(key, 0) + 1
+        if seen[key] > 1:
+            key = f"{key} #{seen[key]}"
+        keyed[key] = {column: cells[position] for column, position in column_positions}
+    return keyed
+
+def diff(old, new):
+    """Rows added, keys removed and fields changed between two keyed snapshots, in one pass over each."""
+    added = [dict(row, _key=key) for key, row in new.items() if key not in old]
+    removed = [key for key in old if key not in new]
+    changed = []
+    for key, row in new.items():
+        previous = old.get(key)
+        if previous is None or previous == row:
+            continue
+        fields = {column: [previous.get(column, ''), value] for column, value in row.items() if previous.get(column, '') != value}
+        fields.update({column: [value, ''] for column, value in previous.items() if column not in row})
+        changed.append({'key': key, 'fields': fields})
+    return {'added': added, 'removed': removed, 'changed': changed}
+
+def apply(snapshot, change):
+    """Replay one change log entry onto a keyed snapshot in place."""
+    for row in change['added']:
+        row = dict(row)
+        snapshot[row.pop('_key')] = row
+    for key in change['removed']:
+        snapshot.pop(key, None)
+    for item in change['changed']:
+        row = snapshot.setdefault(item['key'], {})
+        for column, (_, value) in item['fields'].items():
+            row[column] = value
+    return snapshot
+
+def checkpoints(history_dir):
+    """Checkpoint files, oldest first."""
+    return sorted(glob(os.path.join(history_dir, "checkpoint_*.json")),
+                  key=lambda path: int(os.path.basename(path)[len("checkpoint_"):-len(".json")]))
+
+def read_changes(history_dir, offset=0):
+    """Change log entries from a byte offset on, with the offset after the last one."""
+    path = os.path.join(history_dir, LOG_NAME)
+    if not os.path.exists(path):
+        return [], 0
+    entries = []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if line.strip():
+                entries.append(json.loads(line))
+        return entries, f.tell()
+
+def load_snapshot(history_dir):
+    """Latest keyed snapshot as (seq, rows, changes since its checkpoint); (0, None, 0) before the first run."""
+    files = checkpoints(history_dir)
+    if not files:
+        return 0, None, 0
+    with open(files[-1], 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    snapshot, seq = checkpoint['rows'], checkpoint['seq']
+    entries, _ = read_changes(history_dir, checkpoint['log_offset'])
+    for entry in entries:
+        apply(snapshot, entry)
+        seq = entry['seq']
+    return seq, snapshot, len(entries)
+
+def write_checkpoint(history_dir, seq, snapshot, log_offset):
+    path = os.path.join(history_dir, f"checkpoint_{seq}.json")
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'seq': seq, 'at': datetime.now().isoformat(timespec='seconds'), 'log_offset': log_offset, 'rows': snapshot}, f)
+    os.replace(path + '.tmp', path)
+    for old_path in checkpoints(history_dir)[:-CHECKPOINTS_KEPT]:
+        os.remove(old_path)
+
+class ChangeLog:
+    """Change history of one account, loaded once and kept in memory for repeated recording (e.g. watch mode)."""
+
+    def __init__(self, history_dir, key_columns, ignore_columns=(), checkpoint_every=50):
+        os.makedirs(history_dir, exist_ok=True)
+        self.history_dir = history_dir
+        self.log_path = os.path.join(history_dir, LOG_NAME)
+        self.key_columns = key_columns
+        self.ignore_columns = ignore_columns
+        self.checkpoint_every = checkpoint_every
+        self.seq, self.snapshot, self.since_checkpoint = load_snapshot(history_dir)
+
+    def record(self, headers, rows):
+        """Diff an extraction against the current state, append the change and checkpoint periodically.
+
+        Returns the change log entry, or None if nothing changed (or this is the first, baseline run).
+        """
+        current = keyed_rows(headers, rows, self.key_columns, self.ignore_columns)
+        if self.snapshot is None:
+            write_checkpoint(self.history_dir, self.seq, current, os.path.getsize(self.log_path) if os.path.exists(self.log_path) else 0)
+            logging.info("Stored GTT baseline of %s orders in %s", len(current), self.history_dir)
+            self.snapshot = current
+            return None
+        change = diff(self.snapshot, current)
+        if not any(change.values()):
+            return None
+        change = dict(seq=self.seq + 1, at=datetime.now().isoformat(timespec='seconds'), **change)
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(change, separators=(',', ':')) + '\n')
+        self.seq, self.snapshot = change['seq'], current
+        self.since_checkpoint += 1
+        if self.since_checkpoint >= self.checkpoint_every:
+            write_checkpoint(self.history_dir, self.seq, current, os.path.getsize(self.log_path))
+            self.since_checkpoint = 0
+        return change
+
+def record(history_dir, headers, rows, key_columns, ignore_columns=(), checkpoint_every=50):
+    """Record one extraction in an account's change history; see ChangeLog.record()."""
+    return ChangeLog(history_dir, key_columns, ignore_columns, checkpoint_every).record(headers, rows)
+
+def main():
+    """GTT change log CLI: python gtt_diff.py changes downloads/<account_id>/gtt --since 10"""
+    parser = argparse.ArgumentParser(description="Show the GTT order changes recorded for an account.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    changes_parser = commands.add_parser('changes', help="List recorded changes")
+    changes_parser.add_argument('history_dir')
+    changes_parser.add_argument('--since', type=int, default=0, help="Only changes after this sequence number")
+    snapshot_parser = commands.add_parser('snapshot', help="Show the latest reconstructed snapshot")
+    snapshot_parser.add_argument('history_dir')
+    args = parser.parse_args()
+
+    if args.command == 'changes':
+        rows = []
+        for entry in read_changes(args.history_dir)[0]:
+            if entry['seq'] <= args.since:
+                continue
+            rows += [[entry['seq'], entry['at'], 'added', row['_key'], ''] for row in entry['added']]
+            rows += [[entry['seq'], entry['at'], 'removed', key, ''] for key in entry['removed']]
+            rows += [[entry['seq'], entry['at'], 'changed', item['key'],
+                      ', '.join(f"{column}: {old} -> {new}" for column, (old, new) in item['fields'].items())]
+                     for item in entry['changed']]
+        print(tabulate(rows, headers=['Seq', 'At', 'Change', 'Order', 'Fields'], tablefmt="grid", stralign="left"))
+        print(f"{len(rows)} changes")
+    else:
+        seq, snapshot, _ = load_snapshot(args.history_dir)
+        snapshot = snapshot or {}
+        columns = list(dict.fromkeys(column for row in snapshot.values() for column in row))
+        print(tabulate([[row.get(column, '') for column in columns] for row in snapshot.values()],
+                       headers=columns, tablefmt="grid", stralign="left"))
+        print(f"{len(snapshot)} orders as of change {seq}")
+
+if __name__ == "__main__":
+    main()
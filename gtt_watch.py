@@ -0,0 +1,191 @@
+import time
+import logging
+import argparse
+from datetime import datetime
+from selenium.common.exceptions import WebDriverException
+from table_extract import extract_table
+
+# Installs (once per table) a MutationObserver that collects the <tbody> rows whose content or classes changed.
+# Rows being added or removed is flagged separately, since it shifts the row positions Python holds.
+WATCH_SCRIPT = """
+var table = arguments[0];
+var state = window.__gttWatch;
+if (state && state.table === table && document.contains(table)) { return false; }
+if (state && state.observer) { state.observer.disconnect(); }
+state = window.__gttWatch = {table: table, dirty: new Set(), structural: false, waiter: null};
+function rowOf(node) {
+    var el = node.nodeType === 1 ? node : node.parentElement;
+    var tr = el && el.closest('tr');
+    return tr && tr.parentElement && tr.parentElement.tagName === 'TBODY' && table.contains(tr) ? tr : null;
+}
+state.observer = new MutationObserver(function(mutations) {
+    for (var i = 0; i < mutations.length; i++) {
+        var target = mutations[i].target;
+        if (mutations[i].type === 'childList' && (target === table || target.tagName === 'TBODY')) {
+            state.structural = true;
+            continue;
+        }
+        var tr = rowOf(target);
+        if (tr) { state.dirty.add(tr); }
+    }
+    if (state.waiter && (state.dirty.size || state.structural)) { state.waiter(); }
+});
+// Attribute changes count too: a status shown by toggling a row's class, or cells hidden and shown,
+// change what a pull reads (row class and visible cell texts) without touching any text node
+state.observer.observe(table, {subtree: true, childList: true, characterData: true,
+                               attributes: true, attributeFilter: ['class', 'style', 'hidden']});
+return true;
+"""
+
+# Asynchronous pull: answers at once if rows changed since the last pull, otherwise as soon as one does,
+# or empty after waitMs. At most maxRows rows are returned; the rest stay collected for the next pull.
+DRAIN_SCRIPT = """
+var maxRows = arguments[0], waitMs = arguments[1], done = arguments[arguments.length - 1];
+var state = window.__gttWatch, timer = null;
+function text(el) {
+    return el.getClientRects().length ? el.innerText.trim() : '';
+}
+function collect() {
+    clearTimeout(timer);
+    state.waiter = null;
+    if (!document.contains(state.table)) { return done({status: 'detached'}); }
+    if (state.structural) {
+        state.structural = false;
+        state.dirty.clear();
+        return done({status: 'resync'});
+    }
+    var all = state.table.querySelectorAll('tbody > tr'), index = new Map();
+    for (var i = 0; i < all.length; i++) { index.set(all[i], i); }
+    var rows = Array.from(state.dirty).slice(0, maxRows).map(function(tr) {
+        state.dirty.delete(tr);
+        return index.has(tr) ? [index.get(tr), tr.className, Array.prototype.map.call(tr.querySelectorAll('td'), text)] : null;
+    }).filter(function(row) { return row; });
+    done({status: 'ok', rows: rows, pending: state.dirty.size, total: all.length});
+}
+if (!state) {
+    done({status: 'detached'});
+} else if (state.dirty.size || state.structural || !document.contains(state.table)) {
+    collect();
+} else {
+    timer = setTimeout(collect, waitMs);
+    state.waiter = collect;
+}
+"""
+
+class GttWatcher:
+    """Keeps the GTT table under observation and passes the full, updated Order Book on after every change.
+
+    The browser only collects which rows changed; Python pulls them in batches of at most batch_rows, no
+    more often than every min_interval seconds, and only after it has processed the previous batch. Rows
+    that change again in the meantime are sent once, so a slow consumer never builds up a backlog.
+    """
+
+    def __init__(self, driver, locate_table, build_rows, on_change, min_interval=1.0, batch_rows=200, wait_ms=5000):
+        self.driver = driver
+        self.locate_table = locate_table  # Returns the GTT table element, waiting for it if needed
+        self.build_rows = build_rows  # (headers, [[row class, cells], ...]) -> Order Book rows
+        self.on_change = on_change  # Called with (headers, rows) after the initial read and every change
+        self.min_interval = min_interval
+        self.batch_rows = batch_rows
+        self.wait_ms = wait_ms
+        self.headers = []
+        self.raw_rows = []
+        self.stats = {'pulls': 0, 'rows_pulled': 0, 'resyncs': 0, 'updates': 0}
+
+    def resync(self):
+        """Read the whole table once and (re)install the observer on it."""
+        table = self.locate_table()
+        self.driver.execute_script(WATCH_SCRIPT, table)
+        data = extract_table(self.driver, table)
+        self.headers = [header for header in data['headers'] if header]
+        self.raw_rows = data['rows']
+        self.stats['resyncs'] += 1
+        self.emit()
+
+    def emit(self):
+        # build_rows edits the cell lists it is given, so it gets copies
+        rows = self.build_rows(self.headers, [[row_class, list(cells)] for row_class, cells in self.raw_rows])
+        self.stats['updates'] += 1
+        self.on_change(self.headers, rows)
+
+    def poll(self):
+        """Pull one batch of changed rows and apply it; returns the number of changed rows still waiting in the page."""
+        batch = self.driver.execute_async_script(DRAIN_SCRIPT, self.batch_rows, self.wait_ms)
+        self.stats['pulls'] += 1
+        if batch['status'] != 'ok':
+            logging.info("GTT table %s, reading it again", batch['status'])
+            self.resync()
+            return 0
+        if not batch['rows']:
+            return 0
+        if batch['total'] != len(self.raw_rows):
+            self.resync()
+            return 0
+        for index, row_class, cells in batch['rows']:
+            self.raw_rows[index] = [row_class, cells]
+        self.stats['rows_pulled'] += len(batch['rows'])
+        self.emit()
+        return batch['pending']
+
+    def run(self, until=None):
+        """Watch until the epoch time `until` (or forever), pulling changes at most every min_interval seconds."""
+        self.driver.set_script_timeout(self.wait_ms / 1000 + 10)
+        self.resync()
+        try:
+            while until is None or time.time() < until:
+                started = time.time()
+                pending = self.poll()
+                if pending:
+                    logging.debug("%s changed GTT rows wait for the next pull", pending)
+                time.sleep(max(0.0, self.min_interval - (time.time() - started)))
+        finally:
+            logging.info("GTT watch finished: %s", self.stats)
+        return self.stats
+
+def parse_until(value, now=None):
+    """Epoch time of the next occurrence of a local HH:MM today, or None for an empty value."""
+    if not value:
+        return None
+    now = now or datetime.now()
+    hour, minute = (int(part) for part in value.split(':'))
+    until = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if until <= now:
+        raise ValueError(f"{value} has already passed today")
+    return until.timestamp()
+
+def main():
+    """Watch the GTT orders of one account: python gtt_watch.py --account IN303028-76957818-7500062485-NRO --until 15:30"""
+    import main as pipeline  # main.py imports this module, so the pipeline is only loaded when run as a script
+    import tracing
+    import locator_registry
+    parser = argparse.ArgumentParser(description="Record GTT order changes as they happen, staying on the GTT tab.")
+    parser.add_argument('--account', required=True, choices=pipeline.SUB_ACCOUNTS)
+    parser.add_argument('--until', default=pipeline.CONFIG['gtt_watch_until'], help="Local time (HH:MM) to stop watching; empty to run until interrupted")
+    parser.add_argument('--min-interval', type=float, default=pipeline.CONFIG['gtt_watch_min_interval'],
+                        help="Minimum seconds between two pulls of changed rows")
+    args = parser.parse_args()
+    try:
+        until = parse_until(args.until)
+    except ValueError as e:
+        parser.error(str(e))
+    pipeline.CONFIG['gtt_watch_min_interval'] = args.min_interval
+    pipeline.configure_logging(pipeline.CONFIG['log_file'])
+
+    tracing.enable(pipeline.CONFIG['tracing'])
+    locator_registry.load(pipeline.CONFIG['locator_stats_file'])
+    try:
+        with pipeline.browser_session(pipeline.CONFIG['download_base_dir']):
+            pipeline.ensure_session()
+            pipeline.switch_account(args.account)
+            pipeline.watch_gtt(args.account, until)
+    except KeyboardInterrupt:
+        logging.info("GTT watch interrupted")
+    except WebDriverException as e:
+        logging.error("GTT watch stopped: %s", e, exc_info=True)
+        raise SystemExit(1)
+    finally:
+        locator_registry.save()
+        pipeline.export_trace("_watch")
+
+if __name__ == "__main__":
+    main()
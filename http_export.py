@@ -0,0 +1,112 @@
+import os
+import json
+import time
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+
+# Request headers worth replaying; the rest (cookies, lengths, client hints) are set by requests itself
+REPLAY_HEADERS = ('Content-Type', 'Referer', 'Origin', 'User-Agent', 'Accept', 'X-Requested-With')
+
+def enable_network_capture(options):
+    """Ask Chrome to record network events so export requests can be captured from the performance log."""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+def is_csv_response(response):
+    """Check whether a DevTools Network.Response describes a CSV export."""
+    headers = {key.lower(): value for key, value in response.get('headers', {}).items()}
+    disposition = headers.get('content-disposition', '').lower()
+    mime = response.get('mimeType', '').lower()
+    return '.csv' in disposition or 'csv' in mime
+
+def capture_export_request(driver):
+    """Return the most recent request that produced a CSV response, read from the performance log."""
+    requests_seen = {}
+    captured = None
+    for entry in driver.get_log("performance"):
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError):
+            continue
+        params = message.get('params', {})
+        if message.get('method') == 'Network.requestWillBeSent':
+            requests_seen[params['requestId']] = params['request']
+        elif message.get('method') == 'Network.responseReceived' and is_csv_response(params.get('response', {})):
+            request = requests_seen.get(params['requestId'])
+            if request:
+                captured = {
+                    'url': request['url'],
+                    'method': request.get('method', 'GET'),
+                    'headers': {key: value for key, value in request.get('headers', {}).items() if key in REPLAY_HEADERS},
+                    'post_data': request.get('postData'),
+                    'captured_at': time.time(),
+                }
+    return captured
+
+def load_export_templates(path):
+    """Load the captured export requests, keyed by '<account_id>:<data_type>'."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logging.warning("Could not read export templates %s: %s", path, e)
+        return {}
+
+def save_export_templates(path, templates):
+    """Save the captured export requests, readable only by the current user (they carry form tokens)."""
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.chmod(path, 0o600)  # os.open only applies the mode to new files
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(templates, f, indent=2)
+
+def create_http_session(pool_size=4):
+    """Create a requests session with a pooled, keep-alive connection adapter."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def sync_cookies(session, cookies, user_agent=None):
+    """Copy the browser's cookies (and user agent) into the HTTP session."""
+    for cookie in cookies:
+        session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+    if user_agent:
+        session.headers['User-Agent'] = user_agent
+
+def fetch_export(session, template, output_path, timeout=30, chunk_size=64 * 1024):
+    """Replay a captured export request and stream the CSV to output_path.
+
+    Raises ValueError when the portal answers with an HTML page instead of a CSV, which is what
+    happens once the session has expired or the captured form state is no longer accepted.
+    """
+    response = session.request(
+        template['method'],
+        template['url'],
+        data=template.get('post_data'),
+        headers=template.get('headers', {}),
+        stream=True,
+        timeout=timeout,
+    )
+    try:
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', '').lower()
+        if 'html' in content_type:
+            raise ValueError(f"Export returned {content_type} instead of CSV from {template['url']}")
+        partial_path = output_path + '.part'
+        size = 0
+        with open(partial_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+                size += len(chunk)
+        if size == 0:
+            os.remove(partial_path)
+            raise ValueError(f"Export returned an empty body from {template['url']}")
+        os.replace(partial_path, output_path)
+        logging.info("Fetched %s bytes from %s to %s", size, template['url'], output_path)
+        return output_path
+    finally:
+        response.close()
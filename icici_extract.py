@@ -14,6 +14,7 @@ from webdriver_manager.chrome import ChromeDriverManager
 from dotenv import load_dotenv
 from retrying import retry
 from tabulate import tabulate
+from lean_profile import apply_lean_options, block_lean_requests
 
 # Setup logging with detailed format
 logging.basicConfig(
@@ -40,6 +41,7 @@ CONFIG = {
     'consolidate_output': True,  # Combine CSVs for each data type
     'login_timeout': 180,  # Timeout for login and OTP handling (3 minutes)
     'switch_timeout': 60,  # Timeout for account switching
+    'browser_profile': 'default',  # 'default' (headed, full page) or 'lean' (headless, trackers/images blocked)
 }
 
 # Initialize WebDriver
@@ -47,14 +49,20 @@ os.makedirs(CONFIG['download_dir'], exist_ok=True)
 options = webdriver.ChromeOptions()
 options.add_argument("--no-sandbox")
 options.add_argument("--disable-dev-shm-usage")
-options.add_experimental_option("prefs", {
+prefs = {
     "download.default_directory": CONFIG['download_dir'],
     "download.prompt_for_download": False,
     "download.directory_upgrade": True,
     "profile.default_content_setting_values.notifications": 2,
-})
+}
+if CONFIG['browser_profile'] == 'lean':
+    apply_lean_options(options, prefs)
+options.add_experimental_option("prefs", prefs)
 service = Service(ChromeDriverManager().install())
 driver = webdriver.Chrome(service=service, options=options)
+if CONFIG['browser_profile'] == 'lean':
+    block_lean_requests(driver)
+    driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": CONFIG['download_dir']})
 wait = WebDriverWait(driver, 30)
 
 def wait_for_download(download_dir, timeout=30):
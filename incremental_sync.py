@@ -0,0 +1,154 @@
+import os
+import csv
+import json
+import hashlib
+import logging
+from datetime import datetime, date
+
+# Date formats seen in the ICICI Direct exports
+DATE_FORMATS = ('%d-%b-%Y', '%d-%b-%y', '%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d', '%d %b %Y', '%d-%b-%Y %H:%M:%S', '%d/%m/%Y %H:%M:%S')
+
+def parse_date(value):
+    """Parse an export date cell into a date, or return None if it is not a recognised date."""
+    value = (value or '').strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def find_date_column(headers):
+    """Return the index of the first header that looks like a date column, or None."""
+    for idx, header in enumerate(headers):
+        if 'date' in header.lower():
+            return idx
+    return None
+
+def row_key(row, seen=None):
+    """Stable identity of an export row, used to drop rows already merged.
+
+    With a `seen` dict shared by the rows of one export, the second, third, ... identical row gets a
+    "#2", "#3", ... suffix, so legitimate identical rows (two same-size fills at the same price and
+    time) keep a key each instead of collapsing into one.
+    """
+    key = hashlib.sha1('\x1f'.join(cell.strip() for cell in row).encode('utf-8')).hexdigest()
+    if seen is None:
+        return key
+    seen[key] = seen.get(key, 0) + 1
+    return key if seen[key] == 1 else f"{key}#{seen[key]}"
+
+def load_state(path):
+    """Load the per-account high-water marks."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logging.warning("Could not read sync state %s, starting a full sync: %s", path, e)
+        return {}
+
+def save_state(path, state):
+    """Save the per-account high-water marks atomically."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+def choose_period(mark, periods, today=None):
+    """Pick the smallest (label, days) period that still covers the gap since the high-water mark.
+
+    Without a mark (first sync) the largest period is used.
+    """
+    today = today or date.today()
+    if not mark or not mark.get('last_date'):
+        return periods[-1][0]
+    gap = (today - date.fromisoformat(mark['last_date'])).days
+    for label, days in periods:
+        if gap <= days:
+            return label
+    logging.warning("Gap of %s days since %s exceeds the largest period %s", gap, mark['last_date'], periods[-1][0])
+    return periods[-1][0]
+
+def canonical_columns(canonical_path, headers):
+    """Return the columns of the canonical dataset, widened in place with any new columns of headers.
+
+    Rows already stored are rewritten under the union of both headers, matched by column name, with
+    empty cells for columns they did not have. A missing canonical file takes headers as they are.
+    """
+    if not os.path.exists(canonical_path):
+        return headers
+    with open(canonical_path, 'r', encoding='utf-8', newline='') as infile:
+        reader = csv.reader(infile)
+        columns = next(reader, None)
+        if not columns:
+            return headers
+        added = [header for header in headers if header not in columns]
+        if not added:
+            if columns != headers:
+                logging.warning("Columns of %s are in a different order than the download, matching them by name", canonical_path)
+            return columns
+        logging.warning("Download adds columns %s to %s, rewriting the stored rows with the wider header", added, canonical_path)
+        tmp_path = canonical_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as outfile:
+            writer = csv.writer(outfile)
+            writer.writerow(columns + added)
+            writer.writerows((row + [''] * len(columns))[:len(columns)] + [''] * len(added) for row in reader)
+    os.replace(tmp_path, canonical_path)
+    return columns + added
+
+def merge_new_rows(download_path, canonical_path, mark):
+    """Append rows of a fresh download that are newer than the high-water mark to the canonical dataset.
+
+    Rows dated before the mark are skipped outright; rows on the mark's day are compared against the
+    keys remembered for that day, since a day can be only partly covered by the previous run. A
+    download whose header differs from the canonical one is mapped onto it by column name, see
+    canonical_columns(). Returns (appended row count, updated mark).
+    """
+    mark = dict(mark or {})
+    last_date = date.fromisoformat(mark['last_date']) if mark.get('last_date') else None
+    boundary_keys = set(mark.get('boundary_keys', []))
+    undated_keys = set(mark.get('undated_keys', []))
+    with open(download_path, 'r', encoding='utf-8', newline='') as infile:
+        reader = csv.reader(infile)
+        headers = next(reader, None)
+        if not headers:
+            return 0, mark
+        date_idx = find_date_column(headers)
+        new_rows, seen = [], {}
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            key = row_key(row, seen)  # Counted before the date filter, so occurrence numbers match across runs
+            row_date = parse_date(row[date_idx]) if date_idx is not None and len(row) > date_idx else None
+            if last_date and row_date and row_date < last_date:
+                continue
+            if key in boundary_keys or key in undated_keys:
+                continue
+            new_rows.append((row_date, key, row))
+
+    columns = canonical_columns(canonical_path, headers)
+    if columns != headers:
+        positions = [headers.index(column) if column in headers else None for column in columns]
+        new_rows = [(row_date, key, [row[idx] if idx is not None and idx < len(row) else '' for idx in positions])
+                    for row_date, key, row in new_rows]
+    write_headers = not os.path.exists(canonical_path)
+    with open(canonical_path, 'a', encoding='utf-8', newline='') as outfile:
+        writer = csv.writer(outfile)
+        if write_headers:
+            writer.writerow(headers)
+        writer.writerows(row for _, _, row in new_rows)
+
+    dated = [row_date for row_date, _, _ in new_rows if row_date]
+    if dated and (not last_date or max(dated) > last_date):
+        last_date = max(dated)
+        boundary_keys = set()
+    boundary_keys.update(key for row_date, key, _ in new_rows if row_date and row_date == last_date)
+    # Rows without a usable date cannot be placed against the mark, so their keys are kept for good
+    undated_keys.update(key for row_date, key, _ in new_rows if not row_date)
+    mark['last_date'] = last_date.isoformat() if last_date else None
+    mark['boundary_keys'] = sorted(boundary_keys)
+    mark['undated_keys'] = sorted(undated_keys)
+    logging.info("Merged %s new rows into %s, high-water mark %s", len(new_rows), canonical_path, mark['last_date'])
+    return len(new_rows), mark
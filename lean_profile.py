@@ -0,0 +1,56 @@
+import logging
+
+# Chrome switches for unattended runs: no window, no GPU process and a small disk cache
+LEAN_ARGUMENTS = [
+    "--headless=new",
+    "--disable-gpu",
+    "--window-size=1536,816",  # Same layout as the headed runs so the locators keep matching
+    "--disk-cache-size=33554432",  # 32 MB
+    "--disable-extensions",
+    "--mute-audio",
+]
+
+# Content settings merged into the Chrome prefs of lean sessions
+LEAN_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+}
+
+# Trackers, ad scripts, fonts and images the portal loads on every page but the extraction never needs
+BLOCKED_URL_PATTERNS = [
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*googleadservices.com*",
+    "*connect.facebook.net*",
+    "*facebook.com/tr*",
+    "*adobedtm.com*",
+    "*omtrdc.net*",
+    "*demdex.net*",
+    "*everesttech.net*",
+    "*hotjar.com*",
+    "*clarity.ms*",
+    "*.png",
+    "*.jpg",
+    "*.jpeg",
+    "*.gif",
+    "*.svg",
+    "*.webp",
+    "*.woff",
+    "*.woff2",
+    "*.ttf",
+]
+
+def apply_lean_options(options, prefs):
+    """Add the lean switches to ChromeOptions and the lean content settings to its prefs dict."""
+    for argument in LEAN_ARGUMENTS:
+        options.add_argument(argument)
+    prefs.update(LEAN_PREFS)
+
+def block_lean_requests(driver):
+    """Block analytics, ads, fonts and images for the session through the DevTools protocol."""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        logging.info("Blocking %s URL patterns for lean profile", len(BLOCKED_URL_PATTERNS))
+    except Exception as e:
+        logging.warning("Could not enable request blocking: %s", e)
@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import logging
+import threading
+from selenium.common.exceptions import WebDriverException
+
+# Evaluates every candidate locator in the page in one round trip and returns the index of the first
+# one (in the given order) that matches an element, together with that element. Polling this script
+# races all candidates at once instead of waiting out each stale locator in turn.
+RACE_SCRIPT = """
+var candidates = arguments[0], requireVisible = arguments[1];
+function visible(el) {
+    if (!el.getClientRects().length) { return false; }
+    var style = window.getComputedStyle(el);
+    return style.visibility !== 'hidden' && style.display !== 'none' && !el.disabled;
+}
+function byText(text, partial) {
+    var links = document.getElementsByTagName('a');
+    for (var i = 0; i < links.length; i++) {
+        var linkText = links[i].textContent.trim();
+        if (partial ? linkText.indexOf(text) !== -1 : linkText === text) { return links[i]; }
+    }
+    return null;
+}
+for (var i = 0; i < candidates.length; i++) {
+    var by = candidates[i][0], value = candidates[i][1], el = null;
+    try {
+        if (by === 'xpath') {
+            el = document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        } else if (by === 'id') {
+            el = document.getElementById(value);
+        } else if (by === 'css selector') {
+            el = document.querySelector(value);
+        } else if (by === 'name') {
+            el = document.getElementsByName(value)[0] || null;
+        } else if (by === 'class name') {
+            el = document.getElementsByClassName(value)[0] || null;
+        } else if (by === 'tag name') {
+            el = document.getElementsByTagName(value)[0] || null;
+        } else if (by === 'link text' || by === 'partial link text') {
+            el = byText(value, by === 'partial link text');
+        }
+    } catch (e) {
+        el = null;  // An invalid selector must not stop the other candidates
+    }
+    if (el && (!requireVisible || visible(el))) { return [i, el]; }
+}
+return null;
+"""
+
+# Locator statistics: {key: {"<by>=<value>": {"hits": n, "misses": n, "avg_ms": ms}}}
+stats = {}
+stats_path = None
+dirty = False  # Whether this process recorded anything since load(); clean processes never overwrite the file
+lock = threading.Lock()
+
+def locator_id(locator):
+    return f"{locator[0]}={locator[1]}"
+
+def load(path):
+    """Load the persisted locator statistics; missing or unreadable files start empty."""
+    global stats, stats_path, dirty
+    stats_path = path
+    dirty = False
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            stats = json.load(f)
+    except (OSError, ValueError):
+        stats = {}
+    return stats
+
+def save(path=None):
+    """Persist the locator statistics atomically, if this process recorded any."""
+    path = path or stats_path
+    if not path or not dirty:
+        return
+    with lock:
+        data = json.dumps(stats, indent=2)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning("Could not save locator statistics to %s: %s", path, e)
+
+def ordered(key, candidates):
+    """Candidates ordered by past success rate, then by how quickly they matched; unseen ones keep their place."""
+    entries = stats.get(key, {})
+
+    def rank(item):
+        position, locator = item
+        entry = entries.get(locator_id(locator))
+        if not entry:
+            return (-0.5, float('inf'), position)
+        success = (entry['hits'] + 1) / (entry['hits'] + entry['misses'] + 2)
+        return (-success, entry['avg_ms'], position)
+    return [locator for _, locator in sorted(enumerate(candidates), key=rank)]
+
+def record(key, candidates, winner, elapsed_ms):
+    """Count a hit for the locator that matched and a miss for every candidate ranked ahead of it."""
+    global dirty
+    with lock:
+        dirty = True
+        entries = stats.setdefault(key, {})
+        for locator in candidates:
+            entry = entries.setdefault(locator_id(locator), {'hits': 0, 'misses': 0, 'avg_ms': 0.0})
+            if locator == winner:
+                entry['avg_ms'] = round(elapsed_ms if not entry['hits'] else 0.8 * entry['avg_ms'] + 0.2 * elapsed_ms, 1)
+                entry['hits'] += 1
+                break
+            entry['misses'] += 1
+
+def find(driver, key, candidates, timeout=30, poll=0.05, visible=True):
+    """Race all candidate locators and return (element, locator) of the best one that matches.
+
+    Candidates are tried in learned order, so the locator that usually works wins ties; a stale
+    candidate costs nothing as long as another one matches. Returns (None, None) after `timeout`.
+    """
+    candidates = ordered(key, candidates)
+    start = time.time()
+    while True:
+        try:
+            match = driver.execute_script(RACE_SCRIPT, [list(locator) for locator in candidates], visible)
+        except WebDriverException as e:
+            match = None  # Page is navigating; try again on the next poll
+            logging.debug("Locator race for %s failed: %s", key, e)
+        if match:
+            index, element = match
+            elapsed_ms = (time.time() - start) * 1000
+            record(key, candidates, candidates[index], elapsed_ms)
+            if index:
+                logging.info("Locator %s for %s matched while %d preferred candidates did not", candidates[index], key, index)
+            return element, candidates[index]
+        if time.time() - start > timeout:
+            logging.warning("No locator for %s matched within %ss: %s", key, timeout, candidates)
+            return None, None
+        time.sleep(poll)
@@ -2,7 +2,10 @@ import os
 import time
 import logging
 import csv
-import traceback
+import json
+import functools
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from glob import glob
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -14,13 +17,25 @@ from webdriver_manager.chrome import ChromeDriverManager
 from dotenv import load_dotenv
 from retrying import retry
 from tabulate import tabulate
-
-# Setup logging with detailed format
-logging.basicConfig(
-    level=logging.INFO,
-    filename='icici_extract.log',
-    format='%(asctime)s - %(levelname)s - [%(funcName)s:%(lineno)d] - %(message)s'
-)
+import readiness
+from readiness import wait_until_ready
+from download_watcher import wait_for_new_file
+import http_export
+from table_extract import extract_table
+from lean_profile import apply_lean_options, block_lean_requests
+import incremental_sync
+import consolidation
+import columnar_output
+import datastore
+import tracing
+import async_logging
+import locator_registry
+import flow_scheduler
+import tenants
+import account_switch
+import artifact_store
+import gtt_diff
+import gtt_watch
 
 load_dotenv()
 USERNAME = os.getenv('ICICI_USERNAME')
@@ -30,30 +45,235 @@ SUB_ACCOUNTS = [
     'IN303028-76957818-7500062485-NRO',
     'IN303028-76957826-7510072528-NPNRO'
 ]
+# Downloaded data types consolidated across accounts after each run
+CONSOLIDATED_DATA_TYPES = ['tradebook', 'portfolio', 'myportfolio', 'orderbook']
+# Data types with dated rows that are merged incrementally when CONFIG['incremental_sync'] is set
+SYNCED_DATA_TYPES = ['tradebook', 'orderbook']
+# Accounts holding mutual funds, the only ones with My Portfolio and MF Order Book data
+MF_ACCOUNTS = ['IN303028-76957826-7510072528-NPNRO']
+# Datasets extracted for each account; a tenant in the registry can enable a subset
+DATASETS = ['tradebook', 'portfolio', 'orders', 'myportfolio', 'orderbook']
 
 # Configuration
 CONFIG = {
     'download_base_dir': os.path.abspath("downloads"),
     'tradebook_period': '1 Week',  # Options: '1 Week', '1 Month', etc.
     'max_download_wait': 30,  # Seconds to wait for downloads
+    'download_settle_time': 0.3,  # Seconds a downloaded file's size must stay unchanged before it counts as complete
+    'download_poll_interval': 0.2,  # Directory poll interval when the watchdog package is not installed
     'consolidate_output': True,  # Combine CSVs for each data type
+    'consolidate_chunk_rows': 5000,  # Rows buffered per write while consolidating
     'login_timeout': 180,  # Timeout for login and OTP handling (3 minutes)
     'switch_timeout': 60,  # Timeout for account switching
+    'fast_account_switch': True,  # Switch accounts with one in-page script call, falling back to the dropdown UI
+    'fast_switch_timeout': 10,  # Seconds the header may take to show the new account after a scripted switch
+    'base_url': os.getenv('ICICI_BASE_URL', 'https://secure.icicidirect.com'),  # ICICI Direct portal root (point at mock_portal.py for offline runs)
+    'parallel_workers': 1,  # Accounts processed concurrently, each in its own browser (1 = sequential)
+    'seed_worker_sessions': True,  # Parallel workers start from the cookies of one login (OTP once) instead of logging in each
+    'profile_base_dir': os.path.abspath("profiles"),  # Per-account Chrome profiles for parallel workers
+    'reuse_session': True,  # Restore the stored session cookies before falling back to login()
+    'session_file': os.path.abspath(os.path.join(".session", "cookies.json")),  # Where session cookies are saved after login (untracked, mode 0600)
+    'session_seed_file': os.path.abspath("icici_cookies.json"),  # Cookies tried when no session is stored yet; never written
+    'session_probe_timeout': 10,  # Seconds to wait for the dashboard when validating a restored session
+    'ready_timeout': 20,  # Maximum seconds to wait for a page to settle after navigation or a click
+    'ready_quiet_ms': 300,  # DOM must be free of structural changes for this long to count as settled
+    'ready_change_timeout': 5,  # Seconds a click may take to start changing the page before the page is judged as it is
+    'direct_export': False,  # Replay captured CSV export requests over HTTP instead of clicking through the menus
+    'export_templates_file': os.path.abspath(os.path.join(".session", "export_requests.json")),  # Captured export requests per account and data type (untracked, mode 0600)
+    'export_template_ttl': 24 * 3600,  # Seconds before a captured export request is recaptured through the browser
+    'browser_profile': 'default',  # 'default' (headed, full page) or 'lean' (headless, trackers/images blocked)
+    'chromedriver_cache_file': os.path.abspath(".chromedriver_path.json"),  # Cached chromedriver path from webdriver_manager
+    'chromedriver_cache_ttl': 24 * 3600,  # Seconds before webdriver_manager is asked for the chromedriver again
+    'incremental_sync': False,  # Request only the period since the last seen trade/order and merge new rows
+    'sync_periods': [('1 Week', 7), ('1 Month', 31)],  # Period options of the Trade/Order Book filter, smallest first
+    'columnar_output': None,  # Also write typed datasets as 'parquet' or 'arrow' (requires pyarrow); None to disable
+    'columnar_dir': os.path.abspath(os.path.join("downloads", "columnar")),  # Root of the partitioned columnar datasets
+    'ingest_datastore': True,  # Upsert every dataset into the local SQLite datastore
+    'datastore_path': os.path.abspath(os.path.join("downloads", "icici.db")),  # SQLite datastore queried by datastore.py
+    'dedupe_artifacts': True,  # Hash each dataset and skip storing and reprocessing it when it matches the last version
+    'artifact_dir': os.path.abspath(os.path.join("downloads", "artifacts")),  # Content-addressed dataset store and manifests
+    'tracing': False,  # Record spans for every step, page wait and WebDriver command
+    'trace_format': 'otel',  # 'otel' (OpenTelemetry JSON spans) or 'prometheus' (aggregated text metrics)
+    'trace_output': os.path.abspath("icici_trace.json"),  # Where spans/metrics and the run summary are written
+    'trace_endpoint': None,  # Optional URL the trace data is POSTed to (OTLP/HTTP collector or Pushgateway)
+    'log_page_details': False,  # Log the page title and URL after each click (two extra WebDriver round trips)
+    'log_file': os.path.abspath("icici_extract.log"),  # Log file, written by a background thread
+    'log_level': logging.INFO,  # Minimum level of logged records
+    'log_max_bytes': 5 * 1024 * 1024,  # Rotate the log file when it reaches this size
+    'log_rotate_interval': 24 * 3600,  # Also rotate a non-empty log file every this many seconds (0 to disable)
+    'log_backup_count': 5,  # Rotated log files kept
+    'log_compress': True,  # Gzip rotated log files
+    'locator_stats_file': os.path.abspath("locator_stats.json"),  # Learned success statistics of fallback locators
+    'gtt_history': True,  # Keep a change log of the GTT orders (deltas plus periodic full checkpoints) per account
+    'gtt_key_columns': ['Stock', 'Date', 'Buy/Sell'],  # Columns identifying a GTT order across runs
+    'gtt_ignore_columns': ['LTP', 'Actions'],  # Volatile or decorative columns left out of the change log
+    'gtt_checkpoint_every': 50,  # Changes between full snapshots of the GTT order book
+    'gtt_watch_min_interval': 1.0,  # Watch mode: minimum seconds between two pulls of changed GTT rows
+    'gtt_watch_batch_rows': 200,  # Watch mode: maximum changed rows pulled per round trip
+    'gtt_watch_wait_ms': 5000,  # Watch mode: how long one pull waits in the page for a change before returning
+    'gtt_watch_until': '15:30',  # Watch mode: local time at which watching stops (market close)
+    'postprocess_workers': 2,  # Threads renaming, cleaning, publishing and consolidating files while the browser moves on
+    'tenants_file': os.path.abspath("tenants.json"),  # Registry of client logins; without it the .env login and SUB_ACCOUNTS are used
+    'tenant_base_dir': os.path.abspath("tenants"),  # Per-tenant downloads, profiles, sessions, logs and traces
+    'tenant_workers': 2,  # Tenants processed at the same time; up to tenant_workers x parallel_workers browsers run at once
+    'daemon_host': '127.0.0.1',  # Interface the job API of daemon.py listens on
+    'daemon_port': 8770,  # Port of the daemon job API
+    'daemon_token': os.getenv('ICICI_DAEMON_TOKEN'),  # Bearer token required by the job API when set
+    'keepalive_interval': 300,  # Seconds of idleness after which the daemon reloads the dashboard to stay logged in
+    'daemon_max_spans': 50000,  # Latest spans the daemon keeps in memory between trace exports
 }
 
-# Initialize WebDriver
-options = webdriver.ChromeOptions()
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
-options.add_experimental_option("prefs", {
-    "download.default_directory": CONFIG['download_base_dir'],
-    "download.prompt_for_download": False,
-    "download.directory_upgrade": True,
-    "profile.default_content_setting_values.notifications": 2,
-})
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=options)
-wait = WebDriverWait(driver, 30)
+def configure_logging(log_file):
+    """Queue log records to a background thread that writes, rotates and compresses the log file."""
+    async_logging.setup_logging(
+        log_file,
+        level=CONFIG['log_level'],
+        max_bytes=CONFIG['log_max_bytes'],
+        backup_count=CONFIG['log_backup_count'],
+        interval=CONFIG['log_rotate_interval'],
+        compress=CONFIG['log_compress'],
+    )
+
+# WebDriver used by the extraction steps; created on demand by init_driver() or browser_session()
+driver = None
+wait = None
+# Pooled HTTP session for direct exports; created on first use
+http_session = None
+# Registry entry of the tenant this process runs, set by apply_tenant(); None for the .env login
+TENANT = None
+
+def resolve_chromedriver():
+    """Return the chromedriver path, reusing the cached result of webdriver_manager while it is fresh."""
+    cache_file = CONFIG['chromedriver_cache_file']
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if time.time() - cached['resolved_at'] < CONFIG['chromedriver_cache_ttl'] and os.path.exists(cached['path']):
+            logging.info("Using cached chromedriver %s", cached['path'])
+            return cached['path']
+    except (OSError, ValueError, KeyError):
+        pass
+    path = ChromeDriverManager().install()
+    try:
+        # Write atomically, parallel workers may resolve at the same time
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'path': path, 'resolved_at': time.time()}, f)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        logging.warning("Could not cache chromedriver path: %s", e)
+    logging.info("Resolved chromedriver %s with webdriver_manager", path)
+    return path
+
+def create_driver(download_dir, profile_dir=None):
+    """Create a Chrome WebDriver that saves downloads to the given directory."""
+    options = webdriver.ChromeOptions()
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+        options.add_argument(f"--user-data-dir={profile_dir}")
+    prefs = {
+        "download.default_directory": download_dir,
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "profile.default_content_setting_values.notifications": 2,
+    }
+    lean = CONFIG['browser_profile'] == 'lean'
+    if lean:
+        apply_lean_options(options, prefs)
+    options.add_experimental_option("prefs", prefs)
+    if CONFIG['direct_export']:
+        http_export.enable_network_capture(options)
+    service = Service(resolve_chromedriver())
+    new_driver = webdriver.Chrome(service=service, options=options)
+    if lean:
+        block_lean_requests(new_driver)
+        # Headless Chrome ignores the download prefs unless downloads are allowed explicitly
+        new_driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": download_dir})
+    return new_driver
+
+def init_driver(download_dir, profile_dir=None):
+    """Create the browser session used by this process and its shared 30 second wait."""
+    global driver, wait
+    driver = create_driver(download_dir, profile_dir)
+    if CONFIG['tracing']:
+        tracing.instrument_driver(driver)
+    wait = WebDriverWait(driver, 30)
+    return driver
+
+def quit_driver():
+    """Close the browser session of this process, if one is open."""
+    global driver, wait
+    if driver:
+        driver.quit()
+        logging.info("Browser closed")
+    driver = None
+    wait = None
+
+@contextlib.contextmanager
+def browser_session(download_dir, profile_dir=None):
+    """Open a browser session for the duration of a with block and always close it afterwards."""
+    try:
+        yield init_driver(download_dir, profile_dir)
+    finally:
+        quit_driver()
+
+def get_driver():
+    """Return the browser session of this process, starting one with the default download directory if needed."""
+    if driver is None:
+        os.makedirs(CONFIG['download_base_dir'], exist_ok=True)
+        init_driver(CONFIG['download_base_dir'])
+    return driver
+
+def set_download_dir(download_dir):
+    """Point Chrome downloads of the current session at the given directory."""
+    driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": download_dir})
+
+def page_ready(step, since=None):
+    """Wait for the current page to settle after the given step; see readiness.wait_until_ready()."""
+    with tracing.span("page_ready", kind='wait', step=step):
+        return wait_until_ready(driver, step, timeout=CONFIG['ready_timeout'], quiet_ms=CONFIG['ready_quiet_ms'],
+                                since=since, change_timeout=CONFIG['ready_change_timeout'])
+
+@contextlib.contextmanager
+def page_change(step):
+    """Wait for the page produced by the actions in the with block, not the document they started on."""
+    since = readiness.mark(driver)
+    yield
+    page_ready(step, since)
+
+def page_details():
+    """Title and URL of the current page for log messages, when CONFIG['log_page_details'] is set."""
+    if not CONFIG['log_page_details']:
+        return ""
+    return f" Title: {driver.title}, URL: {driver.current_url}"
+
+def timed_step(func):
+    """Log the wall-clock duration of an extraction step, including retries, and record it as a span."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.time()
+        try:
+            with tracing.span(func.__name__, account=args[0] if args else ''):
+                return func(*args, **kwargs)
+        finally:
+            logging.info("Step %s took %.2fs", func.__name__, time.time() - start)
+    return wrapper
+
+def export_trace(suffix=''):
+    """Export the spans of this process and write the run summary next to them."""
+    if not CONFIG['tracing']:
+        return
+    root, ext = os.path.splitext(CONFIG['trace_output'])
+    try:
+        tracing.export(f"{root}{suffix}{ext}", CONFIG['trace_format'], CONFIG['trace_endpoint'])
+        report = tracing.summary_report()
+        with open(f"{root}{suffix}_summary.txt", 'w', encoding='utf-8') as f:
+            f.write(report + '\n')
+        logging.info("Run summary:\n%s", report)
+    except Exception as e:
+        logging.error("Failed to export trace: %s", e, exc_info=True)
 
 def get_account_download_dir(account_id):
     """Get the download directory for a specific account."""
@@ -61,104 +281,351 @@ def get_account_download_dir(account_id):
     os.makedirs(account_dir, exist_ok=True)
     return account_dir
 
-def wait_for_download(account_id, partial_name, timeout=30):
-    """Wait for a file to appear in the account's download directory."""
+def wait_for_download(account_id, partial_name, since, timeout=None):
+    """Wait for a download started at `since` to finish in the account's download directory.
+
+    Stored, canonical and artifact copies are all named `<account_id>_...` and never count as the download.
+    """
     download_dir = get_account_download_dir(account_id)
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        files = glob(os.path.join(download_dir, f"*{partial_name}*.csv"))
-        if files:
-            return files[0]
-        time.sleep(1)
-    raise TimeoutError(f"No file matching {partial_name} found in {timeout} seconds for account {account_id}")
+    timeout = timeout or CONFIG['max_download_wait']
+    try:
+        return wait_for_new_file(download_dir, partial_name, since, timeout=timeout,
+                                 settle=CONFIG['download_settle_time'], poll=CONFIG['download_poll_interval'],
+                                 exclude_prefix=f"{account_id}_")
+    except TimeoutError:
+        raise TimeoutError(f"No file matching {partial_name} found in {timeout} seconds for account {account_id}")
 
 def rename_downloaded_file(original_path, account_id, data_type):
-    """Rename downloaded file to include account ID and data type."""
+    """Rename downloaded file to include account ID and data type; returns None if it matches the last stored version."""
     download_dir = get_account_download_dir(account_id)
     new_name = os.path.join(download_dir, f"{account_id}_{data_type}_{int(time.time())}.csv")
-    os.rename(original_path, new_name)
-    logging.info(f"Renamed {original_path} to {new_name}")
+    if CONFIG['dedupe_artifacts']:
+        version = artifact_store.put(CONFIG['artifact_dir'], account_id, data_type, original_path, new_name)
+        if not version['changed']:
+            logging.info("%s of account %s is unchanged since %s (%s), skipping reprocessing",
+                         data_type, account_id, time.ctime(version['first_seen']), version['path'])
+            return None
+        logging.info("Stored %s as %s (content %s)", original_path, new_name, version['hash'][:12])
+    else:
+        os.rename(original_path, new_name)
+        logging.info("Renamed %s to %s", original_path, new_name)
+    publish_dataset(account_id, data_type, new_name)
     return new_name
 
+def publish_dataset(account_id, data_type, csv_path):
+    """Hand a stored dataset to the enabled outputs (columnar files, datastore)."""
+    write_columnar(account_id, data_type, csv_path)
+    ingest_dataset(account_id, data_type, csv_path)
+
+def ingest_dataset(account_id, data_type, csv_path):
+    """Upsert a dataset into the SQLite datastore when CONFIG['ingest_datastore'] is set."""
+    if not CONFIG['ingest_datastore']:
+        return 0
+    try:
+        conn = datastore.connect(CONFIG['datastore_path'])
+        try:
+            return datastore.ingest_csv(conn, csv_path, account_id, data_type)
+        finally:
+            conn.close()
+    except Exception as e:
+        logging.error("Failed to ingest %s for account %s: %s", data_type, account_id, e, exc_info=True)
+        return 0
+
+def write_columnar(account_id, data_type, csv_path):
+    """Write a typed Parquet/Arrow copy of a dataset when CONFIG['columnar_output'] is set."""
+    if not CONFIG['columnar_output']:
+        return None
+    try:
+        return columnar_output.write_dataset(csv_path, CONFIG['columnar_dir'], data_type, account_id,
+                                             fmt=CONFIG['columnar_output'])
+    except Exception as e:
+        logging.error("Failed to write columnar %s for account %s: %s", data_type, account_id, e, exc_info=True)
+        return None
+
+def direct_download(account_id, data_type):
+    """Fetch an export over HTTP with the browser's cookies; return the file path, or None to use the browser."""
+    global http_session
+    if not CONFIG['direct_export']:
+        return None
+    template = http_export.load_export_templates(CONFIG['export_templates_file']).get(f"{account_id}:{data_type}")
+    if not template or time.time() - template['captured_at'] > CONFIG['export_template_ttl']:
+        logging.info("No current export request for %s of account %s, using the browser", data_type, account_id)
+        return None
+    try:
+        if http_session is None:
+            http_session = http_export.create_http_session()
+        http_export.sync_cookies(http_session, driver.get_cookies(), driver.execute_script("return navigator.userAgent"))
+        output_path = os.path.join(get_account_download_dir(account_id), f"{data_type}_direct.csv")
+        return http_export.fetch_export(http_session, template, output_path, timeout=CONFIG['max_download_wait'])
+    except Exception as e:
+        logging.warning("Direct export of %s failed for account %s, using the browser: %s", data_type, account_id, e)
+        return None
+
+def remember_export_request(account_id, data_type):
+    """Capture the export request behind the last browser download so later runs can replay it."""
+    if not CONFIG['direct_export']:
+        return
+    try:
+        template = http_export.capture_export_request(driver)
+    except Exception as e:
+        logging.warning("Could not read the performance log: %s", e)
+        return
+    if not template:
+        logging.info("No export request captured for %s of account %s", data_type, account_id)
+        return
+    templates = http_export.load_export_templates(CONFIG['export_templates_file'])
+    templates[f"{account_id}:{data_type}"] = template
+    http_export.save_export_templates(CONFIG['export_templates_file'], templates)
+    logging.info("Captured %s %s for %s of account %s", template['method'], template['url'], data_type, account_id)
+
+def select_period(account_id, data_type):
+    """Pick the Trade/Order Book period: the full month, or the smallest period covering the gap when syncing incrementally."""
+    if not CONFIG['incremental_sync']:
+        wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "label[for='month']"))).click()  # Click on the month option
+        return
+    state = incremental_sync.load_state(sync_state_path(account_id))
+    label = incremental_sync.choose_period(state.get(data_type), CONFIG['sync_periods'])
+    wait.until(EC.element_to_be_clickable((By.XPATH, f"//label[contains(normalize-space(.), '{label}')]"))).click()
+    logging.info("Selected period '%s' for incremental %s sync of account %s", label, data_type, account_id)
+
+def sync_state_path(account_id):
+    """Path of the high-water mark file of an account (one file per account, so parallel workers never share it)."""
+    return os.path.join(get_account_download_dir(account_id), "sync_state.json")
+
+def sync_download(account_id, data_type, file_path):
+    """Merge the new rows of a download into the account's canonical dataset and advance its high-water mark."""
+    if not CONFIG['incremental_sync']:
+        return None
+    state_path = sync_state_path(account_id)
+    state = incremental_sync.load_state(state_path)
+    canonical_path = os.path.join(get_account_download_dir(account_id), f"{account_id}_{data_type}.csv")
+    added, state[data_type] = incremental_sync.merge_new_rows(file_path, canonical_path, state.get(data_type))
+    incremental_sync.save_state(state_path, state)
+    logging.info("Incremental sync added %s %s rows for account %s", added, data_type, account_id)
+    return canonical_path
+
+def store_download(account_id, downloaded_file, data_type):
+    """Post-process a download: name it by account and type, publish it and merge it into the incremental dataset.
+
+    Returns None if the download matches the last stored version of the dataset; see artifact_store.put().
+    """
+    stored_file = rename_downloaded_file(downloaded_file, account_id, data_type)
+    if stored_file and data_type in SYNCED_DATA_TYPES:
+        sync_download(account_id, data_type, stored_file)
+    return stored_file
+
+def collect_dataset_files(data_type):
+    """Return the stored CSVs of a data type for all accounts, oldest first."""
+    files = []
+    for account in SUB_ACCOUNTS:
+        account_dir = get_account_download_dir(account)
+        canonical_path = os.path.join(account_dir, f"{account}_{data_type}.csv")
+        if CONFIG['incremental_sync'] and os.path.exists(canonical_path):
+            # The canonical dataset already holds every row of the individual downloads
+            files.append(canonical_path)
+        else:
+            files.extend(sorted(glob(os.path.join(account_dir, f"{account}_{data_type}_*.csv"))))
+    return files
+
 def consolidate_csvs(data_type, account_files):
-    """Combine CSVs for a given data type into a single file in the base download directory."""
+    """Combine CSVs for a given data type into all_<data_type>.csv in the base download directory.
+
+    Only rows not consolidated before are appended; see consolidation.consolidate().
+    """
     if not CONFIG['consolidate_output'] or not account_files:
         return
-    output_path = os.path.join(CONFIG['download_base_dir'], f"all_{data_type}_{int(time.time())}.csv")
-    headers_written = False
-    with open(output_path, 'w', newline='', encoding='utf-8') as outfile:
-        writer = csv.writer(outfile)
-        for file_path in account_files:
-            with open(file_path, 'r', encoding='utf-8') as infile:
-                reader = csv.reader(infile)
-                headers = next(reader)
-                if not headers_written:
-                    writer.writerow(['Account ID'] + headers)
-                    headers_written = True
-                account_id = os.path.basename(os.path.dirname(file_path))
-                for row in reader:
-                    writer.writerow([account_id] + row)
-    logging.info(f"Consolidated {data_type} CSVs to {output_path}")
+    output_path = os.path.join(CONFIG['download_base_dir'], f"all_{data_type}.csv")
+    inputs = [(os.path.basename(os.path.dirname(file_path)), file_path) for file_path in account_files]
+    try:
+        consolidation.consolidate(output_path, inputs, chunk_size=CONFIG['consolidate_chunk_rows'])
+        logging.info("Consolidated %s CSVs to %s", data_type, output_path)
+    except Exception as e:
+        logging.error("Failed to consolidate %s CSVs: %s", data_type, e, exc_info=True)
 
+@timed_step
 def login():
     """Log in to ICICI Direct, allowing manual OTP entry on the website."""
     logging.info("Starting login")
     try:
-        driver.get("https://secure.icicidirect.com/customer/login")
-        logging.info(f"Navigated to login page. Title: {driver.title}, URL: {driver.current_url}")
+        driver.get(f"{CONFIG['base_url']}/customer/login")
+        logging.info("Navigated to login page.%s", page_details())
         driver.set_window_size(1536, 816)
         wait.until(EC.presence_of_element_located((By.ID, "txtu"))).send_keys(USERNAME)
         wait.until(EC.presence_of_element_located((By.ID, "txtp"))).send_keys(PASSWORD)
         wait.until(EC.element_to_be_clickable((By.ID, "btnlogin"))).click()
         logging.info("Login button clicked")
 
-        # Wait for either OTP page or dashboard
+        # Wait for either OTP page or dashboard, racing the locators of both
+        otp_field_locators = [
+            (By.ID, "higootp"),
+            (By.XPATH, "//input[@type='text' and contains(@id, 'otp')]")
+        ]
+        dashboard_locators = [
+            (By.CSS_SELECTOR, ".mrl10"),
+            (By.XPATH, "//a[@id='dropdownMenuButton1']")
+        ]
         start_time = time.time()
         otp_required = False
         while time.time() - start_time < CONFIG['login_timeout']:
             try:
-                # Check for OTP field
-                otp_field_locators = [
-                    (By.ID, "higootp"),
-                    (By.XPATH, "//input[@type='text' and contains(@id, 'otp')]")
-                ]
-                for locator in otp_field_locators:
-                    try:
-                        wait.until(EC.presence_of_element_located(locator))
-                        otp_required = True
-                        logging.info("OTP page detected. Waiting for manual OTP entry on website.")
-                        break
-                    except:
-                        continue
-                # Check for dashboard
-                dashboard_locators = [
-                    (By.CSS_SELECTOR, ".mrl10"),
-                    (By.XPATH, "//a[@id='dropdownMenuButton1']")
-                ]
-                for locator in dashboard_locators:
-                    try:
-                        wait.until(EC.presence_of_element_located(locator))
-                        logging.info(f"Dashboard detected. Title: {driver.title}, URL: {driver.current_url}")
-                        return
-                    except:
-                        continue
+                _, locator = locator_registry.find(driver, "login.landing", dashboard_locators + otp_field_locators,
+                                                   timeout=2, visible=False)
+                if locator in dashboard_locators:
+                    logging.info("Dashboard detected.%s", page_details())
+                    return
+                if locator in otp_field_locators and not otp_required:
+                    otp_required = True
+                    logging.info("OTP page detected. Waiting for manual OTP entry on website.")
                 if otp_required:
-                    logging.info(f"Still on OTP page. Title: {driver.title}, URL: {driver.current_url}")
+                    logging.info("Still on OTP page.%s", page_details())
                 else:
-                    logging.info(f"Checking for OTP or dashboard. Title: {driver.title}, URL: {driver.current_url}")
+                    logging.info("Checking for OTP or dashboard.%s", page_details())
                 time.sleep(2)  # Poll every 2 seconds
             except Exception as e:
-                logging.warning(f"Login check failed: {str(e)}")
+                logging.warning("Login check failed: %s", e)
                 time.sleep(2)
         raise TimeoutError(f"Login failed: Did not reach dashboard within {CONFIG['login_timeout']} seconds")
     except Exception as e:
-        logging.error(f"Login failed: {str(e)}\n{traceback.format_exc()}")
+        logging.error("Login failed: %s", e, exc_info=True)
         raise
 
-@retry(stop_max_attempt_number=3, wait_fixed=2000)
+def normalize_cookie(cookie):
+    """Convert a stored cookie (WebDriver or DevTools export format) to what add_cookie accepts."""
+    allowed = ('name', 'value', 'path', 'domain', 'secure', 'httpOnly', 'expiry', 'sameSite')
+    normalized = {key: cookie[key] for key in allowed if key in cookie}
+    expires = cookie.get('expires')
+    if 'expiry' not in normalized and expires not in (None, -1):
+        # DevTools exports use milliseconds, WebDriver uses seconds
+        normalized['expiry'] = int(expires / 1000 if expires > 10 ** 11 else expires)
+    if normalized.get('sameSite') not in ('Strict', 'Lax', 'None') or \
+            (normalized.get('sameSite') == 'None' and not normalized.get('secure')):
+        normalized.pop('sameSite', None)
+    return normalized
+
+def save_session_cookies(path):
+    """Save the cookies of the current browser session to a JSON file only the current user can read."""
+    cookies = driver.get_cookies()
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.chmod(path, 0o600)  # os.open only applies the mode to new files
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(cookies, f, indent=2)
+    logging.info("Saved %s session cookies to %s", len(cookies), path)
+
+def load_session_cookies(path):
+    """Load stored session cookies, dropping those that have already expired."""
+    if not path or not os.path.exists(path):
+        logging.info("No stored session found at %s", path)
+        return []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+    except Exception as e:
+        logging.warning("Could not read stored session %s: %s", path, e)
+        return []
+    now = time.time()
+    cookies = [normalize_cookie(cookie) for cookie in stored]
+    cookies = [cookie for cookie in cookies if cookie.get('expiry', now + 1) > now]
+    logging.info("Loaded %s of %s stored session cookies from %s", len(cookies), len(stored), path)
+    return cookies
+
+def session_is_valid(timeout=None):
+    """Open the dashboard and report whether the browser is still logged in."""
+    timeout = timeout or CONFIG['session_probe_timeout']
+    driver.get(f"{CONFIG['base_url']}/trading/equity/home")
+    try:
+        # An expired session redirects to the login form, so stop at whichever appears first
+        WebDriverWait(driver, timeout).until(EC.any_of(
+            EC.presence_of_element_located((By.CSS_SELECTOR, ".mrl10")),
+            EC.presence_of_element_located((By.ID, "txtu"))
+        ))
+    except Exception:
+        logging.info("Session probe timed out after %s seconds", timeout)
+        return False
+    if driver.find_elements(By.CSS_SELECTOR, ".mrl10"):
+        logging.info("Session is valid.%s", page_details())
+        return True
+    logging.info("Session expired, redirected to %s", driver.current_url)
+    return False
+
+def apply_session_cookies(cookies):
+    """Load session cookies into the current browser and return True if they give a logged-in dashboard."""
+    driver.get(f"{CONFIG['base_url']}/favicon.ico")  # Cookies can only be set for the current domain
+    driver.set_window_size(1536, 816)
+    added = 0
+    for cookie in cookies:
+        try:
+            driver.add_cookie(normalize_cookie(cookie))
+            added += 1
+        except Exception as e:
+            logging.debug("Skipped cookie %s: %s", cookie.get('name'), e)
+    logging.info("Applied %s of %s session cookies", added, len(cookies))
+    return session_is_valid()
+
+def session_file_for(account=None):
+    """Session cookie file of this tenant, or of the parallel worker processing the given account."""
+    if not account:
+        return CONFIG['session_file']
+    root, ext = os.path.splitext(CONFIG['session_file'])
+    return f"{root}_{account}{ext}"
+
+@timed_step
+def ensure_session(session_file=None):
+    """Reuse the stored session when it is still valid, otherwise log in and store the new session."""
+    session_file = session_file or CONFIG['session_file']
+    if CONFIG['reuse_session']:
+        cookies = load_session_cookies(session_file) or load_session_cookies(CONFIG['session_seed_file'])
+        if cookies and apply_session_cookies(cookies):
+            logging.info("Restored stored session, skipping login")
+            return
+    login()
+    save_session_cookies(session_file)
+
+@timed_step
+def ensure_worker_session(account, seed_cookies=None):
+    """Log a parallel worker in from its stored session or the parent's login cookies, and only then by itself."""
+    session_file = session_file_for(account)
+    if CONFIG['reuse_session']:
+        cookies = load_session_cookies(session_file)
+        if cookies and apply_session_cookies(cookies):
+            logging.info("Restored stored session of worker %s, skipping login", account)
+            return
+    if seed_cookies:
+        if apply_session_cookies(seed_cookies):
+            logging.info("Seeded worker %s from the parent login, skipping login", account)
+            save_session_cookies(session_file)
+            return
+        logging.warning("Parent session rejected in worker %s, logging in separately", account)
+    login()
+    save_session_cookies(session_file)
+
+# Confirm button of the account selection panel (pnlSelMDP)
+CONFIRM_BUTTON_LOCATORS = [
+    (By.CSS_SELECTOR, ".btn-short"),
+    (By.XPATH, "//div[@id='pnlSelMDP']/div[2]/input"),
+    (By.XPATH, "//input[@type='button' and contains(@value, 'Confirm')]")
+]
+
+@timed_step
 def switch_account(account_id):
-    """Switch to the specified sub-account with retry logic."""
-    logging.info(f"Switching to account {account_id}")
+    """Switch to the specified sub-account, by script when possible and through the dropdown UI otherwise."""
+    logging.info("Switching to account %s", account_id)
+    if CONFIG['fast_account_switch']:
+        try:
+            confirm_locators = locator_registry.ordered("switch_account.confirm_button", CONFIRM_BUTTON_LOCATORS)
+            if account_switch.fast_switch(driver, account_id, confirm_locators, CONFIG['fast_switch_timeout']):
+                page_ready("switch_account: scripted")
+                logging.info("Switched to account %s by script", account_id)
+                return
+        except ValueError:
+            raise
+        except Exception as e:
+            logging.warning("Scripted switch to account %s failed, using the dropdown UI: %s", account_id, e)
+    switch_account_ui(account_id)
+
+@retry(stop_max_attempt_number=3, wait_fixed=2000, retry_on_exception=tracing.record_retry)
+def switch_account_ui(account_id):
+    """Switch to the specified sub-account through the header menu and account dropdown, with retry logic."""
     try:
         # Click account button
         account_btn_locators = [
@@ -166,19 +633,12 @@ def switch_account(account_id):
             (By.XPATH, "//a[@id='dropdownMenuButton1']/span[2]"),
             (By.XPATH, "//a[contains(@class, 'dropdown-toggle')]")
         ]
-        account_btn = None
-        for locator in account_btn_locators:
-            try:
-                account_btn = wait.until(EC.element_to_be_clickable(locator))
-                logging.info(f"Found account button with locator {locator}")
-                ActionChains(driver).move_to_element(account_btn).click().perform()
-                logging.info(f"Clicked account button. Title: {driver.title}, URL: {driver.current_url}")
-                break
-            except:
-                logging.warning(f"Failed to find account button with locator {locator}")
-                continue
+        account_btn, locator = locator_registry.find(driver, "switch_account.account_button", account_btn_locators)
         if not account_btn:
             raise Exception("Account switch button not found")
+        logging.info("Found account button with locator %s", locator)
+        ActionChains(driver).move_to_element(account_btn).click().perform()
+        logging.info("Clicked account button.%s", page_details())
 
         # Click account option (e.g., 'Select Account')
         account_option_locators = [
@@ -186,191 +646,220 @@ def switch_account(account_id):
             (By.XPATH, "//div[@id='pnlHeadLogin']//li[2]/div/div[2]"),
             (By.XPATH, "//li[contains(@class, 'dropdown-item')]//div[contains(text(), 'Select Account')]")
         ]
-        account_option = None
-        for locator in account_option_locators:
-            try:
-                account_option = wait.until(EC.element_to_be_clickable(locator))
-                logging.info(f"Found account option with locator {locator}")
-                ActionChains(driver).move_to_element(account_option).click().perform()
-                logging.info(f"Clicked account option. Title: {driver.title}, URL: {driver.current_url}")
-                break
-            except:
-                logging.warning(f"Failed to find account option with locator {locator}")
-                continue
+        account_option, locator = locator_registry.find(driver, "switch_account.account_option", account_option_locators)
         if not account_option:
             raise Exception("Account option not found")
+        logging.info("Found account option with locator %s", locator)
+        ActionChains(driver).move_to_element(account_option).click().perform()
+        logging.info("Clicked account option.%s", page_details())
 
         # Select account from dropdown
         dropdown = wait.until(EC.presence_of_element_located((By.ID, "drpAccount")))
         select = Select(dropdown)
-        options = [option.get_attribute("value") for option in select.options]
-        logging.info(f"Available account IDs: {options}")
+        options = account_switch.account_options(driver)
+        logging.debug("Available account IDs: %s", options)
 
-        # Try exact match
-        if account_id in options:
-            select.select_by_value(account_id)
-            logging.info(f"Selected account {account_id} by exact match")
-        else:
-            # Try partial match
-            for option in options:
-                if account_id.split('-')[-2] in option:  # Match middle part (e.g., 6500081466)
-                    select.select_by_value(option)
-                    logging.info(f"Selected account {option} by partial match for {account_id}")
-                    break
-            else:
-                raise ValueError(f"Account ID {account_id} not found in dropdown options: {options}")
+        # Exact match, else partial match on the middle part (e.g., 6500081466)
+        option = account_switch.match_option(options, account_id)
+        if option is None:
+            raise ValueError(f"Account ID {account_id} not found in dropdown options: {options}")
+        select.select_by_value(option)
+        logging.info("Selected account %s for %s", option, account_id)
 
         # Click confirm button
-        confirm_btn_locators = [
-            (By.CSS_SELECTOR, ".btn-short"),
-            (By.XPATH, "//div[@id='pnlSelMDP']/div[2]/input"),
-            (By.XPATH, "//input[@type='button' and contains(@value, 'Confirm')]")
-        ]
-        for locator in confirm_btn_locators:
-            try:
-                confirm_btn = wait.until(EC.element_to_be_clickable(locator))
-                logging.info(f"Found confirm button with locator {locator}")
-                ActionChains(driver).move_to_element(confirm_btn).click().perform()
-                logging.info(f"Clicked confirm button. Title: {driver.title}, URL: {driver.current_url}")
-                break
-            except:
-                logging.warning(f"Failed to find confirm button with locator {locator}")
-                continue
-        else:
+        confirm_btn, locator = locator_registry.find(driver, "switch_account.confirm_button", CONFIRM_BUTTON_LOCATORS)
+        if not confirm_btn:
             raise Exception("Confirm button not found")
-
-        logging.info(f"Switched to account {account_id}")
-        time.sleep(1)
+        logging.info("Found confirm button with locator %s", locator)
+        with page_change("switch_account: confirm"):
+            ActionChains(driver).move_to_element(confirm_btn).click().perform()
+            logging.info("Clicked confirm button.%s", page_details())
+        logging.info("Switched to account %s", account_id)
     except Exception as e:
-        logging.error(f"Failed to switch to account {account_id}: {str(e)}\n{traceback.format_exc()}")
+        logging.error("Failed to switch to account %s: %s", account_id, e, exc_info=True)
         raise
 
-@retry(stop_max_attempt_number=3, wait_fixed=2000)
+@timed_step
+@retry(stop_max_attempt_number=3, wait_fixed=2000, retry_on_exception=tracing.record_retry)
 def download_tradebook(account_id):
-    """Download Trade Book CSV for the current account with retry logic."""
-    logging.info(f"Downloading Trade Book for account {account_id}")
+    """Download Trade Book CSV for the current account with retry logic and return the downloaded file."""
+    logging.info("Downloading Trade Book for account %s", account_id)
     try:
+        downloaded_file = direct_download(account_id, "tradebook")
+        if downloaded_file:
+            return downloaded_file
         wait.until(EC.element_to_be_clickable((By.LINK_TEXT, "Trade Book"))).click()
-        logging.info(f"Clicked Trade Book link. Title: {driver.title}, URL: {driver.current_url}")
-        wait.until(EC.element_to_be_clickable((By.ID, "hypPeriod"))).click()
-        wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "label[for='month']"))).click()  # Click on the month option
-        time.sleep(2)
-        wait.until(EC.element_to_be_clickable((By.ID, "btnview"))).click()
-        time.sleep(5)
+        logging.info("Clicked Trade Book link.%s", page_details())
+        with page_change("download_tradebook: period"):
+            wait.until(EC.element_to_be_clickable((By.ID, "hypPeriod"))).click()
+            select_period(account_id, "tradebook")
+        with page_change("download_tradebook: view"):
+            wait.until(EC.element_to_be_clickable((By.ID, "btnview"))).click()
         download_menu = wait.until(EC.element_to_be_clickable((By.XPATH, "//div[@id='dvequity']//div[@class='pull-right']")))
         ActionChains(driver).move_to_element(download_menu).click().perform()
         csv_link = wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(text(),'CSV')]")))
+        clicked_at = time.time()
         driver.execute_script("arguments[0].click();", csv_link)  # JavaScript click
-        downloaded_file = wait_for_download(account_id, "TradeBook")
-        rename_downloaded_file(downloaded_file, account_id, "tradebook")
-        time.sleep(2)
+        downloaded_file = wait_for_download(account_id, "TradeBook", clicked_at)
+        remember_export_request(account_id, "tradebook")
+        return downloaded_file
     except Exception as e:
-        logging.error(f"Failed to download Trade Book for account {account_id}: {str(e)}\n{traceback.format_exc()}")
+        logging.error("Failed to download Trade Book for account %s: %s", account_id, e, exc_info=True)
         raise
 
-@retry(stop_max_attempt_number=3, wait_fixed=2000)
+@timed_step
+@retry(stop_max_attempt_number=3, wait_fixed=2000, retry_on_exception=tracing.record_retry)
 def download_portfolio(account_id):
-    """Download Portfolio Summary CSV for the current account with retry logic."""
-    logging.info(f"Downloading Portfolio for account {account_id}")
+    """Download Portfolio Summary CSV for the current account with retry logic and return the downloaded file."""
+    logging.info("Downloading Portfolio for account %s", account_id)
     try:
-        wait.until(EC.element_to_be_clickable((By.XPATH, "//a[@class='sub-navlink' and contains(text(), 'Portfolio')]"))).click()
-        logging.info(f"Clicked Portfolio link. Title: {driver.title}, URL: {driver.current_url}")
-        time.sleep(5)
+        downloaded_file = direct_download(account_id, "portfolio")
+        if downloaded_file:
+            return downloaded_file
+        with page_change("download_portfolio: open"):
+            wait.until(EC.element_to_be_clickable((By.XPATH, "//a[@class='sub-navlink' and contains(text(), 'Portfolio')]"))).click()
+            logging.info("Clicked Portfolio link.%s", page_details())
         third_li = wait.until(EC.presence_of_element_located((By.XPATH, "(//div[@class='pull-right']//ul[contains(@class,'grid_menu')]/li)[3]")))
-        third_li.click()
-        time.sleep(2)
+        with page_change("download_portfolio: export menu"):
+            third_li.click()
         summary_csv = wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), 'Summary: CSV')]")))
+        clicked_at = time.time()
         driver.execute_script("arguments[0].click();", summary_csv)  # JavaScript click
-        downloaded_file = wait_for_download(account_id, "Summary")
-        rename_downloaded_file(downloaded_file, account_id, "portfolio")
-        time.sleep(2)
+        downloaded_file = wait_for_download(account_id, "Summary", clicked_at)
+        remember_export_request(account_id, "portfolio")
+        return downloaded_file
     except Exception as e:
-        logging.error(f"Failed to download Portfolio for account {account_id}: {str(e)}\n{traceback.format_exc()}")
+        logging.error("Failed to download Portfolio for account %s: %s", account_id, e, exc_info=True)
         raise
 
-@retry(stop_max_attempt_number=3, wait_fixed=2000)
-def show_orderbook(account_id):
-    """Extract Order Book data from the GTT table, display as a formatted table, and save to CSV."""
-    logging.info(f"Extracting Order Book data for account {account_id}")
-    try:
-        # Navigate to Order Book
-        wait = WebDriverWait(driver, 20)
+GTT_TABLE_XPATH = '/html/body/form/div[3]/div[3]/div/span/div[2]/div/div[2]/div/div/div[1]/form/div[2]/div[4]/div/div/div/div/table[2]'
+
+def find_gtt_table():
+    """Wait for the GTT table of the Order Book page and return it."""
+    return WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.XPATH, GTT_TABLE_XPATH)))
+
+def open_gtt_tab():
+    """Navigate to the Order Book, open its GTT tab and return the GTT table."""
+    wait = WebDriverWait(driver, 20)
+    with page_change("show_orderbook: open"):
         wait.until(EC.element_to_be_clickable((By.XPATH, '//a[@class="sub-navlink" and contains(text(), "Order Book")]'))).click()
-        logging.info(f"Clicked Order Book link. Title: {driver.title}, URL: {driver.current_url}")
-        time.sleep(2)  # Wait for the page to load
-        # Navigate to GTT tab
+        logging.info("Clicked Order Book link.%s", page_details())
+    with page_change("show_orderbook: GTT tab"):
         wait.until(EC.element_to_be_clickable((By.XPATH, "//ul[contains(@class, 'tabs-menu')]//a[normalize-space(text())='GTT']"))).click()
-        logging.info(f"Clicked GTT tab. Title: {driver.title}, URL: {driver.current_url}")
-        time.sleep(2)  # Wait for the GTT tab to load
+        logging.info("Clicked GTT tab.%s", page_details())
+    return find_gtt_table()
+
+@timed_step
+def watch_gtt(account_id, until=None):
+    """Stay on the GTT tab and record every change of the account's GTT orders until `until` (epoch seconds)."""
+    open_gtt_tab()
+    changelog = gtt_diff.ChangeLog(os.path.join(get_account_download_dir(account_id), "gtt"), CONFIG['gtt_key_columns'],
+                                   CONFIG['gtt_ignore_columns'], CONFIG['gtt_checkpoint_every'])
 
-        # Wait for table to load
-        table_xpath = '/html/body/form/div[3]/div[3]/div/span/div[2]/div/div[2]/div/div/div[1]/form/div[2]/div[4]/div/div/div/div/table[2]'
-        wait.until(EC.presence_of_element_located((By.XPATH, table_xpath)))
-        table = driver.find_element(By.XPATH, table_xpath)
+    def on_change(header_list, row_data):
+        change = changelog.record(header_list, row_data)
+        if change:
+            logging.info("GTT orders of account %s changed (#%s): %s added, %s removed, %s modified", account_id,
+                         change['seq'], len(change['added']), len(change['removed']), len(change['changed']))
+            print(f"[{change['at']}] {account_id}: " + "; ".join(
+                [f"added {row['_key']}" for row in change['added']] + [f"removed {key}" for key in change['removed']] +
+                [f"{item['key']}: " + ", ".join(f"{column} {old} -> {new}" for column, (old, new) in item['fields'].items())
+                 for item in change['changed']]))
+
+    watcher = gtt_watch.GttWatcher(driver, find_gtt_table, build_order_rows, on_change, CONFIG['gtt_watch_min_interval'],
+                                   CONFIG['gtt_watch_batch_rows'], CONFIG['gtt_watch_wait_ms'])
+    return watcher.run(until)
+
+@timed_step
+@retry(stop_max_attempt_number=3, wait_fixed=2000, retry_on_exception=tracing.record_retry)
+def show_orderbook(account_id):
+    """Extract Order Book data from the GTT table; returns {'headers', 'rows'}, or None if it has no rows."""
+    logging.info("Extracting Order Book data for account %s", account_id)
+    try:
+        table = open_gtt_tab()
 
-        # Extract headers
-        headers = table.find_elements(By.XPATH, './/thead/tr/th')
-        header_list = [header.text.strip() for header in headers if header.text.strip()]
+        # Extract headers and rows in a single script call
+        table_data = extract_table(driver, table)
+        header_list = [header for header in table_data['headers'] if header]
         if not header_list:
             raise Exception("No headers found in Order Book table")
-        logging.info(f"Extracted headers: {header_list}")
-
-        # Extract rows
-        rows = table.find_elements(By.XPATH, './/tbody/tr')
-        logging.info(f"Found {len(rows)} rows in Order Book table")
-        row_data = []
-        for row in rows:
-            # Skip hidden expandable rows
-            if "expand_content" in row.get_attribute("class"):
-                logging.debug("Skipped expand_content row")
-                continue
-            columns = row.find_elements(By.XPATH, './/td')
-            row_list = [column.text.strip() for column in columns]
-            # Include row if it has at least one non-empty cell
-            if row_list and any(cell.strip() for cell in row_list):
-                # Clean Stock column (remove 'Single' and extra spaces)
-                if row_list and len(row_list) > 0:
-                    row_list[0] = row_list[0].replace("Single", "").strip()
-                # Normalize row length
-                if len(row_list) < len(header_list):
-                    row_list.extend([""] * (len(header_list) - len(row_list)))
-                elif len(row_list) > len(header_list):
-                    row_list = row_list[:len(header_list)]
-                row_data.append(row_list)
-            else:
-                logging.debug(f"Skipped row due to no non-empty cells: {row_list}")
+        logging.info("Extracted headers: %s", header_list)
+        logging.info("Found %s rows in Order Book table", len(table_data['rows']))
+        row_data = build_order_rows(header_list, table_data['rows'])
 
         if not row_data:
             print(f"No data rows found in Order Book table for account {account_id}")
-            logging.warning(f"No data rows found in Order Book table for account {account_id}")
-            return []
-
-        # Display the table
-        print(f"\nOrder Book for Account {account_id}:")
-        print(tabulate(row_data, headers=header_list, tablefmt="grid", stralign="left", floatfmt=".2f"))
-        logging.info(f"Displayed {len(row_data)} rows for account {account_id}")
-
-        # Save to CSV
-        account_dir = get_account_download_dir(account_id)
-        orders_path = os.path.join(account_dir, f"{account_id}_orders.csv")
-        cleaned_orders_path = os.path.join(account_dir, f"{account_id}_orders_cleaned.csv")
-        with open(orders_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(header_list)
-            writer.writerows(row_data)
-        logging.info(f"Orders saved to {orders_path}")
-
-        # Clean Stock column in CSV
-        clean_stock_column(orders_path, cleaned_orders_path)
-
-        time.sleep(2)  # Allow time for file operations to complete
-        logging.info(f"Extracted and displayed {len(row_data)} rows from Order Book for account {account_id}")
-        return row_data
+            logging.warning("No data rows found in Order Book table for account %s", account_id)
+            return None
+
+        logging.info("Extracted %s rows from Order Book for account %s", len(row_data), account_id)
+        return {'headers': header_list, 'rows': row_data}
 
     except Exception as e:
-        logging.error(f"Failed to extract Order Book data for {account_id}: {str(e)}\n{traceback.format_exc()}")
+        logging.error("Failed to extract Order Book data for %s: %s", account_id, e, exc_info=True)
         raise
 
+def save_orderbook(account_id, table):
+    """Display extracted Order Book rows as a formatted table, save them to CSV and return the cleaned CSV path."""
+    header_list, row_data = table['headers'], table['rows']
+    print(f"\nOrder Book for Account {account_id}:\n"
+          + tabulate(row_data, headers=header_list, tablefmt="grid", stralign="left", floatfmt=".2f"))
+    logging.info("Displayed %s rows for account %s", len(row_data), account_id)
+
+    # Save to CSV
+    account_dir = get_account_download_dir(account_id)
+    orders_path = os.path.join(account_dir, f"{account_id}_orders.csv")
+    cleaned_orders_path = os.path.join(account_dir, f"{account_id}_orders_cleaned.csv")
+    with open(orders_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header_list)
+        writer.writerows(row_data)
+    logging.info("Orders saved to %s", orders_path)
+
+    # Clean Stock column in CSV
+    clean_stock_column(orders_path, cleaned_orders_path)
+    if CONFIG['dedupe_artifacts'] and not artifact_store.put(CONFIG['artifact_dir'], account_id, "orders", cleaned_orders_path)['changed']:
+        logging.info("Order Book of account %s is unchanged, skipping reprocessing", account_id)
+    else:
+        publish_dataset(account_id, "orders", cleaned_orders_path)
+    return cleaned_orders_path
+
+def record_gtt_changes(account_id, table):
+    """Append the changes of the GTT orders since the last run to the account's change log and return them."""
+    if not CONFIG['gtt_history']:
+        return None
+    history_dir = os.path.join(get_account_download_dir(account_id), "gtt")
+    change = gtt_diff.record(history_dir, table['headers'], table['rows'], CONFIG['gtt_key_columns'],
+                             CONFIG['gtt_ignore_columns'], CONFIG['gtt_checkpoint_every'])
+    if change:
+        logging.info("GTT orders of account %s changed (#%s): %s added, %s removed, %s modified", account_id,
+                     change['seq'], len(change['added']), len(change['removed']), len(change['changed']))
+    else:
+        logging.info("No GTT order changes for account %s", account_id)
+    return change
+
+def build_order_rows(header_list, rows):
+    """Turn extracted (row class, cell texts) pairs into cleaned Order Book rows aligned to the headers."""
+    row_data = []
+    for row_class, row_list in rows:
+        # Skip hidden expandable rows
+        if "expand_content" in (row_class or ""):
+            logging.debug("Skipped expand_content row")
+            continue
+        # Include row if it has at least one non-empty cell
+        if row_list and any(cell.strip() for cell in row_list):
+            # Clean Stock column (remove 'Single' and extra spaces)
+            row_list[0] = row_list[0].replace("Single", "").strip()
+            # Normalize row length
+            if len(row_list) < len(header_list):
+                row_list.extend([""] * (len(header_list) - len(row_list)))
+            elif len(row_list) > len(header_list):
+                row_list = row_list[:len(header_list)]
+            row_data.append(row_list)
+        else:
+            logging.debug("Skipped row due to no non-empty cells: %s", row_list)
+    return row_data
+
 def clean_stock_column(input_path, output_path):
     """Clean the Stock column in the CSV by removing 'Single' and extra spaces."""
     try:
@@ -384,29 +873,34 @@ def clean_stock_column(input_path, output_path):
                 if row and len(row) > stock_col_idx:
                     row[stock_col_idx] = row[stock_col_idx].replace("Single", "").strip()
                 writer.writerow(row)
-        logging.info(f"Cleaned Stock column and saved to {output_path}")
+        logging.info("Cleaned Stock column and saved to %s", output_path)
     except Exception as e:
-        logging.error(f"Failed to clean Stock column: {str(e)}")
+        logging.error("Failed to clean Stock column: %s", e)
         raise
 
 def angular_stable(driver):
     try:
         return driver.execute_script("return window.getAllAngularTestabilities && window.getAllAngularTestabilities().every(t => t.isStable())")
     except Exception as e:
-        logging.warning(f"Angular testability check failed: {str(e)}")
+        logging.warning("Angular testability check failed: %s", e)
         return True  # Fallback to proceed if Angular check fails
 
-@retry(stop_max_attempt_number=3, wait_fixed=2000)
+@timed_step
+@retry(stop_max_attempt_number=3, wait_fixed=2000, retry_on_exception=tracing.record_retry)
 def download_myportfolio(account_id):
-    """Download My Portfolio CSV for the current account with retry logic."""
-    logging.info(f"Downloading My Portfolio for account {account_id}")
+    """Download My Portfolio CSV for the current account with retry logic and return the downloaded file."""
+    logging.info("Downloading My Portfolio for account %s", account_id)
     try:
+        downloaded_file = direct_download(account_id, "myportfolio")
+        if downloaded_file:
+            return downloaded_file
         # Click Mutual Funds link
-        wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'a[mnu-name="mf"]'))).click()
-        logging.info(f"Clicked Mutual Funds link. Title: {driver.title}, URL: {driver.current_url}")
-        time.sleep(5)  # Wait for the page to load
-        # Switch to iframe
+        with page_change("download_myportfolio: open"):
+            wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'a[mnu-name="mf"]'))).click()
+            logging.info("Clicked Mutual Funds link.%s", page_details())
+        # Switch to iframe; the stamp marks the MF page, which "Back to old MF" inside the iframe replaces
         iframe = wait.until(EC.presence_of_element_located((By.ID, "ifrmangwh")))
+        mf_page = readiness.mark(driver)
         driver.switch_to.frame(iframe)
         logging.info("Switched to iframe 'ifrmangwh'")
 
@@ -415,107 +909,266 @@ def download_myportfolio(account_id):
             WebDriverWait(driver, 20).until(angular_stable)
             logging.info("Angular application is stable in iframe")
         except Exception as e:
-            logging.warning(f"Angular stable check failed in iframe: {str(e)}\n{traceback.format_exc()}")
+            logging.warning("Angular stable check failed in iframe: %s", e, exc_info=True)
             # Proceed if Angular check fails, relying on Div1 visibility
 
         # Wait for modal
         try:
-            time.sleep(5)
+            page_ready("download_myportfolio: iframe")
             modal = wait.until(EC.presence_of_element_located((By.ID, "Div1")))
             WebDriverWait(driver, 20).until(EC.visibility_of_element_located((By.ID, "Div1")))
             wait.until(EC.element_to_be_clickable((By.XPATH, "//div[@id='Div1']//a[text()='Get Started']"))).click()        
             wait.until(EC.element_to_be_clickable((By.XPATH, "//a[normalize-space(text())='Back to old MF']"))).click()
-            time.sleep(5)
         except Exception as e:
-            logging.error(f"Error finding Div1 modal: {str(e)}\n{traceback.format_exc()}")
+            logging.error("Error finding Div1 modal: %s", e, exc_info=True)
             raise
         finally:
             driver.switch_to.default_content()
             logging.info("Switched back to default content")
         
         # Wait for page to stabilize after Back to old MF
-        WebDriverWait(driver, 20).until(lambda d: d.execute_script("return document.readyState === 'complete'"))
+        page_ready("download_myportfolio: back to old MF", mf_page)
         logging.info("Page stabilized after Back to old MF")
         
         try:
-            time.sleep(3)
             dropdown_holding = wait.until(EC.presence_of_element_located((By.XPATH, '//*[@id="pnlmnudsp"]//ul[1]/li[2]')))
-            ActionChains(driver).move_to_element(dropdown_holding).click().perform()
-            time.sleep(3)
-            wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(text(),'My Portfolio')]"))).click()
+            with page_change("download_myportfolio: holdings menu"):
+                ActionChains(driver).move_to_element(dropdown_holding).click().perform()
+            with page_change("download_myportfolio: My Portfolio"):
+                wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(text(),'My Portfolio')]"))).click()
             
-            time.sleep(3)  # Wait for the page to load
             download_menu = wait.until(EC.presence_of_element_located((By.XPATH, "((//div[@id='dvFilter']//div)[2]/ul/li)[1]")))
             ActionChains(driver).move_to_element(download_menu).click().perform()
             
-            wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(text(),'CSV')]"))).click()
-            downloaded_file = wait_for_download(account_id, "Portfolio")
-            rename_downloaded_file(downloaded_file, account_id, "myportfolio")
-            time.sleep(2)
+            csv_link = wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(text(),'CSV')]")))
+            clicked_at = time.time()
+            csv_link.click()
+            downloaded_file = wait_for_download(account_id, "Portfolio", clicked_at)
+            remember_export_request(account_id, "myportfolio")
+            return downloaded_file
         except Exception as e:
-            logging.error(f"Failed to download My Portfolio for {account_id}: {str(e)}\n{traceback.format_exc()}")
+            logging.error("Failed to download My Portfolio for %s: %s", account_id, e, exc_info=True)
             raise
     except Exception as e:
-        logging.error(f"Failed to download My Portfolio for {account_id}: {str(e)}\n{traceback.format_exc()}")
+        logging.error("Failed to download My Portfolio for %s: %s", account_id, e, exc_info=True)
         raise
 
-@retry(stop_max_attempt_number=3, wait_fixed=2000)
+@timed_step
+@retry(stop_max_attempt_number=3, wait_fixed=2000, retry_on_exception=tracing.record_retry)
 def download_orderbook(account_id):
-    """Download My Orderbook CSV for the current account with retry logic."""
-    logging.info(f"Downloading Orderbook for account {account_id}")
+    """Download My Orderbook CSV for the current account with retry logic and return the downloaded file."""
+    logging.info("Downloading Orderbook for account %s", account_id)
     try:
+        downloaded_file = direct_download(account_id, "orderbook")
+        if downloaded_file:
+            return downloaded_file
         dropdown_order = wait.until(EC.presence_of_element_located((By.XPATH, '//*[@id="pnlmnudsp"]//ul[1]/li[9]')))
-        print(f"Dropdown Orders element found: {dropdown_order.is_displayed()}")
         ActionChains(driver).move_to_element(dropdown_order).click().perform()
-        wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(text(),'Order Book')]"))).click()
-        time.sleep(3)
+        with page_change("download_orderbook: open"):
+            wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(text(),'Order Book')]"))).click()
         
-        wait.until(EC.element_to_be_clickable((By.ID, "hypPeriod"))).click()
-        wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "label[for='month']"))).click()  # Click on the month option
-        time.sleep(2)
-        wait.until(EC.element_to_be_clickable((By.XPATH, "//div[@id='MFOrderBookDiv']//input[@value='View']"))).click()
-        time.sleep(2)
+        with page_change("download_orderbook: period"):
+            wait.until(EC.element_to_be_clickable((By.ID, "hypPeriod"))).click()
+            select_period(account_id, "orderbook")
+        with page_change("download_orderbook: view"):
+            wait.until(EC.element_to_be_clickable((By.XPATH, "//div[@id='MFOrderBookDiv']//input[@value='View']"))).click()
         
         wait.until(EC.element_to_be_clickable((By.XPATH, "//a[@class='dropdown' and normalize-space()='Download']"))).click()
-        wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(text(),'CSV')]"))).click()
-        
-        downloaded_file = wait_for_download(account_id, "OrderBook")
-        rename_downloaded_file(downloaded_file, account_id, "orderbook")
-        time.sleep(2)
+        csv_link = wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(text(),'CSV')]")))
+        clicked_at = time.time()
+        csv_link.click()
+
+        downloaded_file = wait_for_download(account_id, "OrderBook", clicked_at)
+        remember_export_request(account_id, "orderbook")
+        return downloaded_file
     except Exception as e:
-        logging.error(f"Failed to download Orderbook for {account_id}: {str(e)}\n{traceback.format_exc()}")
+        logging.error("Failed to download Orderbook for %s: %s", account_id, e, exc_info=True)
         raise
     
-def main():
-    """Main function to orchestrate data extraction."""
-    order_files = []
+# Extraction flow of one account. Browser steps run in this order on the driver thread; background
+# steps (file renames, cleaning, columnar output, datastore ingestion) run on the post-processing pool
+# as soon as their inputs exist, so the browser moves on to the next page immediately.
+ACCOUNT_FLOW = [
+    {'name': 'switch_account', 'run': switch_account},
+    {'name': 'tradebook', 'dataset': 'tradebook', 'run': download_tradebook, 'after': ['switch_account']},
+    {'name': 'store_tradebook', 'dataset': 'tradebook', 'run': store_download, 'inputs': ['tradebook'], 'kwargs': {'data_type': 'tradebook'}, 'background': True},
+    {'name': 'portfolio', 'dataset': 'portfolio', 'run': download_portfolio, 'after': ['switch_account']},
+    {'name': 'store_portfolio', 'dataset': 'portfolio', 'run': store_download, 'inputs': ['portfolio'], 'kwargs': {'data_type': 'portfolio'}, 'background': True},
+    {'name': 'orderbook_table', 'dataset': 'orders', 'run': show_orderbook, 'after': ['switch_account']},
+    {'name': 'orders', 'dataset': 'orders', 'run': save_orderbook, 'inputs': ['orderbook_table'], 'background': True},
+    {'name': 'orders_changes', 'dataset': 'orders', 'run': record_gtt_changes, 'inputs': ['orderbook_table'], 'background': True},
+    {'name': 'myportfolio', 'dataset': 'myportfolio', 'run': download_myportfolio, 'after': ['switch_account'], 'accounts': MF_ACCOUNTS},
+    {'name': 'store_myportfolio', 'dataset': 'myportfolio', 'run': store_download, 'inputs': ['myportfolio'], 'kwargs': {'data_type': 'myportfolio'}, 'background': True},
+    {'name': 'orderbook', 'dataset': 'orderbook', 'run': download_orderbook, 'after': ['myportfolio'], 'accounts': MF_ACCOUNTS},  # Needs the old MF menu
+    {'name': 'store_orderbook', 'dataset': 'orderbook', 'run': store_download, 'inputs': ['orderbook'], 'kwargs': {'data_type': 'orderbook'}, 'background': True},
+]
+
+@timed_step
+def process_account(account, pool):
+    """Run the browser steps of ACCOUNT_FLOW for one account and return the flow run; see flow_scheduler.run_flow()."""
+    logging.info("Processing account %s", account)
+    set_download_dir(get_account_download_dir(account))
+    return flow_scheduler.run_flow(flow_scheduler.select(ACCOUNT_FLOW, DATASETS), account, pool)
+
+def create_postprocess_pool():
+    """Thread pool for the background steps of the account flows."""
+    return ThreadPoolExecutor(max_workers=CONFIG['postprocess_workers'], thread_name_prefix="postprocess")
+
+def account_worker(account, config, tenant=None, seed_cookies=None):
+    """Process one account in its own browser, started from the parent's login cookies when given.
+
+    The parent's CONFIG and tenant are passed in, because spawned workers re-import this module with the
+    .env defaults instead of inheriting the parent's state.
+
+    The active account is server-side state of the portal session. Seeded workers share the parent's
+    session if the portal keys it on the copied cookies, and can then switch each other's account
+    between a switch and a download; CONFIG['seed_worker_sessions'] = False gives every worker its own login.
+    """
+    if tenant:
+        apply_tenant(tenant)
+    CONFIG.update(config)
+    account_dir = get_account_download_dir(account)
+    profile_dir = os.path.join(CONFIG['profile_base_dir'], account)
+    # Each worker process gets its own log file and writer thread; rotating one file from several processes loses records
+    root, ext = os.path.splitext(CONFIG['log_file'])
+    configure_logging(f"{root}_{account}{ext}")
+    tracing.reset()  # Forked workers inherit the spans recorded by the parent so far
+    tracing.enable(CONFIG['tracing'])
+    locator_registry.load(CONFIG['locator_stats_file'])
     try:
-        # Create base download directory
-        os.makedirs(CONFIG['download_base_dir'], exist_ok=True)
-        login()
-        for account in SUB_ACCOUNTS:
-            logging.info(f"Processing account {account}")
+        with create_postprocess_pool() as pool:
+            with browser_session(account_dir, profile_dir):
+                ensure_worker_session(account, seed_cookies)
+                run = process_account(account, pool)
+            return run.wait().get('orders')
+    except Exception as e:
+        logging.error("Worker failed for account %s: %s", account, e, exc_info=True)
+        return None
+    finally:
+        locator_registry.save()
+        export_trace(f"_{account}")
+
+def process_accounts_parallel(accounts, seed_cookies=None, tenant=None):
+    """Process accounts concurrently, one browser per account, limited to CONFIG['parallel_workers']."""
+    order_files = []
+    workers = min(CONFIG['parallel_workers'], len(accounts))
+    logging.info("Processing %s accounts with %s parallel workers", len(accounts), workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(account_worker, account, dict(CONFIG), tenant, seed_cookies): account for account in accounts}
+        for future in as_completed(futures):
+            account = futures[future]
             try:
-                switch_account(account)
-                download_tradebook(account)
-                download_portfolio(account)
-                orders = show_orderbook(account)
-                if orders:
-                    order_files.append(os.path.join(get_account_download_dir(account), f"{account}_orders_cleaned.csv"))
-                if account == 'IN303028-76957826-7510072528-NPNRO':
-                    download_myportfolio(account)
-                    download_orderbook(account)
-                    continue
+                orders_file = future.result()
             except Exception as e:
-                logging.error(f"Failed processing account {account}: {str(e)}")
+                logging.error("Worker for account %s crashed: %s", account, e)
                 continue
-        # Consolidate order files
-        consolidate_csvs("orders", order_files)
+            if orders_file:
+                order_files.append(orders_file)
+    return order_files
+
+def run_extraction():
+    """Log in, process every sub-account and consolidate the results of the current tenant."""
+    order_files, runs = [], []
+    # Create base download directory
+    os.makedirs(CONFIG['download_base_dir'], exist_ok=True)
+    with create_postprocess_pool() as pool:
+        with tracing.span("run"):
+            if CONFIG['parallel_workers'] > 1:
+                seed_cookies = None
+                if CONFIG['seed_worker_sessions']:
+                    # The only interactive login (and OTP) of the run; its cookies seed every worker's browser
+                    with browser_session(CONFIG['download_base_dir']):
+                        ensure_session()
+                        seed_cookies = driver.get_cookies()
+                order_files = process_accounts_parallel(SUB_ACCOUNTS, seed_cookies, TENANT)
+            else:
+                with browser_session(CONFIG['download_base_dir']):
+                    ensure_session()
+                    runs = [process_account(account, pool) for account in SUB_ACCOUNTS]
+        # The browser is closed; finish the background steps, then consolidate each data type in parallel
+        for run in runs:
+            orders_file = run.wait().get('orders')
+            if orders_file:
+                order_files.append(orders_file)
+        with tracing.span("consolidate"):
+            consolidations = [pool.submit(consolidate_csvs, "orders", order_files)]
+            consolidations += [pool.submit(consolidate_csvs, data_type, collect_dataset_files(data_type))
+                               for data_type in CONSOLIDATED_DATA_TYPES if data_type in DATASETS]
+            for consolidation_future in consolidations:
+                consolidation_future.result()
+
+def apply_tenant(tenant):
+    """Point the credentials, accounts, datasets and all output paths of this process at one tenant."""
+    global USERNAME, PASSWORD, SUB_ACCOUNTS, DATASETS, TENANT, http_session
+    TENANT = tenant
+    USERNAME, PASSWORD = tenant['username'], tenant['password']
+    SUB_ACCOUNTS = list(tenant['sub_accounts'])
+    DATASETS = list(tenant['datasets'])
+    MF_ACCOUNTS[:] = tenant['mf_accounts']  # Updated in place, ACCOUNT_FLOW refers to this list
+    CONFIG.update(tenants.tenant_paths(tenant, CONFIG['tenant_base_dir']))
+    http_session = None  # Never reuse another tenant's cookies for direct exports
+
+def tenant_worker(tenant, config):
+    """Run the whole extraction of one tenant in this worker process and return its outcome."""
+    start = time.time()
+    CONFIG.update(config)  # Spawned workers start from the .env defaults, not the parent's settings
+    apply_tenant(tenant)
+    os.makedirs(os.path.dirname(CONFIG['log_file']), exist_ok=True)
+    configure_logging(CONFIG['log_file'])
+    tracing.reset()  # Worker processes are reused across tenants and may be forked from a tracing parent
+    tracing.enable(CONFIG['tracing'])
+    locator_registry.load(CONFIG['locator_stats_file'])
+    outcome = {'tenant': tenant['id'], 'accounts': len(SUB_ACCOUNTS), 'status': 'ok', 'error': ''}
+    try:
+        run_extraction()
     except Exception as e:
-        logging.error(f"Script failed: {str(e)}\n{traceback.format_exc()}")
+        logging.error("Extraction failed for tenant %s: %s", tenant['id'], e, exc_info=True)
+        outcome.update(status='failed', error=str(e))
     finally:
-        driver.quit()
-        logging.info("Browser closed")
+        locator_registry.save()
+        export_trace()
+    outcome['seconds'] = round(time.time() - start, 1)
+    return outcome
+
+def run_tenants(tenant_list):
+    """Distribute tenants over a fleet of at most CONFIG['tenant_workers'] worker processes.
+
+    Each tenant worker opens one browser, or one per account worker when CONFIG['parallel_workers'] is
+    above 1, so at most tenant_workers x parallel_workers browsers run at once.
+    """
+    workers = min(CONFIG['tenant_workers'], len(tenant_list))
+    logging.info("Processing %s tenants with %s tenant workers, at most %s browsers at once",
+                 len(tenant_list), workers, workers * max(1, CONFIG['parallel_workers']))
+    outcomes = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(tenant_worker, tenant, dict(CONFIG)): tenant['id'] for tenant in tenants.schedule_order(tenant_list)}
+        for future in as_completed(futures):
+            try:
+                outcome = future.result()
+            except Exception as e:
+                outcome = {'tenant': futures[future], 'accounts': '', 'status': 'crashed', 'error': str(e), 'seconds': ''}
+            logging.info("Tenant %s finished: %s in %ss", outcome['tenant'], outcome['status'], outcome['seconds'])
+            outcomes.append(outcome)
+    print(tabulate([[o['tenant'], o['accounts'], o['status'], o['seconds'], o['error']] for o in outcomes],
+                   headers=['Tenant', 'Accounts', 'Status', 'Seconds', 'Error'], tablefmt="grid"))
+    return outcomes
+
+def main():
+    """Main function to orchestrate data extraction."""
+    configure_logging(CONFIG['log_file'])
+    tracing.enable(CONFIG['tracing'])
+    locator_registry.load(CONFIG['locator_stats_file'])
+    try:
+        tenant_list = tenants.load_registry(CONFIG['tenants_file'], DATASETS)
+        if tenant_list:
+            run_tenants(tenant_list)
+        else:
+            run_extraction()
+    except Exception as e:
+        logging.error("Script failed: %s", e, exc_info=True)
+    finally:
+        locator_registry.save()
+        export_trace()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,510 @@
+import csv
+import io
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+import uuid
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Offline stand-in for secure.icicidirect.com. It reproduces the DOM contracts main.py relies on
+# (element ids, classes, link texts and the absolute XPath of the GTT table) with configurable
+# latency, data volume and failure injection. Point CONFIG['base_url'] (or ICICI_BASE_URL) at it.
+
+ACCOUNTS = [
+    'IN303028-76957800-6500081466-NRE',
+    'IN303028-76957818-7500062485-NRO',
+    'IN303028-76957826-7510072528-NPNRO',
+]
+SYMBOLS = ['INFY', 'TCS', 'HDFCBANK', 'RELIANCE', 'ITC', 'SBIN', 'WIPRO', 'LT', 'AXISBANK', 'MARUTI', 'TITAN', 'ONGC']
+SCHEMES = ['ICICI Pru Bluechip Fund', 'ICICI Pru Value Discovery Fund', 'ICICI Pru Liquid Fund', 'ICICI Pru Balanced Advantage Fund']
+GTT_HEADERS = ['Stock', 'Date', 'Buy/Sell', 'LTP', 'Trigger Price', 'Limit Price', 'Quantity', 'Status', 'Actions']
+
+DEFAULT_OPTIONS = {
+    'latency_ms': 0,  # Server-side delay added to every response
+    'render_ms': 300,  # Client-side delay (with a visible spinner) before grids and tables render
+    'gtt_rows': 20,  # GTT orders per account
+    'trade_rows': 60,  # Trades per account over the last month
+    'holding_rows': 12,  # Equity holdings per account
+    'fail_rate': 0.0,  # Probability that a page load or export answers 500
+    'session_ttl': 0,  # Seconds until a session expires (0 = never)
+    'require_otp': False,  # Show the OTP page after the password
+    'otp_autofill_ms': 500,  # Delay before the OTP page submits itself (simulates the user)
+    'tick_ms': 0,  # Interval of LTP updates in the GTT table (0 = static)
+    'seed': 7,  # Seed of the generated data
+}
+
+STYLE = """
+body { font-family: sans-serif; margin: 0; }
+.hidden, .dropdown-menu, #periodBox, #pnlHeadLogin, #pnlSelMDP, .submenu { display: none; }
+.open > .dropdown-menu, .open > .submenu, #pnlHeadLogin.open, #pnlSelMDP.open, #periodBox.open { display: block; }
+.blockUI { position: fixed; top: 0; left: 0; right: 0; bottom: 0; background: rgba(0,0,0,.2); }
+#pnlmnudsp ul, .grid_menu, .tabs-menu { list-style: none; display: flex; gap: 12px; padding: 0; }
+#pnlmnudsp li, .grid_menu > li { position: relative; }
+.dropdown-menu, .submenu { position: absolute; background: #fff; border: 1px solid #ccc; list-style: none; padding: 4px; z-index: 5; }
+a { cursor: pointer; color: #0645ad; }
+table { border-collapse: collapse; } td, th { border: 1px solid #ddd; padding: 2px 6px; }
+"""
+
+# Shared page script: menus, account selection, exports and the loading spinner
+PAGE_SCRIPT = """
+function showSpinner() { var s = document.createElement('div'); s.className = 'blockUI'; document.body.appendChild(s); return s; }
+function afterRender(fn) { var s = showSpinner(); setTimeout(function() { fn(); s.remove(); }, RENDER_MS); }
+document.addEventListener('click', function(e) {
+    var li = e.target.closest('.grid_menu > li, #dvFilter li, #pnlmnudsp li.has-sub');
+    if (li) { li.classList.toggle('open'); return; }
+    var pullRight = e.target.closest('.pull-right');
+    if (pullRight) { pullRight.querySelectorAll('.grid_menu > li').forEach(function(el) { el.classList.add('open'); }); }
+});
+function toggleHeadMenu() { document.getElementById('pnlHeadLogin').classList.toggle('open'); }
+function showSelectAccount() { document.getElementById('pnlSelMDP').classList.add('open'); }
+function selectMdp() {
+    var account = document.getElementById('drpAccount').value;
+    fetch('/trading/selectmdp', {method: 'POST', headers: {'Content-Type': 'application/x-www-form-urlencoded'},
+        body: 'drpAccount=' + encodeURIComponent(account)}).then(function() { location.reload(); });
+}
+function CallExport(opts) {
+    var form = document.createElement('form');
+    form.method = 'post'; form.action = '/trading/export';
+    var fields = {PageCode: opts.PageCode, ExpotType: opts.ExpotType, FileName: opts.FileName, Period: window.selectedPeriod || 31};
+    Object.keys(fields).forEach(function(name) {
+        var input = document.createElement('input'); input.type = 'hidden'; input.name = name; input.value = fields[name]; form.appendChild(input);
+    });
+    document.body.appendChild(form); form.submit(); form.remove();
+}
+function togglePeriod() { document.getElementById('periodBox').classList.toggle('open'); }
+document.addEventListener('change', function(e) { if (e.target.name === 'period') { window.selectedPeriod = e.target.value; } });
+"""
+
+def render(template, **values):
+    """Fill {{name}} placeholders of a template."""
+    for name, value in values.items():
+        template = template.replace('{{' + name + '}}', str(value))
+    return template
+
+def account_number(account_id):
+    """Middle number of an account ID, as shown in the portal header."""
+    return account_id.split('-')[-2]
+
+class PortalState:
+    """Sessions and generated data shared by all request handlers."""
+
+    def __init__(self, options):
+        self.options = dict(DEFAULT_OPTIONS, **options)
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.random = random.Random(self.options['seed'])
+        self.data = {account: self.generate(account) for account in ACCOUNTS}
+
+    def generate(self, account):
+        """Generate the deterministic datasets of one account."""
+        rng = random.Random(f"{self.options['seed']}-{account}")
+        today = date.today()
+        trades = []
+        for i in range(self.options['trade_rows']):
+            day = today - timedelta(days=rng.randint(0, 30))
+            qty, price = rng.randint(1, 200), round(rng.uniform(100, 4000), 2)
+            trades.append([day.strftime('%d-%b-%Y'), rng.choice(SYMBOLS), rng.choice(['Buy', 'Sell']), qty, f"{price:.2f}",
+                           f"{qty * price:.2f}", f"{qty * price * 0.0005:.2f}", f"2025{i:08d}", 'T+1'])
+        trades.sort(key=lambda row: datetime.strptime(row[0], '%d-%b-%Y'), reverse=True)
+        holdings = []
+        for symbol in rng.sample(SYMBOLS, min(self.options['holding_rows'], len(SYMBOLS))):
+            qty, cost, ltp = rng.randint(1, 500), round(rng.uniform(100, 4000), 2), round(rng.uniform(100, 4000), 2)
+            holdings.append([symbol, f"{symbol} Ltd", qty, f"{cost:.2f}", f"{ltp:.2f}", f"{qty * cost:.2f}",
+                             f"{qty * ltp:.2f}", f"{qty * (ltp - cost):.2f}"])
+        mf_holdings = [[scheme, f"{rng.randint(1000000, 9999999)}", f"{rng.uniform(10, 5000):.3f}", f"{rng.uniform(10, 900):.4f}",
+                        f"{rng.uniform(1000, 500000):.2f}", f"{rng.uniform(1000, 500000):.2f}"] for scheme in SCHEMES]
+        mf_orders = [[(today - timedelta(days=rng.randint(0, 30))).strftime('%d-%b-%Y'), rng.choice(SCHEMES),
+                      rng.choice(['Purchase', 'Redemption', 'SIP']), f"{rng.uniform(1000, 50000):.2f}",
+                      f"{rng.uniform(1, 500):.3f}", rng.choice(['Allotted', 'Pending']), f"MF{i:06d}"] for i in range(10)]
+        gtt = []
+        for i in range(self.options['gtt_rows']):
+            ltp = round(rng.uniform(100, 4000), 2)
+            gtt.append({
+                'id': f"GTT{i:05d}", 'stock': rng.choice(SYMBOLS),
+                'date': (today - timedelta(days=rng.randint(0, 60))).strftime('%d-%b-%Y'),
+                'side': rng.choice(['Buy', 'Sell']), 'ltp': ltp, 'trigger': round(ltp * 0.95, 2),
+                'limit': round(ltp * 0.94, 2), 'qty': rng.randint(1, 100), 'status': 'Active',
+            })
+        return {'tradebook': trades, 'portfolio': holdings, 'myportfolio': mf_holdings, 'orderbook': mf_orders, 'gtt': gtt}
+
+    def new_session(self):
+        """Create an anonymous session and return its ID."""
+        sid = uuid.uuid4().hex
+        with self.lock:
+            self.sessions[sid] = {'created': time.time(), 'logged_in': False, 'account': ACCOUNTS[0]}
+        return sid
+
+    def get_session(self, sid):
+        """Return a live session or None if it does not exist or has expired."""
+        with self.lock:
+            session = self.sessions.get(sid)
+            ttl = self.options['session_ttl']
+            if session and ttl and time.time() - session['created'] > ttl:
+                del self.sessions[sid]
+                return None
+            return session
+
+EXPORTS = {
+    'eqtrdbook': ('tradebook', ['Trade Date', 'Stock', 'Action', 'Quantity', 'Price', 'Trade Value', 'Brokerage', 'Order Ref', 'Settlement']),
+    'eqpfdtls': ('portfolio', ['Stock', 'Company Name', 'Qty', 'Average Cost Price', 'Current Market Price', 'Value At Cost',
+                               'Value At Market Price', 'Unrealized Profit/Loss']),
+    'mfportfolio': ('myportfolio', ['Scheme Name', 'Folio', 'Units', 'NAV', 'Current Value', 'Invested Value']),
+    'mforderbook': ('orderbook', ['Order Date', 'Scheme Name', 'Transaction Type', 'Amount', 'Units', 'Status', 'Order No']),
+}
+
+EQUITY_PAGES = {
+    '/trading/equity/home': 'home',
+    '/trading/equity/tradebook': 'tradebook',
+    '/trading/equity/portfoliodetail': 'portfolio',
+    '/trading/equity/orderbook': 'orderbook',
+}
+
+MF_PAGES = {
+    '/trading/mf/portfoliodetail': 'mfhome',
+    '/trading/mf/myportfolio': 'myportfolio',
+    '/trading/mf/orderbook': 'mforderbook',
+}
+
+class PortalHandler(BaseHTTPRequestHandler):
+    """Serves the mock portal pages, the account switch and the CSV exports."""
+
+    server_version = 'MockICICI/1.0'
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, fmt, *args):
+        logging.debug("mock portal: " + fmt, *args)
+
+    def session_id(self):
+        for part in self.headers.get('Cookie', '').split(';'):
+            name, _, value = part.strip().partition('=')
+            if name == 'ASP.NET_SessionId':
+                return value
+        return None
+
+    def send(self, status, body, content_type='text/html; charset=utf-8', headers=None):
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def redirect(self, location, headers=None):
+        self.send(302, '', headers=dict(headers or {}, Location=location))
+
+    def read_form(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode('utf-8')).items()}
+
+    def inject(self):
+        """Apply latency and failure injection; return True if the request was answered with a failure."""
+        if self.state.options['latency_ms']:
+            time.sleep(self.state.options['latency_ms'] / 1000)
+        if self.state.options['fail_rate'] and self.state.random.random() < self.state.options['fail_rate']:
+            self.send(500, '<html><body><h1>Service Unavailable</h1></body></html>')
+            return True
+        return False
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/favicon.ico':
+            return self.send(200, b'', 'image/x-icon')
+        if self.inject():
+            return
+        if path in ('/', '/customer/login'):
+            sid = self.session_id() if self.state.get_session(self.session_id()) else self.state.new_session()
+            return self.send(200, LOGIN_PAGE, headers={'Set-Cookie': f"ASP.NET_SessionId={sid}; Path=/; HttpOnly"})
+        session = self.state.get_session(self.session_id())
+        if path == '/customer/otp' and session:
+            return self.send(200, render(OTP_PAGE, OTP_AUTOFILL_MS=self.state.options['otp_autofill_ms']))
+        if not session or not session['logged_in']:
+            return self.redirect('/customer/login')
+        if path in EQUITY_PAGES:
+            return self.send(200, self.equity_page(EQUITY_PAGES[path], session))
+        if path == '/trading/mf/home':
+            return self.send(200, self.layout(MF_HOME_CONTENT, session, MF_NAV))
+        if path == '/trading/mf/angular':
+            return self.send(200, render(MF_IFRAME_PAGE, RENDER_MS=self.state.options['render_ms']))
+        if path in MF_PAGES:
+            return self.send(200, self.mf_page(MF_PAGES[path], session))
+        if path == '/trading/gtt.json':
+            return self.send(200, json.dumps(self.gtt_rows(session)), 'application/json')
+        self.send(404, '<html><body>Not found</body></html>')
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if self.inject():
+            return
+        form = self.read_form()
+        session = self.state.get_session(self.session_id())
+        if path == '/customer/login':
+            if not session:
+                return self.redirect('/customer/login')
+            if self.state.options['require_otp']:
+                return self.redirect('/customer/otp')
+            session['logged_in'] = True
+            return self.redirect('/trading/equity/home')
+        if path == '/customer/otp' and session:
+            session['logged_in'] = True
+            return self.redirect('/trading/equity/home')
+        if not session or not session['logged_in']:
+            return self.redirect('/customer/login')
+        if path == '/trading/selectmdp':
+            account = form.get('drpAccount')
+            if account not in ACCOUNTS:
+                return self.send(400, 'Unknown account', 'text/plain')
+            session['account'] = account
+            return self.send(200, json.dumps({'account': account}), 'application/json')
+        if path == '/trading/export':
+            return self.export(form, session)
+        self.send(404, 'Not found', 'text/plain')
+
+    def export(self, form, session):
+        """Answer a CallExport form post with a CSV attachment."""
+        data_type, headers = EXPORTS[form.get('PageCode', 'eqtrdbook')]
+        rows = self.state.data[session['account']][data_type]
+        if data_type == 'tradebook':
+            cutoff = date.today() - timedelta(days=int(form.get('Period') or 31))
+            rows = [row for row in rows if datetime.strptime(row[0], '%d-%b-%Y').date() >= cutoff]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(headers)
+        writer.writerows(rows)
+        file_name = form.get('FileName') or f"{account_number(session['account'])}_{data_type}"
+        self.send(200, buffer.getvalue(), 'text/csv', {'Content-Disposition': f'attachment; filename="{file_name}.csv"'})
+
+    def gtt_rows(self, session):
+        """Current GTT orders of the session's account, with LTPs drifting if ticking is enabled."""
+        orders = self.state.data[session['account']]['gtt']
+        if self.state.options['tick_ms']:
+            for order in orders:
+                order['ltp'] = round(order['ltp'] * (1 + self.state.random.uniform(-0.002, 0.002)), 2)
+        return orders
+
+    def layout(self, content, session, nav):
+        account = session['account']
+        options = ''.join(f'<option value="{a}">{a}</option>' for a in ACCOUNTS)
+        return render(LAYOUT, STYLE=STYLE, SCRIPT=PAGE_SCRIPT, RENDER_MS=self.state.options['render_ms'],
+                      ACCOUNT=account, ACCOUNT_NUMBER=account_number(account), ACCOUNT_OPTIONS=options,
+                      NAV=nav, CONTENT=content)
+
+    def equity_page(self, page, session):
+        number = account_number(session['account'])
+        if page == 'tradebook':
+            content = render(TRADEBOOK_CONTENT, ACCOUNT_NUMBER=number, TODAY=date.today().strftime('%d/%m/%Y'))
+        elif page == 'portfolio':
+            content = render(PORTFOLIO_CONTENT, ACCOUNT_NUMBER=number)
+        elif page == 'orderbook':
+            content = render(ORDERBOOK_CONTENT, GTT_HEADERS=json.dumps(GTT_HEADERS), TICK_MS=self.state.options['tick_ms'])
+        else:
+            content = '<div class="content"><h2>Dashboard</h2></div>'
+        return self.layout(content, session, EQUITY_NAV)
+
+    def mf_page(self, page, session):
+        number = account_number(session['account'])
+        if page == 'myportfolio':
+            content = render(MF_PORTFOLIO_CONTENT, ACCOUNT_NUMBER=number)
+        elif page == 'mforderbook':
+            content = render(MF_ORDERBOOK_CONTENT, ACCOUNT_NUMBER=number)
+        else:
+            content = '<div class="content"><h2>Mutual Funds</h2></div>'
+        return self.layout(content, session, MF_OLD_NAV)
+
+LOGIN_PAGE = """<!DOCTYPE html><html><head><title>ICICI Direct</title></head><body>
+<form id="form1" method="post" action="/customer/login"><div></div><div></div><div>
+<div></div><div></div><div></div>
+<div><input type="text" id="txtu" name="txtu"><input type="password" id="txtp" name="txtp">
+<a id="btnlogin" href="javascript://" onclick="document.getElementById('form1').submit()">Login</a></div>
+</div></form></body></html>"""
+
+OTP_PAGE = """<!DOCTYPE html><html><head><title>ICICI Direct</title></head><body>
+<form id="form1" method="post" action="/customer/otp">
+<input type="text" id="higootp" name="higootp" placeholder="OTP"><input type="submit" value="Submit">
+</form>
+<script>setTimeout(function() { document.getElementById('higootp').value = '123456'; document.getElementById('form1').submit(); }, {{OTP_AUTOFILL_MS}});</script>
+</body></html>"""
+
+# The GTT table's absolute XPath starts at /html/body/form/div[3]/div[3], so the form holds three divs
+# before the header-less content wrapper: form/div[1], form/div[2] (hidden fields) and form/div[3].
+LAYOUT = """<!DOCTYPE html><html><head><title>ICICI Direct</title><style>{{STYLE}}</style>
+<script>var RENDER_MS = {{RENDER_MS}};</script><script>{{SCRIPT}}</script></head><body>
+<form id="frm" method="post" onsubmit="return false;"><div><input type="hidden" name="__VIEWSTATE" value=""></div><div></div><div>
+<header><nav><div><div></div><div></div><div>{{NAV}}</div></div>
+<div class="account-menu">
+<a id="dropdownMenuButton1" class="dropdown-toggle" onclick="toggleHeadMenu()"><span>A/c</span><span class="mrl10" data-account="{{ACCOUNT}}">{{ACCOUNT_NUMBER}}</span></a>
+<div id="pnlHeadLogin"><div></div><div></div><div></div><div></div><div></div><div></div><div></div><div></div><div></div>
+<div><ul><li class="p-2">Profile</li><li class="p-2 dropdown-item"><div onclick="showSelectAccount()"><div>&#9776;</div><div class="fw-bold">Select Account</div></div></li></ul></div>
+</div>
+<div id="pnlSelMDP"><div><select id="drpAccount" name="drpAccount">{{ACCOUNT_OPTIONS}}</select></div><div><input type="button" class="btn-short" value="Select" onclick="selectMdp()"></div></div>
+<a mnu-name="mf" href="/trading/mf/home">Mutual Funds</a>
+</div></nav></header>
+<div></div><div></div><div id="content">{{CONTENT}}</div>
+</div></form></body></html>"""
+
+EQUITY_NAV = """<div id="pnlmnudsp"><div><div><ul>
+<li class="border-rightdark"><a class="sub-navlink" href="/trading/equity/home">Cash</a></li>
+<li class="border-rightdark"><a class="sub-navlink" href="/trading/equity/portfoliodetail">Portfolio</a></li>
+<li class="border-rightdark"><a class="sub-navlink" href="/trading/equity/home">Watchlist</a></li>
+<li class="border-rightdark"><a class="sub-navlink" href="/trading/equity/home">Positions</a></li>
+<li class="border-rightdark"><a class="sub-navlink" href="/trading/equity/orderbook">Order Book</a></li>
+<li class="border-rightdark"><a class="sub-navlink" href="/trading/equity/tradebook">Trade Book</a></li>
+</ul></div></div></div>"""
+
+MF_NAV = """<div id="pnlmnudsp"><div><div><ul><li><a href="/trading/mf/home">MF Home</a></li></ul></div></div></div>"""
+
+# Old MF menu: //*[@id="pnlmnudsp"]//ul[1]/li[2] is Holdings and //*[@id="pnlmnudsp"]//ul[1]/li[9] is Orders
+MF_OLD_NAV = """<div id="pnlmnudsp"><div><ul>
+<li>Dashboard</li>
+<li class="has-sub"><a>Holdings</a><ul class="submenu"><li><a href="/trading/mf/myportfolio">My Portfolio</a></li></ul></li>
+<li>Invest</li><li>SIP</li><li>NFO</li><li>Switch</li><li>Redeem</li><li>Reports</li>
+<li class="has-sub"><a>Orders</a><ul class="submenu"><li><a href="/trading/mf/orderbook">Order Book</a></li></ul></li>
+</ul></div></div>"""
+
+PERIOD_BOX = """<div id="periodBox"><div><div><ul>
+<li><input type="radio" name="period" id="today" value="1"><label for="today">Today</label></li>
+<li><input type="radio" name="period" id="week" value="7"><label for="week">1 Week</label></li>
+<li><input type="radio" name="period" id="month" value="31"><label for="month">1 Month</label></li>
+</ul></div></div></div>"""
+
+TRADEBOOK_CONTENT = """<div id="dvequity"><div><div><ul class="filters">
+<li>Exchange</li><li>Segment</li>
+<li><a id="hypPeriod" href="javascript://" onclick="togglePeriod()">{{TODAY}}</a>""" + PERIOD_BOX + """</li>
+<li></li><li></li><li><input type="button" id="btnview" value="View" onclick="afterRender(function() {
+    document.getElementById('grid').innerHTML = '<p>Trades loaded</p>';
+    document.getElementById('tbMenu').classList.remove('hidden');
+})"></li></ul></div></div>
+<div id="grid"></div>
+<div id="tbMenu" class="hidden"><div class="pull-right"><ul class="grid_menu"><li><a class="dropdown">Download</a><ul class="dropdown-menu">
+<li><a>PDF</a></li>
+<li><a href="javascript://" onclick="CallExport({'PageHandler':'equity','PageCode':'eqtrdbook','PostFormName':'frm','ExpotType':'csv','FileName':'{{ACCOUNT_NUMBER}}_tradeBook'})">CSV</a></li>
+</ul></li></ul></div></div>
+</div>"""
+
+PORTFOLIO_CONTENT = """<div id="dvportfolio"><div id="grid"></div>
+<div class="pull-right"><ul class="grid_menu">
+<li><a>Refresh</a></li><li><a>Print</a></li>
+<li><a class="dropdown">Download</a><ul class="dropdown-menu">
+<li><a>Detail: PDF</a></li>
+<li><a href="javascript://" onclick="CallExport({'PageHandler':'equity','PageCode':'eqpfdtls','PostFormName':'frm','ExpotType':'csv','FileName':'{{ACCOUNT_NUMBER}}_PortFolioEqtSummary'})">Summary: CSV</a></li>
+</ul></li></ul></div>
+<script>afterRender(function() { document.getElementById('grid').innerHTML = '<p>Holdings loaded</p>'; });</script>
+</div>"""
+
+# The content wrapper is /html/body/form/div[3]/div[3]; the rest of the GTT path is built by script because
+# the HTML parser drops a <form> nested inside the page form.
+ORDERBOOK_CONTENT = """<div><span><div></div><div><div><div></div><div><div><div><div id="gttHost"></div></div></div></div></div></div></span></div>
+<ul class="tabs-menu"><li><a href="javascript://">Equity</a></li><li><a href="javascript://" onclick="showGtt()">GTT</a></li></ul>
+<script>
+var GTT_HEADERS = {{GTT_HEADERS}}, TICK_MS = {{TICK_MS}};
+function el(tag, parent, cls) { var e = document.createElement(tag); if (cls) { e.className = cls; } if (parent) { parent.appendChild(e); } return e; }
+function rowHtml(o) {
+    return [o.stock + ' <span class="tag">Single</span>', o.date, o.side, o.ltp.toFixed(2), o.trigger.toFixed(2),
+            o.limit.toFixed(2), o.qty, o.status, '<a>Modify</a>'].map(function(v) { return '<td>' + v + '</td>'; }).join('');
+}
+function fillRows(tbody, orders) {
+    tbody.innerHTML = '';
+    orders.forEach(function(o) {
+        var tr = el('tr', tbody, 'gtt-row'); tr.setAttribute('data-id', o.id); tr.innerHTML = rowHtml(o);
+        var detail = el('tr', tbody, 'expand_content'); detail.style.display = 'none'; detail.innerHTML = '<td colspan="9">Order ' + o.id + '</td>';
+    });
+}
+function showGtt() {
+    var host = document.getElementById('gttHost');
+    host.innerHTML = '';
+    afterRender(function() {
+        // host is .../div[1]; build form/div[2]/div[4]/div/div/div/div/table[2] beneath it
+        var form = el('form', host);
+        el('div', form); var d2 = el('div', form);
+        el('div', d2); el('div', d2); el('div', d2); var d4 = el('div', d2);
+        var inner = el('div', el('div', el('div', el('div', d4))));
+        el('table', inner, 'gtt-summary');
+        var table = el('table', inner, 'gtt-table');
+        el('tr', el('thead', table)).innerHTML = GTT_HEADERS.map(function(h) { return '<th>' + h + '</th>'; }).join('');
+        var tbody = el('tbody', table);
+        fetch('/trading/gtt.json').then(function(r) { return r.json(); }).then(function(orders) { fillRows(tbody, orders); });
+        if (TICK_MS) {
+            setInterval(function() {
+                fetch('/trading/gtt.json').then(function(r) { return r.json(); }).then(function(orders) {
+                    orders.forEach(function(o) {
+                        var tr = tbody.querySelector('tr[data-id="' + o.id + '"]');
+                        if (tr && tr.children[3].textContent !== o.ltp.toFixed(2)) { tr.children[3].textContent = o.ltp.toFixed(2); }
+                        if (tr && tr.children[7].textContent !== o.status) { tr.children[7].textContent = o.status; }
+                    });
+                });
+            }, TICK_MS);
+        }
+    });
+}
+</script>"""
+
+MF_HOME_CONTENT = """<div class="content"><iframe id="ifrmangwh" src="/trading/mf/angular" width="900" height="400"></iframe></div>"""
+
+MF_IFRAME_PAGE = """<!DOCTYPE html><html><head><title>MF</title><style>#Div1 { display: none; } #Div1.shown { display: block; } #backOld { display: none; }</style></head><body>
+<div id="Div1"><a href="javascript://" onclick="document.getElementById('backOld').style.display='inline'">Get Started</a></div>
+<a id="backOld" href="javascript://" onclick="top.location.href='/trading/mf/portfoliodetail'">Back to old MF</a>
+<script>
+var stable = false;
+window.getAllAngularTestabilities = function() { return [{isStable: function() { return stable; }}]; };
+setTimeout(function() { stable = true; document.getElementById('Div1').className = 'shown'; }, {{RENDER_MS}});
+</script></body></html>"""
+
+MF_PORTFOLIO_CONTENT = """<div id="dvFilter"><div class="row"><div class="col"><ul>
+<li><a class="dropdown">Download</a><ul class="dropdown-menu">
+<li><a href="javascript://" onclick="CallExport({'PageHandler':'mf','PageCode':'mfportfolio','PostFormName':'frm','ExpotType':'csv','FileName':'{{ACCOUNT_NUMBER}}_MFPortfolio'})">CSV</a></li>
+</ul></li></ul></div></div></div>
+<div id="grid"></div><script>afterRender(function() { document.getElementById('grid').innerHTML = '<p>MF holdings loaded</p>'; });</script>"""
+
+MF_ORDERBOOK_CONTENT = """<div id="MFOrderBookDiv"><ul class="filters">
+<li><a id="hypPeriod" href="javascript://" onclick="togglePeriod()">Period</a>""" + PERIOD_BOX + """</li>
+<li><input type="button" value="View" onclick="afterRender(function() {
+    document.getElementById('grid').innerHTML = '<p>MF orders loaded</p>';
+    document.getElementById('mfMenu').classList.remove('hidden');
+})"></li></ul>
+<div id="grid"></div>
+<div id="mfMenu" class="hidden"><ul class="grid_menu"><li><a class="dropdown">Download</a><ul class="dropdown-menu">
+<li><a href="javascript://" onclick="CallExport({'PageHandler':'mf','PageCode':'mforderbook','PostFormName':'frm','ExpotType':'csv','FileName':'{{ACCOUNT_NUMBER}}_MFOrderBook'})">CSV</a></li>
+</ul></li></ul></div>
+</div>"""
+
+def start_mock_portal(host='127.0.0.1', port=0, **options):
+    """Start the mock portal in a background thread and return (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), PortalHandler)
+    server.daemon_threads = True
+    server.state = PortalState(options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://{host}:{server.server_address[1]}"
+    logging.info("Mock portal listening on %s with %s", base_url, server.state.options)
+    return server, base_url
+
+def main():
+    """Run the mock portal: python mock_portal.py --port 8765 --gtt-rows 200 --latency-ms 50"""
+    parser = argparse.ArgumentParser(description="Offline mock of the ICICI Direct portal for benchmarks.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    for name, default in DEFAULT_OPTIONS.items():
+        flag = '--' + name.replace('_', '-')
+        if isinstance(default, bool):
+            parser.add_argument(flag, action='store_true', default=default)
+        else:
+            parser.add_argument(flag, type=type(default), default=default)
+    args = vars(parser.parse_args())
+    host, port = args.pop('host'), args.pop('port')
+    server, base_url = start_mock_portal(host, port, **args)
+    print(f"Mock ICICI Direct portal running at {base_url} (set ICICI_BASE_URL={base_url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
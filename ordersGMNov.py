@@ -4,8 +4,12 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
+import os
 import csv
 import time
+from dotenv import load_dotenv
+
+load_dotenv()
 
 
 input_csv_path = '6500081466_table_data.csv'
@@ -14,8 +18,9 @@ output_csv_path = '6500081466_orders.csv'
 output_csv_path_01 = '7500062485_orders.csv'
 
 options = webdriver.ChromeOptions()
-options.add_argument("user-data-dir=C:/Users/Achilles/AppData/Local/Google/Chrome/User Data")
-options.add_argument("profile-directory=Default")
+if os.getenv('CHROME_USER_DATA_DIR'):
+    options.add_argument(f"user-data-dir={os.getenv('CHROME_USER_DATA_DIR')}")
+    options.add_argument("profile-directory=Default")
 options.add_argument("--no-sandbox")
 options.add_argument("--disable-dev-shm-usage")
 
@@ -27,8 +32,8 @@ driver.get("https://secure.icicidirect.com/customer/login")
 
 driver.set_window_size(1536, 816)
 
-username = "sbiyani69" 
-password = "tochange" 
+username = os.getenv('ICICI_USERNAME')
+password = os.getenv('ICICI_PASSWORD')
 # driver.find_element(By.ID, "txtu").send_keys(username)
 driver.find_element(By.ID, "txtp").send_keys(password) 
 driver.find_element(By.ID, "btnlogin").click()
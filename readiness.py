@@ -0,0 +1,138 @@
+import time
+import logging
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Selectors of the busy indicators shown by the ICICI Direct pages while data loads
+SPINNER_SELECTORS = [
+    '.blockUI',
+    '.loader',
+    '.loading',
+    '.spinner',
+    '#divLoader',
+    '#loading',
+]
+
+# Installs (once per document) an XHR/fetch counter and a MutationObserver.
+# Text-only mutations are ignored so live price tickers do not keep the page "busy" forever.
+INSTALL_SCRIPT = """
+if (!window.__iciciReady) {
+    var state = {pending: 0, requests: 0, lastMutation: Date.now(), mark: null, markedAt: 0, markedRequests: 0};
+    window.__iciciReady = state;
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        state.pending++;
+        state.requests++;
+        this.addEventListener('loadend', function() { state.pending = Math.max(0, state.pending - 1); });
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function() {
+            state.pending++;
+            state.requests++;
+            return fetch.apply(this, arguments).finally(function() { state.pending = Math.max(0, state.pending - 1); });
+        };
+    }
+    new MutationObserver(function(mutations) {
+        for (var i = 0; i < mutations.length; i++) {
+            var nodes = Array.prototype.concat.apply([], [mutations[i].addedNodes, mutations[i].removedNodes].map(Array.from));
+            if (mutations[i].type === 'attributes' || nodes.some(function(n) { return n.nodeType === 1; })) {
+                state.lastMutation = Date.now();
+                return;
+            }
+        }
+    }).observe(document.documentElement, {childList: true, subtree: true, attributes: true, attributeFilter: ['style', 'class', 'hidden']});
+    // A navigation has started: this document is about to be replaced, however quiet it is
+    window.addEventListener('beforeunload', function() { state.unloading = true; });
+}
+"""
+
+# Stamps the current document before an action, so the probe can tell the page that action produced
+# from the old document, which reports itself settled until it unloads.
+MARK_SCRIPT = INSTALL_SCRIPT + """
+var state = window.__iciciReady;
+state.mark = arguments[0];
+state.markedAt = Date.now();
+state.markedRequests = state.requests;
+state.unloading = false;  // Downloads fire beforeunload too and leave the document in place
+"""
+
+# Reports the page state; `changed` is whether a new document, a DOM mutation or a request followed the mark.
+READY_STATE_SCRIPT = INSTALL_SCRIPT + """
+var spinners = arguments[0], mark = arguments[1];
+var state = window.__iciciReady;
+var angularStable = true;
+if (window.getAllAngularTestabilities) {
+    angularStable = window.getAllAngularTestabilities().every(function(t) { return t.isStable(); });
+}
+var spinnerVisible = spinners.some(function(selector) {
+    return Array.prototype.some.call(document.querySelectorAll(selector), function(el) {
+        return el.offsetWidth > 0 || el.offsetHeight > 0;
+    });
+});
+return {
+    readyState: document.readyState,
+    pending: state.pending,
+    unloading: !!mark && !!state.unloading,
+    quietMs: Date.now() - state.lastMutation,
+    angularStable: angularStable,
+    spinnerVisible: spinnerVisible,
+    changed: !mark || state.mark !== mark || state.lastMutation > state.markedAt || state.requests > state.markedRequests
+};
+"""
+
+def mark(driver):
+    """Stamp the current document before a navigating or DOM-changing action and return the stamp."""
+    token = f"{time.time():.6f}"
+    try:
+        driver.execute_script(MARK_SCRIPT, token)
+    except Exception as e:
+        logging.debug("Could not mark the page: %s", e)
+        return None
+    return token
+
+def page_state(driver, since=None):
+    """Return the readiness signals of the current document (or frame)."""
+    return driver.execute_script(READY_STATE_SCRIPT, SPINNER_SELECTORS, since)
+
+def is_settled(state, quiet_ms):
+    """Check whether a page state reported by page_state() counts as settled."""
+    return (state['changed']
+            and not state['unloading']
+            and state['readyState'] == 'complete'
+            and state['pending'] == 0
+            and state['angularStable']
+            and not state['spinnerVisible']
+            and state['quietMs'] >= quiet_ms)
+
+def wait_until_ready(driver, step, timeout=20, quiet_ms=300, poll=0.1, since=None, change_timeout=5):
+    """Wait until the page is loaded, has no pending requests or spinners and the DOM is quiet.
+
+    With a stamp from mark() taken before the action, the page only counts once a new document,
+    a DOM mutation or a request followed the stamp; if none does within change_timeout seconds the
+    action is taken to have changed nothing and the current page is judged as it is.
+    Returns the seconds spent waiting. A timeout is logged but not raised, so the element waits
+    that follow still decide whether the step fails.
+    """
+    start = time.time()
+    last_state = {}
+
+    def settled(d):
+        try:
+            last_state.update(page_state(d, since))
+        except Exception as e:
+            # Navigation in progress: the old document is gone and the new one is not ready yet
+            logging.debug("Readiness probe failed during %s: %s", step, e)
+            return False
+        if not last_state['changed'] and time.time() - start >= change_timeout:
+            last_state['changed'] = True
+        return is_settled(last_state, quiet_ms)
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=poll).until(settled)
+        elapsed = time.time() - start
+        logging.info("Page ready after %.2fs [%s]", elapsed, step)
+    except Exception:
+        elapsed = time.time() - start
+        logging.warning("Page not settled after %.2fs [%s], last state: %s", elapsed, step, last_state)
+    return elapsed
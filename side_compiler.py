@@ -0,0 +1,322 @@
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import Select
+from selenium.webdriver.common.action_chains import ActionChains
+import locator_registry
+import tracing
+
+# Compiles Selenium IDE recordings (.side) into step graphs: lists of steps with stable, ranked
+# locator candidates, linked by `next`. Recording noise is removed on the way (hovers over the
+# element about to be clicked, mouseOut/mouseMoveAt, focus clicks before typing, chains of waits),
+# and every step is run under a timing span, either by run_steps() or by the emitted Python code.
+
+LOCATOR_PREFIXES = {
+    'id': By.ID,
+    'name': By.NAME,
+    'css': By.CSS_SELECTOR,
+    'xpath': By.XPATH,
+    'linkText': By.LINK_TEXT,
+    'partialLinkText': By.PARTIAL_LINK_TEXT,
+}
+
+# IDE commands that only move the mouse and never change what the next command acts on
+NOOP_COMMANDS = {'mouseOut', 'mouseMoveAt', 'mouseUp', 'mouseDown', 'mouseUpAt', 'mouseDownAt', 'echo'}
+
+ACTIONS = {
+    'open': 'open',
+    'setWindowSize': 'resize',
+    'click': 'click',
+    'clickAt': 'click',
+    'doubleClick': 'double_click',
+    'type': 'type',
+    'sendKeys': 'type',
+    'select': 'select',
+    'mouseOver': 'hover',
+    'pause': 'pause',
+    'waitForElementPresent': 'wait_present',
+    'waitForElementVisible': 'wait_visible',
+    'selectFrame': 'frame',
+    'runScript': 'script',
+    'executeScript': 'script',
+}
+
+MAX_CANDIDATES = 4
+LONG_NUMBER = re.compile(r'\d{6,}|\d{1,2}/\d{1,2}/\d{2,4}')  # Account numbers and dates change between runs
+ACCOUNT_ID_PATTERN = re.compile(r'\bIN\d{6}-\d{8}-\d{10}-[A-Z]+\b')  # Sub-account IDs such as IN303028-76957818-7500062485-NRO
+
+def parse_locator(target):
+    """Convert an IDE target such as 'css=.mrl10' or '//a' into a (By, value) locator."""
+    if not target:
+        return None
+    if target.startswith('/') or target.startswith('('):
+        return (By.XPATH, target)
+    prefix, _, value = target.partition('=')
+    if prefix in LOCATOR_PREFIXES and value:
+        return (LOCATOR_PREFIXES[prefix], value)
+    return None
+
+def anchor_xpath(value):
+    """Re-root an absolute XPath at its last step carrying an @id, e.g. /html/body/div[@id='x']/a -> //div[@id='x']/a."""
+    if not value.startswith('/') or value.startswith('//'):
+        return value
+    steps = value.strip('/').split('/')
+    for idx in range(len(steps) - 1, -1, -1):
+        if '@id=' in steps[idx]:
+            return '//' + '/'.join(steps[idx:])
+    return value
+
+def locator_score(locator):
+    """Higher is more stable: ids and link texts beat classes, which beat positional and absolute paths."""
+    by, value = locator
+    if by == By.ID:
+        score = 100
+    elif by == By.NAME:
+        score = 90
+    elif by in (By.LINK_TEXT, By.PARTIAL_LINK_TEXT):
+        score = 80
+    elif by == By.CSS_SELECTOR:
+        score = 70 - 25 * len(re.findall(r':nth-(child|of-type)', value))
+    else:
+        if value.startswith('(') and re.search(r'\)\[\d+\]$', value):
+            score = 15  # Nth match over the whole page
+        elif value.startswith('/') and not value.startswith('//'):
+            score = 10  # Absolute path from the document root
+        else:
+            score = 60 - 10 * len(re.findall(r'\[\d+\]', value))
+            if '@id=' in value:
+                score += 10
+    if LONG_NUMBER.search(value):
+        score -= 50
+    if '@onclick' in value:
+        score -= 40
+    return score
+
+def stable_locators(command):
+    """Ranked locator candidates of a command: its target plus the recorded alternatives, unstable ones dropped."""
+    locators = []
+    for target in [command.get('target', '')] + [alternative[0] for alternative in command.get('targets', [])]:
+        locator = parse_locator(target)
+        if locator and locator[0] == By.XPATH:
+            locator = (By.XPATH, anchor_xpath(locator[1]))
+        if locator and locator not in locators:
+            locators.append(locator)
+    ranked = sorted(locators, key=locator_score, reverse=True)
+    stable = [locator for locator in ranked if locator_score(locator) >= 30]
+    return (stable or ranked[:1])[:MAX_CANDIDATES]
+
+def same_element(first, second):
+    """Whether two commands address the same element (any shared locator counts)."""
+    return bool(set(stable_locators(first)) & set(stable_locators(second)))
+
+def optimize(commands):
+    """Drop recording noise from a list of IDE commands; returns (commands, notes on what was removed)."""
+    notes = []
+    kept = []
+    for command in commands:
+        if command['command'] in NOOP_COMMANDS:
+            notes.append(f"dropped {command['command']} {command['target']}")
+            continue
+        kept.append(command)
+
+    result = []
+    for idx, command in enumerate(kept):
+        following = kept[idx + 1] if idx + 1 < len(kept) else None
+        previous = result[-1] if result else None
+        name = command['command']
+        if name == 'mouseOver' and following and following['command'] in ('click', 'clickAt') and same_element(command, following):
+            notes.append(f"dropped mouseOver before click on {command['target']}")
+            continue
+        if name == 'mouseOver' and following and following['command'] == 'mouseOver':
+            notes.append(f"dropped mouseOver on {command['target']} superseded by the next hover")
+            continue
+        if name == 'mouseOver' and previous and previous['command'] in ('click', 'clickAt') and same_element(command, previous):
+            notes.append(f"dropped mouseOver after click on {command['target']}")
+            continue
+        if name in ('click', 'clickAt') and following and following['command'] in ('type', 'sendKeys') and same_element(command, following):
+            notes.append(f"dropped focus click before typing into {command['target']}")
+            continue
+        if name in ('waitForElementPresent', 'waitForElementVisible') and following and \
+                following['command'] not in ('pause',) and following.get('target') and same_element(command, following):
+            notes.append(f"folded {name} into the next command on {command['target']}")
+            continue
+        if name == 'pause' and previous and previous['command'] == 'pause':
+            previous['target'] = str(int(previous['target'] or 0) + int(command['target'] or 0))
+            notes.append("merged consecutive pauses")
+            continue
+        if name in ('waitForElementPresent', 'waitForElementVisible') and previous and \
+                previous['command'] in ('waitForElementPresent', 'waitForElementVisible') and same_element(command, previous):
+            previous['command'] = 'waitForElementVisible' if 'Visible' in name + previous['command'] else name
+            previous['value'] = str(max(int(previous.get('value') or 0), int(command.get('value') or 0)))
+            notes.append(f"merged consecutive waits on {command['target']}")
+            continue
+        result.append(dict(command))
+    return result, notes
+
+def build_step(index, command):
+    """Turn an optimized IDE command into a step of the graph."""
+    name = command['command']
+    step = {'id': f"s{index:02d}", 'action': ACTIONS.get(name, 'unsupported'), 'command': name}
+    if step['action'] in ('open', 'script'):
+        step['target'] = command['target']
+    elif step['action'] == 'resize':
+        width, _, height = command['target'].partition('x')
+        step['size'] = [int(width), int(height)]
+    elif step['action'] == 'pause':
+        step['ms'] = int(command['target'] or 0)
+    elif step['action'] == 'frame':
+        step['target'] = command['target']
+    else:
+        step['locators'] = [list(locator) for locator in stable_locators(command)]
+    if step['action'] in ('type', 'select'):
+        step['value'] = command.get('value', '')
+        if step['action'] == 'type' and any('txtp' in value or 'password' in value.lower() for _, value in step['locators']):
+            step['value'] = '${PASSWORD}'  # Never carry a recorded password into generated code
+        else:
+            step['value'] = ACCOUNT_ID_PATTERN.sub('${ACCOUNT}', step['value'])  # Nor the recorded account
+    if step['action'] in ('wait_present', 'wait_visible'):
+        step['timeout_ms'] = int(command.get('value') or 30000)
+    return step
+
+def compile_test(test):
+    """Compile one recorded test into a linear step graph."""
+    commands, notes = optimize(test['commands'])
+    steps = [build_step(index, command) for index, command in enumerate(commands, 1)]
+    for step, following in zip(steps, steps[1:] + [None]):
+        step['next'] = following['id'] if following else None
+    unsupported = [step['command'] for step in steps if step['action'] == 'unsupported']
+    if unsupported:
+        notes.append(f"unsupported commands kept as no-ops: {sorted(set(unsupported))}")
+    return {'name': test['name'], 'recorded_commands': len(test['commands']), 'steps': steps, 'notes': notes}
+
+def compile_side(path):
+    """Compile every test of a .side project into step graphs."""
+    with open(path, 'r', encoding='utf-8') as f:
+        project = json.load(f)
+    return {
+        'project': project.get('name'),
+        'url': project.get('url'),
+        'source': os.path.basename(path),
+        'flows': [compile_test(test) for test in project.get('tests', [])],
+    }
+
+def substitute(text, variables):
+    """Replace ${NAME} placeholders with run-time values."""
+    return re.sub(r'\$\{(\w+)\}', lambda match: str(variables.get(match.group(1), match.group(0))), text or '')
+
+def run_steps(driver, flow, base_url, variables=None, timeout=30, on_step=None):
+    """Replay a compiled flow in the given browser session, timing every step.
+
+    Elements are located by racing the step's candidates through locator_registry, so each step waits
+    only as long as its element takes to appear. on_step(step, seconds) is called after every step.
+    """
+    variables = variables or {}
+    timings = []
+    for step in flow['steps']:
+        start = time.time()
+        with tracing.span(f"{flow['name']}:{step['id']}", kind='step', action=step['action']):
+            element = None
+            if step.get('locators'):
+                visible = step['action'] not in ('wait_present', 'type', 'select')
+                step_timeout = step.get('timeout_ms', timeout * 1000) / 1000
+                locators = [tuple(locator) for locator in step['locators']]
+                element, _ = locator_registry.find(driver, f"side.{flow['name']}.{step['id']}", locators,
+                                                   timeout=step_timeout, visible=visible)
+                if element is None:
+                    raise RuntimeError(f"Step {step['id']} ({step['command']}) found no element for {locators}")
+            action = step['action']
+            if action == 'open':
+                target = substitute(step['target'], variables)
+                driver.get(target if '://' in target else base_url.rstrip('/') + target)
+            elif action == 'resize':
+                driver.set_window_size(*step['size'])
+            elif action == 'click':
+                element.click()
+            elif action == 'double_click':
+                ActionChains(driver).double_click(element).perform()
+            elif action == 'hover':
+                ActionChains(driver).move_to_element(element).perform()
+            elif action == 'type':
+                element.clear()
+                element.send_keys(substitute(step['value'], variables))
+            elif action == 'select':
+                kind, _, option = substitute(step['value'], variables).partition('=')
+                if kind == 'value':
+                    Select(element).select_by_value(option)
+                else:
+                    Select(element).select_by_visible_text(option if kind == 'label' else step['value'])
+            elif action == 'pause':
+                time.sleep(step['ms'] / 1000)
+            elif action == 'frame':
+                target = step['target']
+                if target == 'relative=top':
+                    driver.switch_to.default_content()
+                elif target == 'relative=parent':
+                    driver.switch_to.parent_frame()
+                else:
+                    driver.switch_to.frame(int(target.split('=')[1]) if target.startswith('index=') else target.split('=', 1)[-1])
+            elif action == 'script':
+                driver.execute_script(substitute(step['target'], variables))
+            elif action == 'unsupported':
+                logging.warning("Skipping unsupported recorded command %s", step['command'])
+        elapsed = time.time() - start
+        timings.append((step['id'], elapsed))
+        if on_step:
+            on_step(step, elapsed)
+    logging.info("Replayed %s: %s steps in %.2fs", flow['name'], len(flow['steps']), sum(t for _, t in timings))
+    return timings
+
+def emit_python(graph):
+    """Generate a Python module that replays each compiled flow with a timing span per step."""
+    lines = [
+        f'"""Replay code generated by side_compiler.py from {graph["source"]}; do not edit, recompile instead."""',
+        'import json',
+        'import side_compiler',
+        '',
+        f"BASE_URL = {graph['url']!r}",
+        '',
+    ]
+    for flow in graph['flows']:
+        function_name = re.sub(r'\W+', '_', flow['name']).strip('_').lower()
+        lines.append(f"# {flow['name']}: {flow['recorded_commands']} recorded commands compiled to {len(flow['steps'])} steps")
+        for note in flow['notes']:
+            lines.append(f"#   {note}")
+        lines.append(f"{function_name.upper()} = json.loads({json.dumps(json.dumps(flow, indent=1))})")
+        lines.append('')
+        lines.append(f"def {function_name}(driver, variables=None, base_url=BASE_URL, on_step=None):")
+        lines.append(f'    """Replay {flow["name"]}; returns the (step id, seconds) timings."""')
+        lines.append(f"    return side_compiler.run_steps(driver, {function_name.upper()}, base_url, variables, on_step=on_step)")
+        lines.append('')
+    return '\n'.join(lines)
+
+def main():
+    """Compile a recording: python side_compiler.py iciciGMNov.side --output flows/icici.steps.json --python flows/icici_replay.py"""
+    parser = argparse.ArgumentParser(description="Compile Selenium IDE recordings into optimized step graphs.")
+    parser.add_argument('side_file')
+    parser.add_argument('--output', help="Where to write the step graph JSON (default: <name>.steps.json)")
+    parser.add_argument('--python', help="Also generate a Python replay module at this path")
+    args = parser.parse_args()
+
+    graph = compile_side(args.side_file)
+    output = args.output or os.path.splitext(args.side_file)[0] + '.steps.json'
+    for path in filter(None, [output, args.python]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(graph, f, indent=2)
+    if args.python:
+        with open(args.python, 'w', encoding='utf-8') as f:
+            f.write(emit_python(graph))
+    for flow in graph['flows']:
+        print(f"{flow['name']}: {flow['recorded_commands']} commands -> {len(flow['steps'])} steps")
+        for note in flow['notes']:
+            print(f"  {note}")
+    print(f"Step graph written to {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+import logging
+
+# Serializes a whole <table> in one round trip. Cells that are not rendered come back empty,
+# matching what WebElement.text returns for hidden elements.
+TABLE_SCRIPT = """
+var table = arguments[0];
+function text(el) {
+    return el.getClientRects().length ? el.innerText.trim() : '';
+}
+var headers = Array.prototype.map.call(table.querySelectorAll('thead > tr > th'), text);
+var rows = Array.prototype.map.call(table.querySelectorAll('tbody > tr'), function(tr) {
+    return [tr.className, Array.prototype.map.call(tr.querySelectorAll('td'), text)];
+});
+return {headers: headers, rows: rows};
+"""
+
+def extract_table(driver, table):
+    """Return the headers and rows of a table element as {'headers': [...], 'rows': [[class, [cells]], ...]}."""
+    data = driver.execute_script(TABLE_SCRIPT, table)
+    logging.debug("Extracted %s table rows in one script call", len(data['rows']))
+    return data
@@ -0,0 +1,87 @@
+import os
+import re
+import json
+import logging
+
+# Tenant registry: one entry per client login.
+#   {"tenants": [
+#       {"id": "client-a",                       # directory name of the tenant's isolated files
+#        "username_env": "CLIENT_A_USERNAME",    # or "username": "..."
+#        "password_env": "CLIENT_A_PASSWORD",    # or "password": "..." (keep the file out of version control)
+#        "sub_accounts": ["IN303028-..."],
+#        "mf_accounts": ["IN303028-..."],        # optional, sub-accounts with mutual fund data
+#        "datasets": ["tradebook", "orders"],    # optional, defaults to every dataset
+#        "enabled": true}                        # optional
+#   ]}
+
+TENANT_ID_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*$')
+
+def secret(entry, field):
+    """Value of a credential field, read from the environment variable named by <field>_env if given."""
+    env_name = entry.get(f"{field}_env")
+    value = os.getenv(env_name) if env_name else entry.get(field)
+    if not value:
+        source = f"environment variable {env_name}" if env_name else f"'{field}'"
+        raise ValueError(f"Tenant {entry.get('id')} has no {field}: set {source}")
+    return value
+
+def normalize(entry, datasets):
+    """Validate one registry entry and return the tenant with resolved credentials and defaults."""
+    tenant_id = str(entry.get('id', ''))
+    if not TENANT_ID_PATTERN.match(tenant_id):
+        raise ValueError(f"Invalid tenant id {tenant_id!r}: use letters, digits, '.', '_' and '-'")
+    sub_accounts = list(entry.get('sub_accounts') or [])
+    if not sub_accounts:
+        raise ValueError(f"Tenant {tenant_id} has no sub_accounts")
+    enabled_datasets = list(entry.get('datasets') or datasets)
+    unknown = [name for name in enabled_datasets if name not in datasets]
+    if unknown:
+        raise ValueError(f"Tenant {tenant_id} enables unknown datasets {unknown}; known datasets: {datasets}")
+    mf_accounts = list(entry.get('mf_accounts') or [])
+    stray = [account for account in mf_accounts if account not in sub_accounts]
+    if stray:
+        logging.warning("Tenant %s lists mf_accounts that are not sub_accounts: %s", tenant_id, stray)
+    return {
+        'id': tenant_id,
+        'username': secret(entry, 'username'),
+        'password': secret(entry, 'password'),
+        'sub_accounts': sub_accounts,
+        'mf_accounts': mf_accounts,
+        'datasets': enabled_datasets,
+    }
+
+def load_registry(path, datasets):
+    """Load the enabled tenants of a registry file; returns [] if the file does not exist."""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    entries = data['tenants'] if isinstance(data, dict) else data
+    tenants = [normalize(entry, datasets) for entry in entries if entry.get('enabled', True)]
+    ids = [tenant['id'] for tenant in tenants]
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"Duplicate tenant ids in {path}: {ids}")
+    logging.info("Loaded %s enabled tenants from %s", len(tenants), path)
+    return tenants
+
+def tenant_paths(tenant, base_dir):
+    """CONFIG overrides giving a tenant its own downloads, browser profiles, session, locator stats, outputs and logs."""
+    root = os.path.join(base_dir, tenant['id'])
+    downloads = os.path.join(root, "downloads")
+    return {
+        'download_base_dir': downloads,
+        'profile_base_dir': os.path.join(root, "profiles"),
+        'session_file': os.path.join(root, ".session", "cookies.json"),
+        'session_seed_file': os.path.join(root, "icici_cookies.json"),
+        'export_templates_file': os.path.join(root, ".session", "export_requests.json"),
+        'columnar_dir': os.path.join(downloads, "columnar"),
+        'datastore_path': os.path.join(downloads, "icici.db"),
+        'artifact_dir': os.path.join(downloads, "artifacts"),
+        'locator_stats_file': os.path.join(root, "locator_stats.json"),  # Tenant workers would overwrite each other's stats
+        'log_file': os.path.join(root, "icici_extract.log"),
+        'trace_output': os.path.join(root, "icici_trace.json"),
+    }
+
+def schedule_order(tenants):
+    """Tenants with the most sub-accounts first, so the longest runs do not start last and stretch the fleet's tail."""
+    return sorted(tenants, key=lambda tenant: len(tenant['sub_accounts']), reverse=True)
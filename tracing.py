@@ -0,0 +1,233 @@
+import os
+import json
+import time
+import logging
+import threading
+import contextlib
+import urllib.request
+from collections import defaultdict, deque
+from tabulate import tabulate
+
+# Spans of the current process. Steps and WebDriver commands are recorded as plain objects and only
+# turned into OpenTelemetry JSON or Prometheus text when exported, so tracing costs two clock reads
+# and a list append per command.
+
+class Span:
+    """One timed unit of work: a pipeline step, a page wait or a single WebDriver command."""
+
+    __slots__ = ('name', 'kind', 'span_id', 'parent_id', 'start_ns', 'end_ns', 'attributes', 'failed_attempts', 'error')
+
+    def __init__(self, name, kind, span_id, parent_id, attributes):
+        self.name = name
+        self.kind = kind
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.failed_attempts = 0
+        self.error = None
+
+    @property
+    def duration(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    @property
+    def retries(self):
+        # retry_on_exception also sees the final failure, which is not followed by a retry
+        return max(0, self.failed_attempts - (1 if self.error else 0))
+
+class Tracer:
+    """Collects the spans of one process."""
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_id = os.urandom(16).hex()
+        self.spans = deque()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.next_id = 0
+
+    def stack(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    def start(self, name, kind, attributes):
+        stack = self.stack()
+        with self.lock:
+            self.next_id += 1
+            span = Span(name, kind, f"{os.getpid() & 0xffffffff:08x}{self.next_id:08x}", stack[-1].span_id if stack else None, attributes)
+            self.spans.append(span)
+        stack.append(span)
+        return span
+
+    def end(self, span, error=None):
+        span.end_ns = time.time_ns()
+        span.error = error
+        stack = self.stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+
+tracer = Tracer()
+
+def enable(enabled=True, max_spans=None):
+    """Turn span recording on or off for this process, keeping at most max_spans of the latest spans."""
+    tracer.enabled = enabled
+    with tracer.lock:
+        tracer.spans = deque(tracer.spans, maxlen=max_spans)
+
+def reset():
+    """Drop the recorded spans, e.g. in a worker process forked from a tracing parent."""
+    with tracer.lock:
+        tracer.spans = deque(maxlen=tracer.spans.maxlen)
+    tracer.local = threading.local()
+
+@contextlib.contextmanager
+def span(name, kind='step', **attributes):
+    """Record the enclosed block as a span; does nothing while tracing is disabled."""
+    if not tracer.enabled:
+        yield None
+        return
+    current = tracer.start(name, kind, attributes)
+    try:
+        yield current
+    except BaseException as e:
+        tracer.end(current, f"{type(e).__name__}: {str(e)[:200]}")
+        raise
+    tracer.end(current)
+
+def record_retry(exception):
+    """retry_on_exception hook of @retry: count the failed attempt on the current step and keep retrying."""
+    if tracer.enabled:
+        stack = tracer.stack()
+        if stack:
+            stack[-1].failed_attempts += 1
+    return True
+
+def instrument_driver(driver):
+    """Record every WebDriver command of a session as a span under the step that issued it."""
+    execute = driver.execute
+
+    def traced_execute(driver_command, params=None):
+        if not tracer.enabled:
+            return execute(driver_command, params)
+        with span(driver_command, kind='command'):
+            return execute(driver_command, params)
+    driver.execute = traced_execute
+    return driver
+
+def attribute_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+def to_otel(service_name='icici_extract'):
+    """Spans in the OpenTelemetry (OTLP/JSON) trace format."""
+    spans = []
+    for item in list(tracer.spans):
+        attributes = dict(item.attributes, kind=item.kind, retries=item.retries)
+        otel_span = {
+            'traceId': tracer.trace_id,
+            'spanId': item.span_id,
+            'name': item.name,
+            'kind': 1 if item.kind == 'step' else 3,  # INTERNAL for steps, CLIENT for WebDriver commands
+            'startTimeUnixNano': str(item.start_ns),
+            'endTimeUnixNano': str(item.end_ns or time.time_ns()),
+            'attributes': [{'key': key, 'value': attribute_value(value)} for key, value in attributes.items()],
+            'status': {'code': 2, 'message': item.error} if item.error else {'code': 1},
+        }
+        if item.parent_id:
+            otel_span['parentSpanId'] = item.parent_id
+        spans.append(otel_span)
+    return {'resourceSpans': [{
+        'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': service_name}},
+                                    {'key': 'process.pid', 'value': {'intValue': str(os.getpid())}}]},
+        'scopeSpans': [{'scope': {'name': 'tracing'}, 'spans': spans}],
+    }]}
+
+def aggregate():
+    """Per (kind, name): calls, total and max seconds, retries and failures."""
+    totals = defaultdict(lambda: {'calls': 0, 'seconds': 0.0, 'max': 0.0, 'retries': 0, 'failures': 0})
+    for item in list(tracer.spans):
+        entry = totals[(item.kind, item.name)]
+        duration = item.duration
+        entry['calls'] += 1
+        entry['seconds'] += duration
+        entry['max'] = max(entry['max'], duration)
+        entry['retries'] += item.retries
+        entry['failures'] += 1 if item.error else 0
+    return totals
+
+def to_prometheus():
+    """Aggregated span metrics in the Prometheus text exposition format."""
+    label_names = {'step': 'step', 'wait': 'step', 'command': 'command'}
+    families = [
+        ('icici_step_duration_seconds', 'summary', 'Wall time of pipeline steps and page waits'),
+        ('icici_step_retries_total', 'counter', 'Retried attempts of pipeline steps'),
+        ('icici_step_failures_total', 'counter', 'Pipeline steps that failed after all retries'),
+        ('icici_webdriver_command_duration_seconds', 'summary', 'Round-trip time of WebDriver commands'),
+    ]
+    samples = defaultdict(list)
+    for (kind, name), entry in sorted(aggregate().items()):
+        labels = f'{label_names.get(kind, "step")}="{name}"'
+        if kind == 'command':
+            family = 'icici_webdriver_command_duration_seconds'
+        else:
+            family = 'icici_step_duration_seconds'
+            labels += f',kind="{kind}"'
+            samples['icici_step_retries_total'].append(f"icici_step_retries_total{{{labels}}} {entry['retries']}")
+            samples['icici_step_failures_total'].append(f"icici_step_failures_total{{{labels}}} {entry['failures']}")
+        samples[family].append(f"{family}_sum{{{labels}}} {entry['seconds']:.6f}")
+        samples[family].append(f"{family}_count{{{labels}}} {entry['calls']}")
+    lines = []
+    for family, metric_type, help_text in families:
+        lines += [f"# HELP {family} {help_text}", f"# TYPE {family} {metric_type}"] + samples[family]
+    return '\n'.join(lines) + '\n'
+
+def summary_report(top_commands=10):
+    """Table of where the run's time went: steps by total time, then the slowest WebDriver commands."""
+    totals = aggregate()
+    roots = [item for item in tracer.spans if item.parent_id is None]
+    run_seconds = sum(item.duration for item in roots) or 1.0
+    steps = sorted(((name, entry) for (kind, name), entry in totals.items() if kind != 'command'),
+                   key=lambda pair: pair[1]['seconds'], reverse=True)
+    commands = sorted(((name, entry) for (kind, name), entry in totals.items() if kind == 'command'),
+                      key=lambda pair: pair[1]['seconds'], reverse=True)[:top_commands]
+    step_rows = [[name, entry['calls'], f"{entry['seconds']:.2f}", f"{entry['seconds'] / entry['calls']:.2f}",
+                  f"{entry['max']:.2f}", entry['retries'], entry['failures'], f"{entry['seconds'] / run_seconds * 100:.1f}%"]
+                 for name, entry in steps]
+    command_rows = [[name, entry['calls'], f"{entry['seconds']:.2f}", f"{entry['seconds'] / entry['calls'] * 1000:.1f}"]
+                    for name, entry in commands]
+    command_count = sum(entry['calls'] for (kind, _), entry in totals.items() if kind == 'command')
+    return '\n'.join([
+        f"Run took {run_seconds:.2f}s with {command_count} WebDriver commands",
+        tabulate(step_rows, headers=['Step', 'Calls', 'Total (s)', 'Avg (s)', 'Max (s)', 'Retries', 'Failures', 'Share'], tablefmt="grid"),
+        tabulate(command_rows, headers=['Command', 'Calls', 'Total (s)', 'Avg (ms)'], tablefmt="grid"),
+    ])
+
+def export(path, fmt='otel', endpoint=None):
+    """Write the spans as OpenTelemetry JSON ('otel') or Prometheus text ('prometheus'), optionally POSTing them too."""
+    if fmt == 'prometheus':
+        body, content_type = to_prometheus(), 'text/plain; version=0.0.4'
+    else:
+        body, content_type = json.dumps(to_otel()), 'application/json'
+    if path:
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        logging.info("Exported %s spans as %s to %s", len(tracer.spans), fmt, path)
+    if endpoint:
+        try:
+            request = urllib.request.Request(endpoint, data=body.encode('utf-8'), method='POST',
+                                             headers={'Content-Type': content_type})
+            with urllib.request.urlopen(request, timeout=10) as response:
+                logging.info("Sent %s trace data to %s: HTTP %s", fmt, endpoint, response.status)
+        except Exception as e:
+            logging.warning("Could not send trace data to %s: %s", endpoint, e)
+    return path